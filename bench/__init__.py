@@ -0,0 +1,2 @@
+import amino.test
+amino.test.setup(__file__)
@@ -0,0 +1,29 @@
+import time
+from typing import Callable, Any
+
+from amino.test.spec_spec import Spec as SpecBase
+
+from proteome.test import Spec
+
+
+def timed(f: Callable[[], Any], runs: int=1) -> float:
+    ''' best wall time of `runs` invocations of `f`
+    '''
+    def run() -> float:
+        start = time.perf_counter()
+        f()
+        return time.perf_counter() - start
+    return min(run() for i in range(runs))
+
+
+class BenchSpec(SpecBase, Spec):
+
+    def setup(self) -> None:
+        SpecBase.setup(self)
+        Spec.setup(self)
+
+    def report(self, desc: str, **timings: float) -> None:
+        values = ', '.join('{} {:.4f}s'.format(k, v) for k, v in sorted(timings.items()))
+        self.log.info('{}: {}'.format(desc, values))
+
+__all__ = ('timed', 'BenchSpec')
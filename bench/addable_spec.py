@@ -0,0 +1,50 @@
+from amino import List, Map, Just
+from amino.test import temp_dir
+
+from proteome.addable import AddableCache
+from proteome.scan import Scanner
+from proteome.index_store import IndexStore
+
+from bench._support.spec import BenchSpec, timed
+
+
+class AddableCacheBench(BenchSpec):
+    '''scans of a base dir with 10 types and 3000 projects'''
+
+    def setup(self) -> None:
+        super().setup()
+        self.base = temp_dir('bench', 'addable')
+        for tpe in range(10):
+            for name in range(300):
+                (self.base / 'tpe{}'.format(tpe) / 'pro{}'.format(name)).mkdir(parents=True, exist_ok=True)
+        self.bases = List(self.base)
+
+    def cold_warm(self) -> None:
+        warm_cache = AddableCache(granularity=0, ttl=0)
+        warm_cache.idents(self.bases, Map())
+        cold = timed(lambda: AddableCache(granularity=0, ttl=0).idents(self.bases, Map()), 5)
+        warm = timed(lambda: warm_cache.idents(self.bases, Map()), 5)
+        self.report('addable idents', cold=cold, warm=warm)
+        warm_cache.idents(self.bases, Map()).should.have.length_of(3000)
+        warm.should.be.lower_than(cold)
+
+    def parallel(self) -> None:
+        def cold(workers: int) -> float:
+            return timed(lambda: AddableCache(granularity=0, ttl=0).idents(self.bases, Map(), Scanner(workers)), 5)
+        self.report('cold addable idents', sequential=cold(1), parallel=cold(4))
+
+    def persisted(self) -> None:
+        store_path = temp_dir('bench', 'store') / 'index.sqlite'
+        if store_path.exists():
+            store_path.unlink()
+        def cache() -> AddableCache:
+            c = AddableCache(granularity=0, ttl=0)
+            c.store = Just(IndexStore(store_path))
+            return c
+        cache().idents(self.bases, Map())
+        cold = timed(lambda: AddableCache(granularity=0, ttl=0).idents(self.bases, Map()), 5)
+        stored = timed(lambda: cache().idents(self.bases, Map()), 5)
+        self.report('new session addable idents', scan=cold, stored=stored)
+        stored.should.be.lower_than(cold)
+
+__all__ = ('AddableCacheBench',)
@@ -0,0 +1,29 @@
+from amino import List, __
+
+from proteome.complete import Completer
+
+from bench._support.spec import BenchSpec, timed
+
+
+class CompleterBench(BenchSpec):
+    '''completion latency over 10000 idents'''
+
+    def setup(self) -> None:
+        super().setup()
+        self.idents = List.range(100).flat_map(lambda t: List.range(100).map(lambda n: 'tpe{}/pro{}'.format(t, n)))
+        self.completer = Completer(self.idents)
+
+    def prefix(self) -> None:
+        lead = 'tpe42/pro1'
+        linear = timed(lambda: self.idents.filter(__.startswith(lead)), 20)
+        bisect = timed(lambda: self.completer.complete(lead), 20)
+        self.report('prefix completion', linear=linear, bisect=bisect)
+        self.completer.complete(lead).should.have.length_of(11)
+        bisect.should.be.lower_than(linear)
+
+    def fuzzy(self) -> None:
+        fuzzy = timed(lambda: self.completer.complete('t42p17'), 5)
+        self.report('fuzzy completion', fuzzy=fuzzy)
+        self.completer.complete('t42p17').head.should.contain('tpe42/pro17')
+
+__all__ = ('CompleterBench',)
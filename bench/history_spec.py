@@ -0,0 +1,122 @@
+import shutil
+import subprocess
+from pathlib import Path
+from itertools import takewhile
+
+from dulwich.objects import Blob, Tree, Commit
+
+from amino.test import temp_dir
+
+from proteome.git.repo import DulwichRepo
+from proteome.git.snapshot import Snapshot
+from proteome.git.commit_index import CommitIndex, index_name
+
+from bench._support.spec import BenchSpec, timed
+
+
+class StagingBench(BenchSpec):
+    '''staging a worktree in process and with `git add -A`'''
+
+    def _worktree(self, dirs: int, files: int) -> Path:
+        worktree = temp_dir('bench', 'history', 'worktree{}'.format(dirs * files))
+        for d in range(dirs):
+            sub = worktree / 'dir{}'.format(d)
+            sub.mkdir(exist_ok=True)
+            for f in range(files):
+                (sub / 'file{}'.format(f)).write_text('content {} {}'.format(d, f))
+        return worktree
+
+    def _store(self, worktree: Path, name: str) -> DulwichRepo:
+        store = Path(temp_dir('bench', 'history', '{}_{}'.format(worktree.name, name)))
+        shutil.rmtree(str(store))
+        return DulwichRepo.create(worktree, store)
+
+    def _git(self, repo: DulwichRepo, worktree: Path) -> None:
+        args = ['git', '--git-dir', repo.controldir(), '--work-tree', str(worktree), 'add', '-A', '.']
+        subprocess.run(args, check=True, cwd=str(worktree))
+
+    def _compare(self, dirs: int, files: int) -> None:
+        worktree = self._worktree(dirs, files)
+        count = dirs * files
+        native_repo = self._store(worktree, 'native')
+        git_repo = self._store(worktree, 'git')
+        native_cold = timed(lambda: Snapshot(native_repo).scan())
+        git_cold = timed(lambda: self._git(git_repo, worktree))
+        native_warm = timed(lambda: Snapshot(native_repo).scan(), 3)
+        git_warm = timed(lambda: self._git(git_repo, worktree), 3)
+        (worktree / 'dir0' / 'file0').write_text('changed')
+        native_change = timed(lambda: Snapshot(native_repo).scan())
+        git_change = timed(lambda: self._git(git_repo, worktree))
+        self.report('stage {} files, initial'.format(count), native=native_cold, git=git_cold)
+        self.report('stage {} files, unchanged'.format(count), native=native_warm, git=git_warm)
+        self.report('stage {} files, one change'.format(count), native=native_change, git=git_change)
+        len(native_repo.open_index()).should.equal(count)
+        native_repo.open_index().commit(native_repo.object_store).should.equal(
+            git_repo.open_index().commit(git_repo.object_store))
+
+    def small(self) -> None:
+        self._compare(4, 100)
+
+    def large(self) -> None:
+        self._compare(250, 200)
+
+
+class NavigationBench(BenchSpec):
+    '''moving through a history by walking it from master and with the commit index'''
+
+    def _history(self, count: int) -> DulwichRepo:
+        store = Path(temp_dir('bench', 'history', 'navigation{}'.format(count)))
+        shutil.rmtree(str(store))
+        repo = DulwichRepo.create(Path(temp_dir('bench', 'history', 'navigation_worktree')), store)
+        objects = []
+        parents = []
+        for i in range(count):
+            blob = Blob.from_string('content {}'.format(i).encode())
+            tree = Tree()
+            tree.add(b'file', 0o100644, blob.id)
+            commit = Commit()
+            commit.tree = tree.id
+            commit.parents = parents
+            commit.author = commit.committer = b'proteome <proteome@localhost>'
+            commit.commit_time = commit.author_time = i
+            commit.commit_timezone = commit.author_timezone = 0
+            commit.message = str(i).encode()
+            objects.extend([blob, tree, commit])
+            parents = [commit.id]
+        repo.object_store.add_objects([(a, None) for a in objects])
+        repo.refs[b'refs/heads/master'] = parents[0]
+        return repo
+
+    def _walk_child(self, repo: DulwichRepo, id: bytes) -> bytes:
+        walker = repo.get_walker(include=[repo.head()])
+        return list(takewhile(lambda a: a.commit.id != id, walker))[::-1][0].commit.id
+
+    def _walk_position(self, repo: DulwichRepo, id: bytes) -> int:
+        return [a.commit.id for a in repo.get_walker(include=[repo.head()])].index(id)
+
+    def _compare(self, count: int) -> None:
+        repo = self._history(count)
+        head = repo.head().decode()
+        middle = repo[repo.head()]
+        for i in range(count // 2):
+            middle = repo[middle.parents[0]]
+        target = middle.id.decode()
+        index = CommitIndex(Path(repo.controldir()) / index_name)
+        walk_child = timed(lambda: self._walk_child(repo, middle.id))
+        walk_position = timed(lambda: self._walk_position(repo, middle.id))
+        build = timed(lambda: index.line(repo, head))
+        indexed = CommitIndex(Path(repo.controldir()) / index_name)
+        load = timed(lambda: indexed.line(repo, head))
+        line = indexed.line(repo, head)
+        index_child = timed(lambda: line.child(target), 3)
+        index_position = timed(lambda: line.position(target), 3)
+        self.report('{} commits, build index'.format(count), unindexed=build, indexed=load)
+        self.report('{} commits, next'.format(count), walk=walk_child, index=index_child)
+        self.report('{} commits, position'.format(count), walk=walk_position, index=index_position)
+        line.child(target).should.contain(self._walk_child(repo, middle.id).decode())
+        line.position(target).should.contain(self._walk_position(repo, middle.id))
+
+    def history_10k(self) -> None:
+        self._compare(10000)
+
+__all__ = ('StagingBench', 'NavigationBench')
@@ -0,0 +1,40 @@
+from amino import List, Map, Just
+from amino.test import temp_dir
+
+from proteome.project import Resolver, ProjectLoader
+from proteome.addable import AddableCache
+from proteome.components.unite.stream import CandidateCursors, default_page_size
+
+from bench._support.spec import BenchSpec, timed
+
+
+class UniteStreamBench(BenchSpec):
+    '''time to the first addable candidate with 20 types and 50000 projects'''
+
+    def setup(self) -> None:
+        super().setup()
+        self.base = temp_dir('bench', 'unite')
+        for tpe in range(20):
+            for name in range(2500):
+                (self.base / 'tpe{}'.format(tpe) / 'pro{}'.format(name)).mkdir(parents=True, exist_ok=True)
+        resolver = Resolver(List(self.base), Map())
+        self.loader = ProjectLoader(self.base / 'conf', resolver, cache=AddableCache(granularity=0))
+        self.main = Just('tpe0')
+
+    def first_candidate(self) -> None:
+        cursors = CandidateCursors()
+        self.loader.all_ident(self.main)
+        def eager() -> list:
+            return self.loader.all_ident(self.main).map(lambda a: dict(word=a))
+        def stream() -> List[str]:
+            cursor = cursors.open(self.loader.iter_all_ident(self.main))
+            page = cursors.page(cursor, default_page_size)[0].map(lambda a: dict(word=a))
+            cursors.close(cursor)
+            return page
+        eager_time = timed(eager, 5)
+        stream_time = timed(stream, 5)
+        self.report('first unite candidate', eager=eager_time, stream=stream_time)
+        stream().should.have.length_of(default_page_size)
+        stream_time.should.be.lower_than(eager_time)
+
+__all__ = ('UniteStreamBench',)
@@ -8,7 +8,7 @@ from kallikrein import unsafe_kf
 from amino.util.random import Random
 
 from proteome.project import Project
-from proteome.components.history import History
+from proteome.components.history.data import History
 
 from integration._support.base import DefaultSpec
 
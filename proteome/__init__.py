@@ -1,6 +1,8 @@
+from proteome.profile import startup_profile
+
 import neovim
 
-from amino import List, Map, __, _
+from amino import List, Map, _
 
 from toolz import merge
 
@@ -8,35 +10,44 @@ from ribosome import command, msg_command, json_msg_command, AutoPlugin, functio
 from ribosome.unite import mk_unite_candidates, mk_unite_action
 from ribosome.unite.plugin import unite_plugin
 from ribosome.settings import Config, RequestHandler
+from ribosome.machine.messages import Stage4
 
 from proteome.components.core import (AddByParams, Show, Create, SetProject, Next, Prev, Save, RemoveByIdent, BufEnter,
-                                      CloneRepo)
+                                      CloneRepo, Added, BufWritten, Removed)
 from proteome.components.history.messages import (HistoryPrev, HistoryNext, HistoryStatus, HistoryLog, HistoryBrowse,
                                                   HistoryBrowseInput, HistorySwitch, HistoryPick, HistoryRevert,
-                                                  HistoryFileBrowse)
-from proteome.components.history.main import HistoryComponent
+                                                  HistoryFileBrowse, HistoryStats, HistoryInit)
 from proteome.components.unite import UniteSelectAdd, UniteSelectAddAll, UniteProjects, UniteNames, Plugin as Unite
+from proteome.components.unite.stream import mk_unite_stream, unite_page
 from proteome.components.config import Config as ConfigC
 from proteome.env import Env
-from proteome.components.ctags.main import Ctags
 from proteome.components.core.main import Core
 from proteome.settings import ProteomeSettings
 from proteome.components.core.message import Load
+from proteome.state import ProteomeRootMachine, lazy_component
 
 unite_candidates = mk_unite_candidates(UniteNames)
 unite_action = mk_unite_action(UniteNames)
+unite_stream = mk_unite_stream(UniteNames)
 
 
 addable = dict(complete='customlist,ProCompleteAddableProjects')
 projects = dict(complete='customlist,ProCompleteProjects')
 
 
+History = lazy_component('proteome.components.history.main.HistoryComponent',
+                         messages=List('proteome.components.history.messages'),
+                         triggers=List(Save, BufWritten, BufEnter, Removed), init=List(HistoryInit()))
+Ctags = lazy_component('proteome.components.ctags.main.Ctags', messages=List('proteome.components.ctags.messages'),
+                       triggers=List(Save, Added, BufEnter, Stage4))
+
+
 def mk_config(**override) -> Config:
     defaults = dict(
         name='proteome',
         prefix='pro',
         state_type=Env,
-        components=Map(ctags=Ctags, core=Core, config=ConfigC, history=HistoryComponent, unite=Unite),
+        components=Map(ctags=Ctags, core=Core, config=ConfigC, history=History, unite=Unite),
         settings=ProteomeSettings(),
         request_handlers=List(
             RequestHandler.json_msg_cmd(AddByParams)('Add', bang=True, **addable),
@@ -55,6 +66,20 @@ config = mk_config()
 @unite_plugin('pro')
 class ProteomeNvimPlugin(AutoPlugin):
 
+    def create_root(self) -> ProteomeRootMachine:
+        return ProteomeRootMachine(self.vim.proxy, self.config, self.plugin_name)
+
+    @command()
+    def pro_startup_profile(self):
+        List.wrap(startup_profile.report()).foreach(self.log.info)
+
+    @command()
+    def pro_stats(self):
+        stats = self.root.stats
+        stats.report().foreach(self.log.info)
+        if stats.enabled:
+            self.vim.vars.set_p('stats_data', stats.data)
+
     @command()
     def pro_plug(self, plug_name, cmd_name, *args):
         self.root.plug_command(plug_name, cmd_name, args)
@@ -66,12 +91,12 @@ class ProteomeNvimPlugin(AutoPlugin):
     @neovim.function('ProCompleteProjects', sync=True)
     def pro_complete_projects(self, args):
         lead, line, pos = args
-        return self.root.data.projects.idents.filter(__.startswith(lead))
+        return self.root.data.projects.completer.complete(lead)
 
     @neovim.function('ProCompleteAddableProjects', sync=True)
     def pro_complete_addable_projects(self, args):
         lead, line, pos = args
-        return self.root.data.addable.filter(__.startswith(lead))
+        return self.root.data.addable_completer.complete(lead)
 
     @msg_command(RemoveByIdent, **projects)
     def pro_remove(self):
@@ -106,6 +131,10 @@ class ProteomeNvimPlugin(AutoPlugin):
     def buf_enter(self):
         self.root.send(BufEnter(self.vim.buffer.proxy))
 
+    @neovim.autocmd('BufWritePost', eval='expand("<afile>:p")')
+    def buf_written(self, path):
+        self.root.send(BufWritten(path))
+
     @json_msg_command(CloneRepo)
     def pro_clone(self):
         pass
@@ -126,6 +155,10 @@ class ProteomeNvimPlugin(AutoPlugin):
     def pro_history_log(self):
         pass
 
+    @msg_command(HistoryStats)
+    def pro_history_stats(self):
+        pass
+
     @msg_command(HistoryBrowse)
     def pro_history_browse(self):
         pass
@@ -162,13 +195,17 @@ class ProteomeNvimPlugin(AutoPlugin):
     def projects(self):
         pass
 
-    @unite_candidates('addable')
+    @unite_stream('addable')
     def pro_unite_addable(self, args):
-        return self.root.data.main_addable
+        return self.root.data.main_addable_stream
 
-    @unite_candidates('all_addable')
+    @unite_stream('all_addable')
     def pro_unite_all_addable(self, args):
-        return self.root.data.addable
+        return self.root.data.addable_stream
+
+    @neovim.function(UniteNames.page, sync=True)
+    def pro_unite_page(self, args):
+        return unite_page(*args)
 
     @unite_candidates('projects')
     def pro_unite_projects(self, args):
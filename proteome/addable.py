@@ -0,0 +1,183 @@
+import time
+import threading
+from pathlib import Path
+from typing import Callable, Any, Tuple
+
+from amino import List, Map, Maybe, Empty, Try, L, _
+
+from proteome.logging import Logging
+from proteome.scan import Scanner, default_scanner, subdir_names
+from proteome.complete import Completer
+
+
+class CachedDir(object):
+
+    def __init__(self, mtime: int, names: List[str], racy: bool) -> None:
+        self.mtime = mtime
+        self.names = names
+        self.racy = racy
+
+    def valid(self, mtime: int) -> bool:
+        return not self.racy and mtime == self.mtime
+
+
+def _mtime(path: Path) -> Maybe[int]:
+    return Try(lambda: path.stat().st_mtime_ns).to_maybe
+
+
+class AddableCache(Logging):
+    ''' subdirectory names of project base dirs, keyed by directory path.
+    A directory is only listed again when its mtime changed since the last scan, so a refresh costs one stat per base
+    and type dir as long as nothing was added or removed.
+    Listings made within `granularity` seconds of the directory's mtime are considered racy and rescanned on the next
+    access, since coarse file system timestamps could hide a subsequent modification.
+    Ident lists that were validated less than `ttl` seconds ago are returned without any file system access, so that
+    consecutive completion requests don't stat the base dirs on every keystroke.
+    If an `IndexStore` is attached, listings missing from memory are taken from it if their mtime is still current,
+    and fresh listings are written to it.
+    '''
+
+    def __init__(self, granularity: float=2.0, ttl: float=1.0) -> None:
+        self.granularity = granularity
+        self.ttl = ttl
+        self.scans = 0
+        self.generation = 0
+        self._dirs = dict()  # type: dict
+        self._idents = dict()  # type: dict
+        self._completers = dict()  # type: dict
+        self._preload = None  # type: threading.Thread
+        self._lock = threading.Lock()
+        self.store = Empty()  # type: Maybe
+
+    def names(self, path: Path) -> List[str]:
+        return _mtime(path).cata(L(self._names)(path, _), lambda: self._missing(path))
+
+    def _missing(self, path: Path) -> List[str]:
+        with self._lock:
+            if self._dirs.pop(path, None) is not None:
+                self.generation += 1
+        return List()
+
+    def _names(self, path: Path, mtime: int) -> List[str]:
+        cached = self._dirs.get(path)
+        return (
+            cached.names
+            if cached is not None and cached.valid(mtime) else
+            self._stored(path, mtime) | (lambda: self._scan(path, mtime))
+        )
+
+    def _stored(self, path: Path, mtime: int) -> Maybe[List[str]]:
+        def load(stored: Tuple[int, List[str]]) -> List[str]:
+            names = stored[1]
+            with self._lock:
+                self.generation += 1
+                self._dirs[path] = CachedDir(mtime, names, False)
+            return names
+        return (
+            self.store
+            .flat_map(lambda a: a.dir(path))
+            .filter(lambda a: a[0] == mtime and not self._racy(mtime))
+            .map(load)
+        )
+
+    def _racy(self, mtime: int) -> bool:
+        return time.time() - mtime / 1e9 < self.granularity
+
+    def _scan(self, path: Path, mtime: int) -> List[str]:
+        names = subdir_names(path)
+        racy = self._racy(mtime)
+        if not racy:
+            self.store.foreach(lambda a: a.store_dir(path, mtime, names))
+        with self._lock:
+            previous = self._dirs.get(path)
+            if previous is None or previous.names != names:
+                self.generation += 1
+            self._dirs[path] = CachedDir(mtime, names, racy)
+            self.scans += 1
+        return names
+
+    def idents(self, bases: List[Path], types: Map[Path, List[str]], scanner: Scanner=default_scanner
+               ) -> List[str]:
+        ''' list base and type base dirs concurrently, then the type dirs found in the bases.
+        If no listing changed since the last call with the same dirs, the previous result is returned as is.
+        '''
+        key = bases, types.to_list
+        checked = self._idents.get(key)
+        if checked is not None and checked[0] == self.generation and time.time() - checked[2] < self.ttl:
+            return checked[1]
+        type_bases = types.to_list
+        listings = scanner.map(self.names, bases + type_bases.map(lambda a: a[0]))
+        base_listings, type_listings = listings.take(bases.length), listings.drop(bases.length)
+        base_types = bases.zip(base_listings).flat_map2(lambda base, tpes: tpes.map(lambda t: (t, base / t)))
+        type_dir_listings = scanner.map(lambda a: self.names(a[1]), base_types)
+        generation = self.generation
+        now = time.time()
+        cached = self._idents.get(key)
+        if cached is not None and cached[0] == generation:
+            self._idents[key] = generation, cached[1], now
+            return cached[1]
+        in_bases = base_types.zip(type_dir_listings).flat_map2(
+            lambda a, names: names.map(L('{}/{}'.format)(a[0], _)))
+        in_types = type_bases.zip(type_listings).flat_map2(
+            lambda a, names: a[1].flat_map(lambda t: names.map(L('{}/{}'.format)(t, _))))
+        idents = in_bases + in_types
+        self._idents[key] = generation, idents, now
+        return idents
+
+    def current_idents(self, bases: List[Path], types: Map[Path, List[str]]) -> Maybe[List[str]]:
+        ''' the last ident list computed for these dirs, without validating it.
+        '''
+        return Maybe(self._idents.get((bases, types.to_list))).map(lambda a: a[1])
+
+    def completer(self, idents: List[str], main: Maybe[str], build: Callable[[], List[str]]) -> Completer:
+        ''' completion index for the result of `build`, which is derived from `idents`.
+        It is kept until `idents` is replaced by a new scan result.
+        '''
+        key = main | None
+        cached = self._completers.get(key)
+        if cached is not None and cached[0] is idents:
+            return cached[1]
+        completer = Completer(build())
+        self._completers[key] = idents, completer
+        return completer
+
+    @property
+    def preloading(self) -> bool:
+        thread = self._preload
+        return thread is not None and thread.is_alive()
+
+    def preload(self, build: Callable[[], Any]) -> None:
+        ''' run `build` on a daemon thread, unless a preload is already in progress.
+        '''
+        def run() -> None:
+            start = time.time()
+            try:
+                build()
+            except Exception as e:
+                self.log.caught_exception('preloading addable projects', e)
+            else:
+                self.log.debug('preloaded addable projects in {:.3f}s'.format(time.time() - start))
+        with self._lock:
+            if self.preloading:
+                return
+            self._preload = threading.Thread(target=run, name='proteome_preload', daemon=True)
+            self._preload.start()
+
+    def invalidate(self, path: Maybe[Path]=Empty()) -> None:
+        ''' drop the cached listing of `path` and all directories below it, or everything if no path is given.
+        '''
+        def below(a: Path) -> bool:
+            return path.exists(lambda p: a == p or p in a.parents)
+        self.store.foreach(lambda a: a.drop_dirs(path))
+        with self._lock:
+            self.generation += 1
+            self._idents.clear()
+            if path.present:
+                List.wrap(self._dirs.keys()).filter(below).foreach(self._dirs.pop)
+            else:
+                self._dirs.clear()
+
+
+addable_cache = AddableCache()
+
+__all__ = ('AddableCache', 'addable_cache')
@@ -0,0 +1,64 @@
+import re
+from bisect import bisect_left
+from typing import Iterable, Tuple
+
+from amino import List, Maybe, Empty, Just
+
+_max_char = chr(0x10ffff)
+
+
+def _match_from(lead: str, candidate: str, start: int) -> Maybe[int]:
+    pos = start
+    gaps = 0
+    for char in lead[1:]:
+        found = candidate.find(char, pos + 1)
+        if found < 0:
+            return Empty()
+        gaps += found - pos - 1
+        pos = found
+    return Just(gaps)
+
+
+def subsequence_score(lead: str, candidate: str) -> Maybe[Tuple[int, int, int, int]]:
+    ''' rank `candidate` by how well the characters of `lead` match it in order.
+    Lower is better, comparing the number of characters skipped between matches, whether the match starts at the
+    beginning of the name part of an ident, the position of the first match and the candidate's length.
+    Each occurrence of the first character is tried as the start of the match.
+    '''
+    if not lead:
+        return Just((0, 0, 0, len(candidate)))
+    name_start = candidate.rfind('/') + 1
+    starts = List.wrap(i for i, c in enumerate(candidate) if c == lead[0])
+    scores = starts.flat_map(
+        lambda start: _match_from(lead, candidate, start)
+        .map(lambda gaps: (gaps, 0 if start in (0, name_start) else 1, start, len(candidate)))
+        .to_list
+    )
+    return scores.sort().head
+
+
+class Completer(object):
+    ''' sorted, distinct idents for completion.
+    Prefix matches are located by binary search; if there are none, the idents containing the lead as a subsequence
+    are ranked.
+    '''
+
+    def __init__(self, idents: Iterable[str]) -> None:
+        self.idents = List.wrap(sorted(set(idents)))
+
+    def prefix(self, lead: str) -> List[str]:
+        start = bisect_left(self.idents, lead)
+        end = bisect_left(self.idents, lead + _max_char, start)
+        return self.idents[start:end]
+
+    def fuzzy(self, lead: str) -> List[str]:
+        pattern = re.compile('.*?'.join(map(re.escape, lead)))
+        candidates = List.wrap(filter(pattern.search, self.idents))
+        scored = candidates.flat_map(lambda a: subsequence_score(lead, a).map(lambda s: (s, a)).to_list)
+        return scored.sort_by(lambda a: a[0]).map(lambda a: a[1])
+
+    def complete(self, lead: str) -> List[str]:
+        matches = self.prefix(lead)
+        return self.fuzzy(lead) if matches.is_empty else matches
+
+__all__ = ('subsequence_score', 'Completer')
@@ -1,7 +1,7 @@
 from proteome.components.core.message import (Add, RemoveByIdent, Create, Next, Prev, SetProject, SetProjectIdent,
                                            SetProjectIndex, SwitchRoot, Save, Added, Removed, ProjectChanged, BufEnter,
-                                           Initialized, MainAdded, Show, AddByParams, CloneRepo)
+                                           BufWritten, Initialized, MainAdded, Show, AddByParams, CloneRepo)
 
 __all__ = ('Add', 'RemoveByIdent', 'Create', 'Next', 'Prev', 'SetProject', 'SetProjectIdent', 'SetProjectIndex',
-           'SwitchRoot', 'Save', 'Added', 'Removed', 'ProjectChanged', 'BufEnter', 'Initialized', 'MainAdded', 'Show',
-           'AddByParams', 'CloneRepo')
+           'SwitchRoot', 'Save', 'Added', 'Removed', 'ProjectChanged', 'BufEnter', 'BufWritten', 'Initialized',
+           'MainAdded', 'Show', 'AddByParams', 'CloneRepo')
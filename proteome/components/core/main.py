@@ -19,7 +19,7 @@ from ribosome.machine.state_a import store_json_data, load_json_data
 from ribosome.machine.message_base import Message
 
 from proteome.project import Project, mkpath
-from proteome.git import Git
+from proteome.index_store import attach_index_store
 from proteome.components.core.message import (Add, RemoveByIdent, Create, Next, Prev, SetProject, SetProjectIdent,
                                               SetProjectIndex, SwitchRoot, Added, Removed, ProjectChanged, BufEnter,
                                               Initialized, MainAdded, Show, AddByParams, CloneRepo, Save, Load)
@@ -75,7 +75,9 @@ class Core(Component):
 
     @may_handle(Stage1)
     def stage_1(self):
+        attach_index_store(self.data.index_store)
         main = self.data.analyzer(self.vim).main
+        self.data.loader.preload(main.tpe)
         return Add(main), MainAdded().pub
 
     @trans.one(Stage2, trans.st, trans.m)
@@ -265,11 +267,12 @@ class Core(Component):
         )
 
     @property
-    def cloner(self) -> Git:
+    def cloner(self):
         return self._cloner
 
     @lazy
-    def _cloner(self) -> Git:
+    def _cloner(self):
+        from proteome.git import Git
         return Git(self.vim)
 
     async def _clone_repo(self, url: str, target):
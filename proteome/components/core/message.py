@@ -15,6 +15,7 @@ Added = message('Added', 'project')
 Removed = message('Removed', 'project')
 ProjectChanged = message('ProjectChanged', 'project')
 BufEnter = message('BufEnter', 'buffer')
+BufWritten = message('BufWritten', 'path')
 Initialized = message('Initialized')
 MainAdded = message('MainAdded')
 Show = message('Show', varargs='names')
@@ -22,5 +23,5 @@ AddByParams = json_message('AddByParams', 'ident')
 CloneRepo = json_message('CloneRepo', 'uri')
 
 __all__ = ('Add', 'RemoveByIdent', 'Create', 'Next', 'Prev', 'SetProject', 'SetProjectIdent', 'SetProjectIndex',
-           'SwitchRoot', 'Save', 'Load', 'Added', 'Removed', 'ProjectChanged', 'BufEnter', 'Initialized', 'MainAdded',
-           'Show', 'AddByParams', 'CloneRepo')
+           'SwitchRoot', 'Save', 'Load', 'Added', 'Removed', 'ProjectChanged', 'BufEnter', 'BufWritten', 'Initialized',
+           'MainAdded', 'Show', 'AddByParams', 'CloneRepo')
@@ -1,4 +1,10 @@
-from proteome.components.history.data import History, HistoryT
-from proteome.components.history.process import HistoryGit
+from proteome.components.history.messages import (Commit, CommitCurrent, HistorySwitch, HistorySwitchFile, HistoryPrev,
+                                                  HistoryNext, HistoryBufferPrev, HistoryBufferNext, HistoryStatus,
+                                                  HistoryLog, HistoryStats, HistoryBrowse, HistoryFileBrowse,
+                                                  HistoryBrowseInput, HistoryPick, HistoryRevert, Redraw, QuitBrowse,
+                                                  BrowsePage, ExecPick, RevertAbort)
 
-__all__ = ('History', 'HistoryT', 'HistoryGit')
+__all__ = ('Commit', 'CommitCurrent', 'HistorySwitch', 'HistorySwitchFile', 'HistoryPrev', 'HistoryNext',
+           'HistoryBufferPrev', 'HistoryBufferNext', 'HistoryStatus', 'HistoryLog', 'HistoryStats', 'HistoryBrowse',
+           'HistoryFileBrowse', 'HistoryBrowseInput', 'HistoryPick', 'HistoryRevert', 'Redraw', 'QuitBrowse', 'BrowsePage',
+           'ExecPick', 'RevertAbort')
@@ -0,0 +1,95 @@
+import time
+import asyncio
+import threading
+from pathlib import Path
+from typing import Callable, Any, Awaitable, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+from amino import List, Maybe, Empty
+
+from ribosome.record import Record, field, maybe_field
+
+from proteome.logging import Logging
+from proteome.pools import pool, default_workers
+from proteome.project import Project
+from proteome.git import Repo, RepoState
+
+
+class CommitResult(Record):
+    project = field(Project)
+    state = maybe_field(RepoState)
+    duration = field(float)
+
+
+class RepoLocks(object):
+    ''' one lock per history repo, so that overlapping commits of the same project are serialized.
+    Acquiring is polled from the event loop, since a waiting coroutine must neither block the loop nor occupy a pool
+    thread that the lock's holder may need.
+    '''
+
+    def __init__(self, interval: float=0.01) -> None:
+        self.interval = interval
+        self._locks = dict()  # type: dict
+        self._lock = threading.Lock()
+
+    def lock(self, path: Path) -> threading.Lock:
+        with self._lock:
+            if path not in self._locks:
+                self._locks[path] = threading.Lock()
+            return self._locks[path]
+
+    async def acquire(self, path: Path) -> threading.Lock:
+        lock = self.lock(path)
+        while not lock.acquire(blocking=False):
+            await asyncio.sleep(self.interval)
+        return lock
+
+
+repo_locks = RepoLocks()
+
+
+class CommitPool(Logging):
+    ''' commits multiple history repos concurrently.
+    At most `workers` projects are processed at the same time; the blocking dulwich parts of a commit run on a shared
+    thread pool of that size, while git subprocesses are awaited on the event loop.
+    Each project's commit holds the lock of its repo in `repo_locks`.
+    '''
+
+    def __init__(self, workers: int=default_workers) -> None:
+        self.workers = max(workers, 1)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        return pool('commit', self.workers)
+
+    async def run(self, f: Callable[..., Any], *a: Any) -> Any:
+        ''' execute the blocking function `f` on the pool.
+        '''
+        return await asyncio.get_event_loop().run_in_executor(self.executor, f, *a)
+
+    async def _commit(self, sem: asyncio.Semaphore, f: Callable[[Project, Repo], Awaitable[Maybe[RepoState]]],
+                      data: Tuple[Project, Repo]) -> CommitResult:
+        project, repo = data
+        async with sem:
+            lock = await repo_locks.acquire(repo.base)
+            start = time.perf_counter()
+            try:
+                state = await f(project, repo)
+            except Exception as e:
+                self.log.caught_exception('committing {}'.format(project.ident), e)
+                state = Empty()
+            finally:
+                lock.release()
+            duration = time.perf_counter() - start
+        self.log.debug('committed {} in {:.4f}s'.format(project.ident, duration))
+        return CommitResult(project=project, state=state, duration=duration)
+
+    async def commit(self, candidates: List[Tuple[Project, Repo]],
+                     f: Callable[[Project, Repo], Awaitable[Maybe[RepoState]]]) -> List[CommitResult]:
+        ''' run the commit coroutine `f` for all `candidates`, in the order given.
+        '''
+        sem = asyncio.Semaphore(self.workers)
+        results = await asyncio.gather(*candidates.map(lambda a: self._commit(sem, f, a)))
+        return List.wrap(results)
+
+__all__ = ('CommitPool', 'CommitResult', 'RepoLocks', 'repo_locks')
@@ -3,24 +3,74 @@ from pathlib import Path
 
 from ribosome.record import Record, dfield
 
-from amino import Map, Maybe, Just
+from amino import Map, Maybe, Just, Empty, List
 from amino.transformer import Transformer
 
 from proteome.logging import Logging
 from proteome.project import Project
 from proteome.git import RepoT, ProjectRepoAdapter, RepoState
+from proteome.components.history.commit import CommitResult
 
 
 class HistoryState(Record):
     repos = dfield(Map())
     browse = dfield(Map())
+    written = dfield(Map())
+    checked = dfield(Map())
+    scanned = dfield(Map())
+    timings = dfield(Map())
+
+    def record_written(self, path: Path, projects: List[Project]) -> 'HistoryState':
+        ''' mark `path` as modified in each of the `projects`, which are committed by the next save.
+        '''
+        def add(written: Map, project: Project) -> Map:
+            paths = written.get(project) | List()
+            return written if path in paths else written + (project, paths.cat(path))
+        return self.set(written=projects.fold_left(self.written)(add))
+
+    def modified(self, project: Project, mtime: float) -> bool:
+        ''' whether a file of `project` with modification time `mtime` was changed after the project was last
+        committed.
+        '''
+        return self.checked.get(project).cata(lambda a: mtime > a, True)
+
+    def scan_due(self, project: Project, now: float, interval: int) -> bool:
+        return self.scanned.get(project).cata(lambda a: now - a >= interval, True)
+
+    def dirty(self, projects: List[Project], scan: List[Project]) -> List[Project]:
+        ''' the `projects` that have to be committed, which are those with recorded writes or a due full `scan`.
+        '''
+        return projects.filter(lambda a: scan.contains(a) or a in self.written)
+
+    def committed(self, results: List[CommitResult], scan: List[Project], now: float) -> 'HistoryState':
+        ''' record the results of committing, where `scan` are the projects that were fully scanned.
+        Only projects whose commit succeeded are considered clean; failed ones keep their written paths and are
+        neither marked as checked nor scanned, so they are retried on the next commit.
+        '''
+        done = results.filter(lambda a: a.state.present).map(lambda a: a.project)
+        repos = results.flat_map(lambda a: a.state.to_list).fold_map(self.repos, lambda s: (s.project, s))
+        timings = results.fold_left(self.timings)(lambda z, a: z + (a.project, a.duration))
+        written = self.written.keyfilter(lambda a: not done.contains(a))
+        checked = done.fold_left(self.checked)(lambda z, a: z + (a, now))
+        scanned = done.filter(scan.contains).fold_left(self.scanned)(lambda z, a: z + (a, now))
+        return self.set(repos=repos, written=written, checked=checked, scanned=scanned, timings=timings)
+
+
+shared_dir = '.shared'
 
 
 class History(Logging):
 
-    def __init__(self, base: Path, state: HistoryState=HistoryState()) -> None:
+    def __init__(self, base: Path, state: HistoryState=HistoryState(), shared: bool=False) -> None:
         self.base = base
         self.state = state
+        self.shared = shared
+
+    @property
+    def shared_objects(self) -> Maybe[Path]:
+        ''' the object store referenced by all repos as an alternate, if enabled.
+        '''
+        return Just(self.base / shared_dir / 'objects') if self.shared else Empty()
 
     @property
     def repos(self):
@@ -28,7 +78,7 @@ class History(Logging):
 
     def adapter(self, project: Project):
         git_dir = self.base / project.fqn
-        return ProjectRepoAdapter(project, Just(git_dir))
+        return ProjectRepoAdapter(project, Just(git_dir), self.shared_objects)
 
     def state_for(self, project: Project):
         return self.repos.get(project)
@@ -48,7 +98,7 @@ class HistoryT(Transformer[History]):
 
     def pure(self, h: Maybe[HistoryState]) -> History:  # type: ignore
         new_state = h | self.state
-        return History(self.val.base, new_state)
+        return History(self.val.base, new_state, self.val.shared)
 
     @property
     def state(self):
@@ -0,0 +1,75 @@
+import time
+import threading
+from pathlib import Path
+from typing import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from amino import List, Maybe, Empty
+
+from proteome.logging import Logging
+from proteome.git import CommitInfo
+
+default_page_size = 40
+default_flush_interval = 0.1
+
+
+class BrowseLoader(Logging):
+    ''' materializes the commits of a history browse on a worker thread and passes them to `deliver` in pages, along
+    with a flag that is set for the last page.
+    A page is delivered when it contains `page_size` commits or `flush_interval` seconds passed since the previous
+    one, so that the first entries appear quickly even if computing the later ones is slow.
+    The patch of each commit, restricted to `path` for a file browse, is computed on the way, so that it is found in
+    `diff_cache` when the commit is rendered.
+    After `cancel`, loading stops before the next commit and nothing is delivered anymore.
+    '''
+
+    def __init__(self, commits: Callable[[], Iterable[CommitInfo]],
+                 deliver: Callable[[List[CommitInfo], bool], None], path: Maybe[Path]=Empty(),
+                 page_size: int=default_page_size, flush_interval: float=default_flush_interval) -> None:
+        self.commits = commits
+        self.deliver = deliver
+        self.path = path
+        self.page_size = page_size
+        self.flush_interval = flush_interval
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def start(self) -> Future:
+        return _executor.submit(self.run)
+
+    def _deliver(self, page: list, done: bool) -> None:
+        if not self.cancelled:
+            self.deliver(List.wrap(page), done)
+
+    def run(self) -> int:
+        ''' load all commits, returning their number.
+        '''
+        count = 0
+        page = []  # type: list
+        flushed = time.perf_counter()
+        try:
+            for commit in self.commits():
+                if self.cancelled:
+                    return count
+                commit.show_diff(self.path)
+                page.append(commit)
+                count += 1
+                if len(page) >= self.page_size or time.perf_counter() - flushed >= self.flush_interval:
+                    self._deliver(page, False)
+                    page = []
+                    flushed = time.perf_counter()
+        except Exception as e:
+            self.log.caught_exception('loading history', e)
+        self._deliver(page, True)
+        return count
+
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='proteome_browse')
+
+__all__ = ('BrowseLoader', 'default_page_size', 'default_flush_interval')
@@ -1,56 +1,85 @@
+import time
+import asyncio
 from pathlib import Path
 from datetime import datetime
+from typing import Tuple
 
 from amino.lazy import lazy
-from amino import Map, __, Just, Empty, may, List, Maybe, Right, L, _
+from amino import Map, __, Just, Empty, may, List, Maybe, Right, L, _, Try
 from amino.util.numeric import try_convert_int
-from amino.async import gather_sync_flat
 from amino.io import IO
 
 from ribosome.machine.message_base import message
 from ribosome.machine.transition import may_handle, handle
-from ribosome.machine.messages import Info, Error, Stage4
-from ribosome.record import field, dfield, Record, lazy_list_field, maybe_field
+from ribosome.machine.messages import Info, Error
+from ribosome.record import field, dfield, Record, maybe_field
 from ribosome.nvim import ScratchBuilder, ScratchBuffer
 from ribosome.machine.base import UnitIO
 from ribosome.machine.state import Component
 
+from dulwich.object_store import DiskObjectStore
+
 from proteome.state import ProteomeComponent, ProteomeTransitions
-from proteome.components.core import Save
+from proteome.components.core import Save, BufWritten, BufEnter, Removed
 from proteome.logging import Logging
 from proteome.project import Project
 from proteome.git import Repo, CommitInfo
 from proteome.components.history.messages import (HistoryPrev, HistoryNext, HistoryStatus, HistoryLog, HistoryBrowse,
                                                HistoryBrowseInput, HistorySwitch, Redraw, QuitBrowse, Commit,
                                                HistoryBufferPrev, HistoryPick, HistoryRevert, HistoryFileBrowse,
-                                               HistorySwitchFile, CommitCurrent)
+                                               HistorySwitchFile, CommitCurrent, HistoryStats, BrowsePage,
+                                               HistoryInit)
 from proteome.components.history.data import History, HistoryT, HistoryState
 from proteome.components.history.process import HistoryGit
 from proteome.components.history.patch import Patch
+from proteome.components.history.commit import CommitPool
+from proteome.components.history.render import scroll, line_changes
+from proteome.components.history.loader import BrowseLoader
+from proteome.components.history.maintenance import maintenance, kib
+from proteome.git.retention import Retention
+from proteome.git.maintenance import store_usage
+from proteome.git.repo import repo_handles
 
 
 class BrowseState(Record):
     repo = field(Repo)
     current = field(int)
-    commits = lazy_list_field()
+    commits = dfield(List())
     buffer = field(ScratchBuffer)
     selected = dfield(0)
     path = maybe_field(Path)
+    top = dfield(0)
+    lines = dfield(List(''))
+    loading = dfield(True)
 
 Init = message('Init')
 
 
 class BrowseTransitions(ProteomeTransitions):
+    ''' only the commits in a window of `window_height` entries around the selection are rendered.
+    The commits arrive in pages from a `BrowseLoader`; until the first one does, a placeholder is shown.
+    Patches are shared via `diff_cache` and only the lines that differ from the previous redraw are replaced.
+    '''
+    window_height = 40
+    window_margin = 5
+    placeholder = 'loading history…'
 
     @property
     def buffer(self):
         return self.data.buffer.proxy
 
-    @lazy
-    def content(self):
-        sel = self.data.selected
-        return List.wrap(enumerate(self.data.commits[:sel + 20]))\
-            .flat_map2(lambda i, a: a.browse_format(i == sel))
+    @property
+    def top(self):
+        return scroll(self.data.top, self.data.selected, self.window_height, self.window_margin)
+
+    def _entry_lines(self, index: int, commit: CommitInfo):
+        return commit.browse_format(index == self.data.selected, self.data.path)
+
+    def content(self, top: int):
+        if self.data.loading and not self.data.commits:
+            return List(self.placeholder)
+        window = self.data.commits[top:top + self.window_height]
+        return List.wrap(enumerate(window, top)).flat_map2(self._entry_lines)
 
     @property
     def selected_commit(self):
@@ -90,11 +119,33 @@ class BrowseTransitions(ProteomeTransitions):
         self._configure_appearance()
         return Redraw()
 
+    def _set_lines(self, lines: List[str], start: int, end: int) -> None:
+        ''' `ScratchBuffer.set_content` only replaces the whole buffer, so ranges are written through the raw buffer.
+        '''
+        raw = self.buffer.buffer
+        raw.set_modifiable(True)
+        raw.set_content(lines, slice(start, end))
+        raw.set_modifiable(False)
+
     @may_handle(Redraw)
     def redraw(self):
-        self.buffer.set_content(self.content)
-        self.vim.cursor(self.data.selected + 1, 1)
+        top = self.top
+        lines = self.content(top) or List('')
+        start, end, changed = line_changes(self.data.lines, lines)
+        if start < end or changed:
+            self._set_lines(changed, start, end)
+        self.vim.cursor(self.data.selected - top + 1, 1)
         self.vim.feedkeys('zz')
+        return self.data.set(top=top, lines=lines)
+
+    @may_handle(BrowsePage)
+    def page(self):
+        ''' append a page of loaded commits, redrawing only if the window wasn't filled before.
+        '''
+        commits = self.data.commits + self.msg.commits
+        data = self.data.set(commits=commits, loading=not self.msg.done)
+        visible = len(self.data.commits) < self.data.top + self.window_height
+        return (data, Redraw()) if visible else data
 
     @handle(HistoryBrowseInput)
     def input(self):
@@ -105,7 +156,7 @@ class BrowseTransitions(ProteomeTransitions):
             's': self._switch,
             'p': self._pick,
             'r': self._revert,
-            'q': self._close_tab,
+            'q': self._quit,
         })
         return handlers.get(self.msg.keyseq).flat_map(lambda f: f())
 
@@ -118,7 +169,7 @@ class BrowseTransitions(ProteomeTransitions):
     @may
     def _select_diff(self, diff):
         index = self.data.selected + diff
-        if index >= 0 and self.data.commits.min_length(index + 1):
+        if 0 <= index < len(self.data.commits):
             return self.data.set(selected=index), Redraw()
 
     @may
@@ -131,6 +182,11 @@ class BrowseTransitions(ProteomeTransitions):
         )
         return switch.pub, q, q.pub
 
+    @may
+    def _quit(self):
+        q = QuitBrowse(self.buffer)
+        return q, q.pub
+
     @may_handle(QuitBrowse)
     def quit(self):
         if self.msg.buffer == self.buffer:
@@ -158,10 +214,15 @@ class BrowseMachine(ProteomeComponent):
 
 
 class Browse(Logging):
+    ''' a browse tab, whose commits are loaded by `loader` after the tab was initialized.
+    Its repo has a handle of its own, which is closed after loading was cancelled.
+    '''
 
-    def __init__(self, state: BrowseState, vim) -> None:
+    def __init__(self, state: BrowseState, vim, loader: BrowseLoader) -> None:
         self.state = state
+        self.loader = loader
         self.machine = BrowseMachine(vim, title='history_browse')
+        self._loading = Empty()  # type: Maybe
 
     @property
     def buffer(self):
@@ -172,7 +233,14 @@ class Browse(Logging):
         return self.state.repo
 
     def run(self):
-        return self.send(Init())
+        pub = self.send(Init())
+        self._loading = Just(self.loader.start())
+        return pub
+
+    def close(self) -> None:
+        self.loader.cancel()
+        close = lambda f: self.repo.repo.close()
+        self._loading.cata(lambda a: a.add_done_callback(close), lambda: close(None))
 
     def send(self, msg):
         result = self.machine.loop_process(self.state, msg)
@@ -204,7 +272,7 @@ class HistoryComponent(Component):
 
     @lazy
     def history(self):
-        return History(self.base, state=self.state)
+        return History(self.base, state=self.state, shared=self.data.history_shared_objects)
 
     @lazy
     def history_t(self):
@@ -248,9 +316,9 @@ class HistoryComponent(Component):
     def _repos_ro(self):
         return self.projects // self._repo_ro
 
-    @may_handle(Stage4)
-    def stage_4(self):
-        ''' initialize repository states '''
+    @may_handle(HistoryInit)
+    def history_init(self):
+        ''' initialize repository states when the component is loaded by the first history message '''
         return self._with_repos(lambda a: Just(a.state))
 
     def _switch(self, f):
@@ -302,25 +370,25 @@ class HistoryComponent(Component):
     def history_log(self):
         self._current_repo_ro / _.log_formatted % self.vim.multi_line_info
 
-    def _build_browse(self, repo, commits, path: Maybe[Path]):
+    def _build_browse(self, repo, path: Maybe[Path]):
         relpath = path // repo.relpath
         return ScratchBuilder().tab.build.unsafe_perform_io(self.vim)\
             .leffect(self._io_error)\
-            .map(lambda a: BrowseState(repo=repo, current=0,
-                                        commits=commits, buffer=a,
+            .map(lambda a: BrowseState(repo=repo, current=0, buffer=a,
                                         path=relpath))
 
-    def _browse(self, f, path: Maybe[Path]=Empty()):
-        commits = lambda r: (r, f(r))
+    def _browse(self, path: Maybe[Path]=Empty()):
+        ''' open the browse tab right away; its commits are loaded in the background by `_add_browse`.
+        '''
         return (
-            (self._current_repo_ro / commits)
-            .flat_map2(L(self._build_browse)(_, _, path=path)) /
+            self._current_repo_ro
+            .flat_map(L(self._build_browse)(_, path=path)) /
             self._add_browse
         )
 
     @handle(HistoryBrowse)
     def history_browse(self):
-        return self._browse(_.history_info)
+        return self._browse()
 
     # FIXME seems to drain lazy commit list when cycling
     @handle(HistoryFileBrowse)
@@ -328,8 +396,7 @@ class HistoryComponent(Component):
         path = Path(
             self.vim.buffer.name if self.msg.path == '' else self.msg.path)
         return self._current_repo_ro // __.relpath(path) / (
-            lambda p: self._browse(__.file_history_info(p),
-                                    path=Just(p))
+            lambda p: self._browse(path=Just(p))
         ) | Right(
             Error('current file \'{}\' not in current repo'.format(path)))
 
@@ -340,6 +407,35 @@ class HistoryComponent(Component):
     def save(self):
         return Commit()
 
+    @may_handle(Removed)
+    def removed(self):
+        repo_handles.close(self.history.adapter(self.msg.project).git_dir)
+
+    def _containing(self, path: Path) -> List[Project]:
+        return self.projects.filter(lambda a: a.root in path.parents)
+
+    def _record_written(self, path: Path, projects: List[Project]):
+        return self._with_sub(self.state.record_written(path, projects))
+
+    @may_handle(BufWritten)
+    def buf_written(self):
+        path = Path(self.msg.path)
+        return self._record_written(path, self._containing(path))
+
+    @may_handle(BufEnter)
+    def buf_enter(self):
+        ''' record the entered buffer's file if it was modified on disk after the last commit of its project, to catch
+        edits made outside of nvim.
+        The buffer is the one carried by the message, since the current one may have changed by the time the message
+        is processed.
+        '''
+        path = Path(self.msg.buffer.name)
+        mtime = Try(lambda: path.stat().st_mtime) | None
+        if path.is_absolute() and mtime is not None:
+            projects = self._containing(path).filter(lambda a: self.state.modified(a, mtime))
+            if projects:
+                return self._record_written(path, projects)
+
     @property
     def _timestamp(self):
         return datetime.now().isoformat()
@@ -365,14 +461,29 @@ class HistoryComponent(Component):
         return self._browse_for_buffer(self.msg.buffer)\
             .map(self._remove_browse)
 
+    @handle(BrowsePage)
+    def browse_page(self):
+        return self._browse_for_buffer(self.msg.buffer).map(__.send(self.msg))
+
+    def _send_async(self, msg) -> None:
+        self.machine.parent.foreach(__.send(msg))
+
     def _add_browse(self, state: BrowseState):
-        browse = Browse(state, self.vim)
+        ''' the browse's commits are read through a private repo handle on the loader's thread and sent back in
+        `BrowsePage` messages.
+        '''
+        repo = state.repo.private
+        buffer = state.buffer.buffer
+        deliver = lambda commits, done: self._send_async(BrowsePage(buffer, commits, done))
+        loader = BrowseLoader(lambda: repo.iter_history_info(state.path), deliver, state.path)
+        browse = Browse(state.set(repo=repo), self.vim, loader)
         return (
             self._with_browse(self.state.browse + (browse.repo, browse)),
             UnitIO(IO.delay(browse.run))
         )
 
     def _remove_browse(self, target: Browse):
+        target.close()
         return self._with_browse(self.state.browse - target.repo)
 
     @handle(HistoryPick)
@@ -420,22 +531,87 @@ class HistoryComponent(Component):
             await self.executor.revert_abort(project)
         return ret
 
-    async def _add_commit_coro(self, data):
-        project, repo = data
-        return await repo.add_commit_all(project, self.executor,
-                                            self._timestamp)
+    def _add_commit_coro(self, pool: CommitPool, scan: List[Project]):
+        ''' commit only the files recorded as written since the last commit, unless a full scan of the worktree is
+        due.
+        Full scans of small projects are staged in process on the pool; large projects, or those whose native staging
+        failed, are staged with `git add -A`.
+        '''
+        limit = Just(self.data.history_native_staging_limit)
+        async def fallback(project: Project, repo: Repo, msg: str, error: str):
+            self.log.debug('staging {} with git: {}'.format(project.ident, error))
+            added = await self.executor.add_all(project)
+            return (await pool.run(repo.commit_dirty, msg)) if added.success else Empty()
+        async def add_commit(project: Project, repo: Repo):
+            msg = self._timestamp
+            if scan.contains(project):
+                committed = await pool.run(repo.add_commit_worktree, msg, limit)
+                return committed.value if committed.is_right else await fallback(project, repo, msg, committed.value)
+            return await pool.run(repo.add_commit_paths, self.state.written.get(project) | List(), msg)
+        return add_commit
 
     # TODO handle broken repo
     # TODO allow specifying target
     @may_handle(Commit)
     async def commit(self):
+        ''' projects without recorded writes are skipped unless a full scan is due for them or they were requested
+        explicitly.
+        '''
         wanted = self.msg.projects
+        now = time.time()
         filt = (lambda p: not wanted or wanted.exists(p.match_ident))
-        candidates = self.projects.filter(filt).flat_pair(self._repo_ro)
-        results = await gather_sync_flat(candidates, self._add_commit_coro)
-        new_repos = results\
-            .fold_map(self.state.repos, lambda s: (s.project, s))
-        return Just(self._with_sub(self.state.set(repos=new_repos)))
+        requested = self.projects.filter(filt)
+        interval = self.data.history_scan_interval
+        scan = requested.filter(lambda a: wanted or self.state.scan_due(a, now, interval))
+        dirty = self.state.dirty(requested, scan)
+        candidates = dirty.flat_pair(self._repo_ro)
+        self.log.debug('history commit: {} of {} projects, {} full scans'.format(candidates.length,
+                                                                                requested.length, scan.length))
+        pool = CommitPool(self.data.history_commit_workers)
+        results = await pool.commit(candidates, self._add_commit_coro(pool, scan))
+        self._maintain(candidates.map(lambda a: a[1]))
+        return Just(self._with_sub(self.state.committed(results, scan, now)))
+
+    def _maintain(self, repos: List[Repo]) -> None:
+        ''' schedule thinning and packing of the committed repos in the background, without waiting for it.
+        '''
+        interval = self.data.history_gc_interval
+        limit = self.data.history_gc_loose_limit
+        retention = Retention(self.data.history_retention)
+        shared = self.history.shared_objects
+        repos.foreach(lambda a: maintenance.schedule(a, interval, limit, retention, shared))
+
+    def _stats_report(self, repos: List[Tuple[Project, Repo]]) -> List[str]:
+        def format(name, snapshots, loose, loose_bytes, packs, pack_bytes, commit) -> str:
+            return '  {:<32} {:>9} {:>7} {:>12} {:>5} {:>12} {:>8}'.format(name, snapshots, loose, loose_bytes,
+                                                                           packs, pack_bytes, commit)
+        def repo_line(project: Project, repo: Repo) -> str:
+            usage = store_usage(repo.repo.object_store)
+            snapshots = repo.line / (lambda a: len(a.ids)) | 0
+            commit = self.state.timings.get(project) / '{:.3f}s'.format | '-'
+            return format(project.ident, snapshots, usage.loose, kib(usage.loose_bytes), usage.packs,
+                          kib(usage.pack_bytes), commit)
+        header = format('project', 'snapshots', 'loose', 'loose size', 'packs', 'pack size', 'commit')
+        shared = (
+            self.history.shared_objects
+            .filter(lambda a: a.exists()) /
+            str /
+            DiskObjectStore /
+            store_usage /
+            (lambda a: 'shared store: {} packs, {}'.format(a.packs, kib(a.bytes))) |
+            'shared store: disabled'
+        )
+        return List('history repos:', header) + repos.map2(repo_line) + List(shared) + maintenance.stats.report()
+
+    @may_handle(HistoryStats)
+    async def history_stats(self):
+        ''' report the disk usage of the history repos and the results of their maintenance.
+        The stores are read on the maintenance thread.
+        '''
+        repos = self.projects.flat_pair(self._repo_ro)
+        loop = asyncio.get_event_loop()
+        lines = await loop.run_in_executor(maintenance.executor, self._stats_report, repos)
+        self.vim.multi_line_info(lines)
 
     @may_handle(CommitCurrent)
     def commit_current(self):
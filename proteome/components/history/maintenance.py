@@ -0,0 +1,135 @@
+import time
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from amino import Map, Maybe, Just, Empty, List
+
+from proteome.logging import Logging
+from proteome.git import Repo, DulwichRepo
+from proteome.git.repo import repo_handles
+from dulwich.object_store import DiskObjectStore
+
+from proteome.git.maintenance import Gc, GcResult, estimate_loose
+from proteome.git.retention import Retention, Thinning
+from proteome.git.commit_index import commit_index
+from proteome.components.history.commit import repo_locks
+
+default_gc_interval = 3600
+default_gc_loose_limit = 1000
+
+
+class GcStats(object):
+    ''' totals of all maintenance runs in this process.
+    '''
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.packed = 0
+        self.pruned = 0
+        self.dropped = 0
+        self.reclaimed = 0
+        self.deduplicated = 0
+        self.deduplicated_bytes = 0
+        self.duration = 0.0
+
+    def add(self, result: GcResult) -> None:
+        self.runs += 1
+        self.packed += result.packed
+        self.pruned += result.pruned
+        self.dropped += result.dropped
+        self.reclaimed += result.reclaimed
+        self.deduplicated += result.deduplicated
+        self.deduplicated_bytes += result.deduplicated_bytes
+        self.duration += result.duration
+
+    def report(self) -> List[str]:
+        return List(
+            'maintenance: {} runs in {:.2f}s'.format(self.runs, self.duration),
+            '  packed {} objects, pruned {}, dropped {} snapshots, reclaimed {}'.format(
+                self.packed, self.pruned, self.dropped, kib(self.reclaimed)),
+            '  deduplicated {} objects, {}'.format(self.deduplicated, kib(self.deduplicated_bytes)),
+        )
+
+
+def kib(size: int) -> str:
+    return '{:.1f} KiB'.format(size / 1024)
+
+
+class Maintenance(Logging):
+    ''' thins and collects history repos on a single background thread, so that neither the editor nor the commit pool
+    wait for it.
+    A repo is checked at most once per `interval` seconds. Its master chain is thinned according to `retention`, and
+    it is collected if snapshots were dropped or its estimated number of loose objects reaches `loose_limit`. This
+    holds the repo's lock in `repo_locks`, delaying commits to it.
+    Collection uses a handle of its own and drops the pooled one in `repo_handles` afterwards, so that the next access
+    starts with fresh pack and ref caches.
+    '''
+
+    def __init__(self) -> None:
+        self.stats = GcStats()
+        self.results = Map()
+        self._checked = dict()  # type: dict
+        self._pending = dict()  # type: dict
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        return _executor
+
+    def _due(self, base: Path, interval: int, now: float) -> bool:
+        pending = self._pending.get(base)
+        checked = self._checked.get(base)
+        return (pending is None or pending.done()) and (checked is None or now - checked >= interval)
+
+    def schedule(self, repo: Repo, interval: int, loose_limit: int, retention: Retention=Retention(List()),
+                 shared: Maybe[Path]=Empty()) -> Maybe[Future]:
+        ''' submit the maintenance of `repo` if its last check is at least `interval` seconds ago.
+        An interval of 0 disables maintenance. The repo's current commit is never dropped.
+        '''
+        now = time.time()
+        base = repo.base
+        with self._lock:
+            if interval <= 0 or not self._due(base, interval, now):
+                return Empty()
+            self._checked[base] = now
+            pinned = repo.current.to_list
+            future = self.executor.submit(self._run, base, Path(repo.repo.store), loose_limit, retention, pinned,
+                                          shared)
+            self._pending[base] = future
+            return Just(future)
+
+    def _thin(self, repo: DulwichRepo, store: Path, retention: Retention, pinned: List[str]) -> int:
+        if not retention.rules:
+            return 0
+        mapping = Thinning(repo, commit_index(store), retention, pinned).run(time.time())
+        return len(mapping) - len(set(mapping.values()))
+
+    def _run(self, base: Path, store: Path, loose_limit: int, retention: Retention, pinned: List[str],
+             shared: Maybe[Path]) -> Maybe[GcResult]:
+        try:
+            repo = DulwichRepo(store)
+            try:
+                with repo_locks.lock(base):
+                    dropped = self._thin(repo, store, retention, pinned)
+                    if not dropped and estimate_loose(repo.object_store) < loose_limit:
+                        return Empty()
+                    shared_store = shared / str / DiskObjectStore
+                    result = Gc(repo, shared=shared_store).run().set(dropped=dropped)
+                    repo_handles.invalidate(store)
+            finally:
+                repo.close()
+        except Exception as e:
+            self.log.caught_exception('collecting history repo {}'.format(store), e)
+            return Empty()
+        with self._lock:
+            self.stats.add(result)
+            self.results = self.results + (base, result)
+        self.log.debug('collected {}: {}'.format(store, result))
+        return Just(result)
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='proteome_gc')
+maintenance = Maintenance()
+
+__all__ = ('Maintenance', 'GcStats', 'kib', 'maintenance', 'default_gc_interval', 'default_gc_loose_limit')
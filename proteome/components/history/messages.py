@@ -1,5 +1,6 @@
 from ribosome.machine.message_base import message
 
+HistoryInit = message('HistoryInit')
 Commit = message('Commit', varargs='projects')
 CommitCurrent = message('CommitCurrent')
 HistorySwitch = message('HistorySwitch', 'index')
@@ -10,6 +11,7 @@ HistoryBufferPrev = message('HistoryBufferPrev')
 HistoryBufferNext = message('HistoryBufferNext')
 HistoryStatus = message('HistoryStatus')
 HistoryLog = message('HistoryLog')
+HistoryStats = message('HistoryStats')
 HistoryBrowse = message('HistoryBrowse')
 HistoryFileBrowse = message('HistoryBrowse', opt_fields=(('path', ''),))
 HistoryBrowseInput = message('HistoryBrowseInput', 'keyseq')
@@ -17,5 +19,6 @@ HistoryPick = message('HistoryPick', 'index')
 HistoryRevert = message('HistoryRevert', 'index')
 Redraw = message('Redraw')
 QuitBrowse = message('QuitBrowse', 'buffer')
+BrowsePage = message('BrowsePage', 'buffer', 'commits', 'done')
 ExecPick = message('ExecPick', 'commit', 'executor', 'status')
 RevertAbort = message('ExecPick', 'project', 'executor', 'status')
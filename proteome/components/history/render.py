@@ -0,0 +1,29 @@
+from typing import Tuple
+
+from amino import List
+
+
+def scroll(top: int, selected: int, height: int, margin: int) -> int:
+    ''' first visible index of a window of `height` entries that keeps `margin` entries around `selected` visible.
+    '''
+    if selected < top + margin:
+        return max(0, selected - margin)
+    elif selected >= top + height - margin:
+        return selected - height + margin + 1
+    return top
+
+
+def line_changes(old: List[str], new: List[str]) -> Tuple[int, int, List[str]]:
+    ''' the range of `old` that has to be replaced by the returned lines of `new` to obtain `new`, determined by
+    stripping the common prefix and suffix.
+    '''
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end = 0
+    while end < limit - start and old[-end - 1] == new[-end - 1]:
+        end += 1
+    return start, len(old) - end, List.wrap(new[start:len(new) - end])
+
+__all__ = ('scroll', 'line_changes')
@@ -18,9 +18,10 @@ class UniteProjects(UniteMessage):
 
 
 class UniteNames():
-    addable_candidates = '_proteome_unite_addable'
-    all_addable_candidates = '_proteome_unite_all_addable'
+    addable_open = '_proteome_unite_addable'
+    all_addable_open = '_proteome_unite_all_addable'
     projects_candidates = '_proteome_unite_projects'
+    page = '_proteome_unite_page'
 
     add_project = '_proteome_unite_add_project'
     delete_project = '_proteome_unite_delete_project'
@@ -12,9 +12,11 @@ from ribosome.nvim import NvimFacade, NvimIO
 
 from proteome.components.unite.data import UniteSelectAdd, UniteSelectAddAll, UniteProjects, UniteMessage
 from proteome.components.unite import UniteNames
+from proteome.components.unite.stream import AsyncUniteSource
 
-addable = UniteSource(UniteNames.addable, UniteNames.addable_candidates, UniteNames.addable, Nothing)
-all_addable = UniteSource(UniteNames.all_addable, UniteNames.all_addable_candidates, UniteNames.addable, Nothing)
+addable = AsyncUniteSource(UniteNames.addable, UniteNames.addable_open, UniteNames.page, UniteNames.addable, Nothing)
+all_addable = AsyncUniteSource(UniteNames.all_addable, UniteNames.all_addable_open, UniteNames.page,
+                               UniteNames.addable, Nothing)
 add_action = Map(name='add', handler=UniteNames.add_project, desc='add project')
 add_pro = UniteKind(UniteNames.addable, List(add_action))
 projects = UniteSource(UniteNames.projects, UniteNames.projects_candidates, UniteNames.project, Nothing)
@@ -0,0 +1,144 @@
+import json
+import threading
+from itertools import islice
+from collections import OrderedDict
+from typing import Iterable, Tuple, Callable, Any
+
+import neovim
+
+from amino import List, Maybe, L, _
+
+from ribosome.unite import UniteSource
+from ribosome.nvim import NvimFacade
+
+from proteome.logging import Logging
+
+default_page_size = 500
+
+
+class CandidateCursors(Logging):
+    ''' open candidate streams of async unite sources, consumed one page per request.
+    A stream is dropped when it is exhausted; if unite is closed before that, the least recently opened streams are
+    discarded once more than `limit` are open.
+    '''
+
+    def __init__(self, limit: int=8) -> None:
+        self.limit = limit
+        self._next = 0
+        self._cursors = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+
+    def open(self, candidates: Iterable[str]) -> int:
+        with self._lock:
+            self._next += 1
+            self._cursors[self._next] = iter(candidates)
+            while len(self._cursors) > self.limit:
+                self._cursors.popitem(last=False)
+            return self._next
+
+    def page(self, cursor: int, size: int) -> Tuple[List[str], bool]:
+        ''' the next `size` candidates of the stream and whether it is exhausted.
+        '''
+        with self._lock:
+            it = self._cursors.get(cursor)
+        if it is None:
+            return List(), True
+        chunk = List.wrap(islice(it, size))
+        done = chunk.length < size
+        if done:
+            self.close(cursor)
+        return chunk, done
+
+    def close(self, cursor: int) -> None:
+        with self._lock:
+            self._cursors.pop(cursor, None)
+
+    @property
+    def count(self) -> int:
+        return len(self._cursors)
+
+
+candidate_cursors = CandidateCursors()
+
+
+class AsyncUniteSource(UniteSource):
+    ''' unite source that delivers its candidates incrementally.
+    `gather_candidates` opens a stream via the remote function `opener` and returns its first page; unite then calls
+    `async_gather_candidates` repeatedly, which fetches the next page via `pager`, until the stream is exhausted.
+    The callbacks have to be vimscript functions, since the `is_async` flag must be set on unite's context dict.
+    '''
+
+    _async_templ = '''
+    {{
+        'name': '{}',
+        'gather_candidates': function('{}'),
+        'async_gather_candidates': function('{}'),
+        'default_kind': '{}',
+        {}
+    }}
+    '''.replace('\n', '')
+
+    _gather_templ = '''function! {gather}(args, context) abort
+let a:context.source__cursor = {opener}(a:args)
+let a:context.is_async = 1
+return {async_gather}(a:args, a:context)
+endfunction'''
+
+    _async_gather_templ = '''function! {async_gather}(args, context) abort
+let [candidates, done] = {pager}(a:context.source__cursor, {size})
+if done
+let a:context.is_async = 0
+endif
+return candidates
+endfunction'''
+
+    def __init__(self, name: str, opener: str, pager: str, kind: str, syntax: Maybe[str],
+                 page_size: int=default_page_size) -> None:
+        super().__init__(name, '{}_gather'.format(opener), kind, syntax)
+        self.opener = opener
+        self.pager = pager
+        self.async_source = '{}_async'.format(opener)
+        self.page_size = page_size
+
+    @property
+    def _func_defs_sync(self):
+        return self.syntax.to_list
+
+    @property
+    def function_defs(self) -> List[str]:
+        params = dict(gather=self.source, async_gather=self.async_source, opener=self.opener, pager=self.pager,
+                      size=self.page_size)
+        return List(self._gather_templ, self._async_gather_templ).map(lambda a: a.format(**params))
+
+    @property
+    def data(self):
+        extra = self.syntax / L(self._syntax_templ.format)(self.name, _) | ''
+        return self._async_templ.format(self.name, self.source, self.async_source, self.kind, extra)
+
+    def define(self, vim: NvimFacade) -> None:
+        self.function_defs.foreach(lambda a: vim.cmd_sync('execute {}'.format(json.dumps(a))))
+        super().define(vim)
+
+
+def unite_page(cursor: int, size: int) -> list:
+    ''' next page of the stream `cursor` in the shape expected by the async gather callback.
+    '''
+    candidates, done = candidate_cursors.page(cursor, size)
+    return [candidates.map(lambda a: dict(word=a)), 1 if done else 0]
+
+
+def mk_unite_stream(Unite: type) -> Callable[[str], Callable[[Callable], Callable]]:
+    ''' register the decorated function, which returns an iterable of candidates, as the stream opener of the async
+    source `name`.
+    '''
+    def decorator(name: str) -> Callable:
+        handler = getattr(Unite, '{}_open'.format(name))
+        def us_wrap(f: Callable) -> Callable:
+            @neovim.function(handler, sync=True)
+            def f_wrap(self: Any, args: list) -> int:
+                return candidate_cursors.open(f(self, args))
+            return f_wrap
+        return us_wrap
+    return decorator
+
+__all__ = ('CandidateCursors', 'candidate_cursors', 'AsyncUniteSource', 'unite_page', 'mk_unite_stream')
@@ -1,13 +1,19 @@
 from pathlib import Path
 import tempfile
+from typing import Iterator, Tuple
 
 from proteome.project import (Projects, Resolver, ProjectLoader, Project, ProjectAnalyzer)
 from proteome.logging import Logging
+from proteome.scan import Scanner
+from proteome.pools import default_workers
+from proteome.settings import default_history_scan_interval
+from proteome.complete import Completer
+from proteome.index_store import IndexStore
 from ribosome.settings import AutoData
 from ribosome.record import field, dfield
 from ribosome import NvimFacade
 
-from amino import List, Map, Just, Boolean, _
+from amino import List, Map, Just, Boolean, Maybe, _
 
 
 class Env(AutoData, Logging):
@@ -31,13 +37,51 @@ class Env(AutoData, Logging):
     def type_bases(self) -> Path:
         return self.settings.type_base_dirs.value_or_default.attempt(self.vim).get_or_raise
 
+    @property
+    def scan_workers(self) -> int:
+        return self.settings.scan_workers.value_or_default.attempt(self.vim).get_or_raise
+
+    @property
+    def history_scan_interval(self) -> int:
+        return self.settings.history_scan_interval.value_or_default.attempt(self.vim) | default_history_scan_interval
+
+    @property
+    def history_commit_workers(self) -> int:
+        return self.settings.history_commit_workers.value_or_default.attempt(self.vim) | default_workers
+
+    @property
+    def history_native_staging_limit(self) -> int:
+        return self.settings.history_native_staging_limit.value_or_default.attempt(self.vim) | 500
+
+    @property
+    def history_gc_interval(self) -> int:
+        return self.settings.history_gc_interval.value_or_default.attempt(self.vim) | 3600
+
+    @property
+    def history_gc_loose_limit(self) -> int:
+        return self.settings.history_gc_loose_limit.value_or_default.attempt(self.vim) | 1000
+
+    @property
+    def history_shared_objects(self) -> bool:
+        return bool(self.settings.history_shared_objects.value_or_default.attempt(self.vim) | False)
+
+    @property
+    def history_retention(self) -> List[Tuple[int, int]]:
+        return self.settings.history_retention.value_or_default.attempt(self.vim) | List()
+
+    @property
+    def index_store(self) -> Maybe[IndexStore]:
+        persist = self.settings.persist_index.value_or_default.attempt(self.vim) | False
+        dir = self.settings.state_dir.value_or_default.attempt(self.vim).to_maybe
+        return dir.filter(lambda a: persist).map(lambda a: IndexStore(a / 'index.sqlite'))
+
     @property
     def loader(self):
         return ProjectLoader(self.config_path, self.resolver)
 
     @property
     def resolver(self):
-        return Resolver(self.bases, self.type_bases)
+        return Resolver(self.bases, self.type_bases, Scanner(self.scan_workers))
 
     def __str__(self):
         return '{}({},{},{})'.format(
@@ -113,10 +157,22 @@ class Env(AutoData, Logging):
     def addable(self):
         return self.loader.all_ident(self.main_type)
 
+    @property
+    def addable_completer(self) -> Completer:
+        return self.loader.completer(self.main_type)
+
     @property
     def main_addable(self):
         return self.loader.main_ident(self.main_type)
 
+    @property
+    def addable_stream(self) -> Iterator[str]:
+        return self.loader.iter_all_ident(self.main_type)
+
+    @property
+    def main_addable_stream(self) -> Iterator[str]:
+        return self.loader.iter_main_ident(self.main_type)
+
     @property
     def main_clone_dir(self):
         temp = lambda: tempfile.mkdtemp(prefix='proteome_clone')
@@ -0,0 +1,267 @@
+import os
+import json
+import threading
+from pathlib import Path
+from typing import Iterator, Any, Tuple, Iterable
+
+from amino import List, Maybe, Just, Empty
+
+from proteome.logging import Logging
+
+index_name = 'proteome_commits'
+
+
+def path_entry(store: Any, tree: bytes, path: bytes) -> Maybe[tuple]:
+    ''' mode and sha of `path` in `tree`, reading only the subtrees along the path's components.
+    '''
+    try:
+        return Just(store[tree].lookup_path(store.__getitem__, path))
+    except KeyError:
+        return Empty()
+
+
+def path_changed(store: Any, tree: bytes, parent_tree: Maybe[bytes], path: bytes) -> bool:
+    return (
+        not parent_tree.contains(tree) and
+        path_entry(store, tree, path) != (parent_tree // (lambda a: path_entry(store, a, path)))
+    )
+
+
+class CommitEntry(object):
+    ''' metadata of a history commit, sufficient to list and filter commits without reading objects or diffing.
+    `paths` are the paths changed relative to the first parent, or all paths of a root commit.
+    '''
+    __slots__ = ('id', 'parent', 'tree', 'parent_tree', 'timestamp', 'paths', 'empty')
+
+    def __init__(self, id: str, parent: Maybe[str], tree: str, parent_tree: Maybe[str], timestamp: int,
+                 paths: List[str], empty: bool) -> None:
+        self.id = id
+        self.parent = parent
+        self.tree = tree
+        self.parent_tree = parent_tree
+        self.timestamp = timestamp
+        self.paths = paths
+        self.empty = empty
+
+    @property
+    def json(self) -> dict:
+        return dict(id=self.id, parent=self.parent | None, tree=self.tree, parent_tree=self.parent_tree | None,
+                    time=self.timestamp, paths=list(self.paths), empty=self.empty)
+
+    @staticmethod
+    def from_json(data: dict) -> 'CommitEntry':
+        return CommitEntry(data['id'], Maybe(data['parent']), data['tree'], Maybe(data['parent_tree']), data['time'],
+                           List.wrap(data['paths']), data['empty'])
+
+    @staticmethod
+    def from_commit(repo: Any, id: bytes, paths: bool=True) -> 'CommitEntry':
+        ''' read the commit `id` and its first parent from `repo`'s object store and compute the changed paths.
+        If `paths` is false, the tree diff is skipped and the entry's `paths` are empty.
+        '''
+        commit = repo[id]
+        parent = List.wrap(commit.parents).head
+        parent_tree = parent.map(lambda a: repo[a].tree)
+        changes = repo.object_store.tree_changes(parent_tree | None, commit.tree) if paths else []
+        changed = List.wrap(sorted(set(new or old for (old, new), modes, shas in changes))).map(os.fsdecode)
+        empty = bool(parent_tree.contains(commit.tree))
+        return CommitEntry(id.decode(), parent.map(lambda a: a.decode()), commit.tree.decode(),
+                           parent_tree.map(lambda a: a.decode()), commit.commit_time, changed, empty)
+
+
+class CommitLine(object):
+    ''' the first parent chain of a head commit, oldest first, with each commit's distance from the root commit.
+    Positions count from the head, like the numbers of the history log.
+    '''
+
+    def __init__(self, ids: list) -> None:
+        self.ids = ids
+        self.depths = dict((id, i) for i, id in enumerate(ids))
+
+    @property
+    def head(self) -> Maybe[str]:
+        return Just(self.ids[-1]) if self.ids else Empty()
+
+    def append(self, id: str) -> None:
+        self.depths[id] = len(self.ids)
+        self.ids.append(id)
+
+    def truncate(self, id: str) -> 'CommitLine':
+        return CommitLine(self.ids[:self.depths[id] + 1])
+
+    def position(self, id: str) -> Maybe[int]:
+        return Maybe(self.depths.get(id)).map(lambda a: len(self.ids) - 1 - a)
+
+    def at(self, position: int) -> Maybe[str]:
+        depth = len(self.ids) - 1 - position
+        return Just(self.ids[depth]) if 0 <= depth < len(self.ids) else Empty()
+
+    def child(self, id: str, n: int=1) -> Maybe[str]:
+        return self.position(id) // (lambda a: self.at(a - n))
+
+
+class CommitIndex(Logging):
+    ''' append-only sidecar file in a history repo's control dir, one json line per commit.
+    Entries are added when a commit is made; commits created before the index existed are added when they are first
+    looked up.
+    Lines appended by other instances for the same repo are read when the file has grown since the last access.
+    When the history is rewritten, the file is replaced by one containing only the entries of the new chain and the
+    mapping of the rewritten ids, which other instances detect by its changed inode.
+    '''
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._entries = dict()  # type: dict
+        self._offset = 0
+        self._ino = None  # type: int
+        self._lock = threading.Lock()
+        self._line = CommitLine([])
+        self._line_lock = threading.Lock()
+        self._rewritten = dict()  # type: dict
+
+    def _compose(self, mapping: dict) -> None:
+        self._rewritten = dict((k, mapping.get(v, v)) for k, v in self._rewritten.items())
+        self._rewritten.update(mapping)
+
+    def _read_line(self, line: bytes) -> None:
+        try:
+            data = json.loads(line.decode())
+            if 'rewritten' in data:
+                self._compose(data['rewritten'])
+            else:
+                entry = CommitEntry.from_json(data)
+                self._entries[entry.id] = entry
+        except (ValueError, KeyError, TypeError) as e:
+            self.log.debug('invalid commit index line in {}: {}'.format(self.path, e))
+
+    def _refresh(self) -> None:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return
+        size = st.st_size
+        if st.st_ino != self._ino:
+            self._entries = dict()
+            self._offset = 0
+            self._ino = st.st_ino
+        if size > self._offset:
+            with self.path.open('rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+            complete = data[:data.rfind(b'\n') + 1]
+            for line in complete.splitlines():
+                self._read_line(line)
+            self._offset += len(complete)
+
+    def _append(self, entry: CommitEntry) -> None:
+        line = '{}\n'.format(json.dumps(entry.json)).encode()
+        with self.path.open('ab') as f:
+            f.write(line)
+        self._entries[entry.id] = entry
+
+    def lookup(self, id: str) -> Maybe[CommitEntry]:
+        with self._lock:
+            if id not in self._entries:
+                self._refresh()
+            return Maybe(self._entries.get(id))
+
+    def entry(self, repo: Any, id: str) -> CommitEntry:
+        ''' the entry of the commit `id`, computed from `repo` and appended if it isn't indexed yet.
+        '''
+        with self._lock:
+            if id not in self._entries:
+                self._refresh()
+            if id not in self._entries:
+                self._append(CommitEntry.from_commit(repo, id.encode()))
+            return self._entries[id]
+
+    def chain(self, repo: Any, head: Maybe[str]) -> Iterator[CommitEntry]:
+        ''' entries of `head` and its first parents, newest first.
+        '''
+        current = head
+        while current.present:
+            entry = self.entry(repo, current | '')
+            yield entry
+            current = entry.parent
+
+    def line(self, repo: Any, head: str) -> CommitLine:
+        ''' the chain of `head`, which is kept between calls.
+        If `head` is a child of the previous head, it is appended; if it is contained in the chain, the chain is cut
+        off after it; otherwise, the chain is rebuilt from the index.
+        '''
+        with self._line_lock:
+            line = self._line
+            if not line.head.contains(head):
+                if head in line.depths:
+                    line = line.truncate(head)
+                elif line.head.present and self.entry(repo, head).parent == line.head:
+                    line.append(head)
+                else:
+                    line = CommitLine([a.id for a in self.chain(repo, Just(head))][::-1])
+                self._line = line
+            return line
+
+    def _touches(self, repo: Any, id: str, path: str) -> Tuple[CommitEntry, bool]:
+        indexed = self.lookup(id)
+        if indexed.present:
+            entry = indexed | None
+            return entry, path in entry.paths
+        entry = CommitEntry.from_commit(repo, id.encode(), paths=False)
+        parent_tree = entry.parent_tree.map(lambda a: a.encode())
+        return entry, path_changed(repo.object_store, entry.tree.encode(), parent_tree, os.fsencode(path))
+
+    def file_chain(self, repo: Any, head: Maybe[str], path: str) -> Iterator[CommitEntry]:
+        ''' entries of `head` and its first parents that changed the file `path`, newest first.
+        Indexed commits are matched by their stored paths. For commits that aren't indexed yet, only the tree entries
+        along `path` are compared with those of the parent, and no entry is appended, since that requires the full
+        tree diff.
+        '''
+        current = head
+        while current.present:
+            entry, touches = self._touches(repo, current | '', path)
+            if touches:
+                yield entry
+            current = entry.parent
+
+    def record(self, repo: Any, id: bytes) -> CommitEntry:
+        return self.entry(repo, id.decode())
+
+    def rewrite(self, mapping: dict, live: Iterable[str]) -> None:
+        ''' register the replacements of commits whose chain was rewritten, composing them with earlier ones, and
+        compact the file to the entries of the `live` commits, followed by `mapping`.
+        Entries of dropped commits are removed, so the file only grows with the history that is kept. Earlier mappings
+        are only retained in memory for the current session.
+        '''
+        with self._lock:
+            self._refresh()
+            self._compose(mapping)
+            entries = [self._entries[a] for a in live if a in self._entries]
+            lines = [json.dumps(a.json) for a in entries] + [json.dumps(dict(rewritten=mapping))]
+            data = ''.join('{}\n'.format(a) for a in lines).encode()
+            tmp = self.path.with_name('{}.tmp'.format(self.path.name))
+            with tmp.open('wb') as f:
+                f.write(data)
+            os.replace(str(tmp), str(self.path))
+            self._entries = dict((a.id, a) for a in entries)
+            self._offset = len(data)
+            self._ino = self.path.stat().st_ino
+
+    def rewritten(self, id: str) -> str:
+        with self._lock:
+            self._refresh()
+            return self._rewritten.get(id, id)
+
+
+_indexes = dict()  # type: dict
+_indexes_lock = threading.Lock()
+
+
+def commit_index(controldir: Path) -> CommitIndex:
+    ''' the process-wide index instance of the history repo at `controldir`.
+    '''
+    path = controldir / index_name
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = CommitIndex(path)
+        return _indexes[path]
+
+__all__ = ('CommitEntry', 'CommitLine', 'CommitIndex', 'commit_index', 'index_name', 'path_entry', 'path_changed')
@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Tuple, Union
+
+from amino import Either
+
+default_max_bytes = 16 * 1024 * 1024
+_entry_overhead = 64
+
+DiffKey = Tuple[bytes, bytes, Union[str, None]]
+
+
+class DiffCache(object):
+    ''' patches of tree pairs, optionally restricted to a single path, shared by all history repos.
+    Since trees are content addressed, a key `(parent_tree, target_tree, path)` identifies a patch independently of
+    the repo it was computed in.
+    The least recently used entries are evicted when the total size of the cached patches exceeds `max_bytes`.
+    '''
+
+    def __init__(self, max_bytes: int=default_max_bytes) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._patches = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+
+    def _size(self, patch: Either) -> int:
+        return _entry_overhead + patch.map(len).value_or(lambda a: 0)
+
+    def patch(self, key: DiffKey, compute: Callable[[], Either]) -> Either:
+        with self._lock:
+            if key in self._patches:
+                self.hits += 1
+                self._patches.move_to_end(key)
+                return self._patches[key]
+            self.misses += 1
+        patch = compute()
+        with self._lock:
+            if key not in self._patches:
+                self._patches[key] = patch
+                self.size += self._size(patch)
+                self._evict()
+        return patch
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes and self._patches:
+            key, patch = self._patches.popitem(last=False)
+            self.size -= self._size(patch)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._patches.clear()
+            self.size = 0
+
+    @property
+    def count(self) -> int:
+        return len(self._patches)
+
+
+diff_cache = DiffCache()
+
+__all__ = ('DiffCache', 'diff_cache', 'default_max_bytes')
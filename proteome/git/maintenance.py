@@ -0,0 +1,190 @@
+import os
+import time
+import stat
+from typing import Iterator, Tuple, Iterable
+
+from dulwich.objects import Commit, Tree, Tag, S_ISGITLINK, sha_to_hex
+
+from amino import List, Maybe, Empty
+
+from ribosome.record import Record, field, dfield
+
+from proteome.logging import Logging
+
+default_grace = 3600.0
+default_pack_limit = 16
+_sample_dir = '17'
+
+
+def _disk_usage(st: os.stat_result) -> int:
+    return st.st_blocks * 512
+
+
+class GcResult(Record):
+    packed = field(int)
+    pruned = field(int)
+    reclaimed = field(int)
+    duration = field(float)
+    dropped = dfield(0)
+    deduplicated = dfield(0)
+    deduplicated_bytes = dfield(0)
+
+
+class StoreUsage(Record):
+    loose = field(int)
+    loose_bytes = field(int)
+    packs = field(int)
+    pack_bytes = field(int)
+
+    @property
+    def bytes(self) -> int:
+        return self.loose_bytes + self.pack_bytes
+
+
+def loose_objects(store) -> Iterator[Tuple[bytes, os.stat_result]]:
+    for base in os.scandir(store.path):
+        if len(base.name) == 2 and base.is_dir():
+            for obj in os.scandir(base.path):
+                if len(obj.name) == 38:
+                    yield (base.name + obj.name).encode(), obj.stat()
+
+
+def pack_usage(store) -> int:
+    try:
+        return sum(_disk_usage(a.stat()) for a in os.scandir(store.pack_dir))
+    except FileNotFoundError:
+        return 0
+
+
+def store_usage(store) -> StoreUsage:
+    ''' number and allocated size of the loose objects and packs of `store`.
+    '''
+    loose = List.wrap(loose_objects(store))
+    return StoreUsage(loose=len(loose), loose_bytes=sum(loose.map(lambda a: _disk_usage(a[1]))),
+                      packs=len(store.packs), pack_bytes=pack_usage(store))
+
+
+def estimate_loose(store) -> int:
+    ''' approximate number of loose objects in `store`, extrapolated from one of the 256 fan-out directories like
+    `git gc --auto` does.
+    '''
+    try:
+        return len(os.listdir(os.path.join(store.path, _sample_dir))) * 256
+    except FileNotFoundError:
+        return 0
+
+
+class Gc(Logging):
+    ''' packs and prunes the object store of a history repo.
+    Loose objects that are reachable from the refs, HEAD or the index are written into a new pack. Loose objects that
+    are already packed, or that are unreachable and older than `grace` seconds, are removed; the grace period protects
+    objects of a snapshot that is being staged.
+    Traversal only descends into loose objects, since the objects referenced by a packed commit or tree have been
+    packed along with it.
+    `reclaimed` is the difference in allocated disk space, which is dominated by the per-file overhead of loose
+    objects.
+    If a `shared` store is given, which the repo references as an alternate, new objects are packed into it instead,
+    omitting those that it already contains; these are counted as deduplicated. Shared objects are never pruned, since
+    they may be used by other repos.
+    When the store contains more than `pack_limit` packs, all reachable objects are written into a single pack and the
+    other packs are removed, which also drops unreachable packed objects.
+    '''
+
+    def __init__(self, repo, grace: float=default_grace, pack_limit: int=default_pack_limit,
+                 shared: Maybe=Empty()) -> None:
+        self.repo = repo
+        self.store = repo.object_store
+        self.grace = grace
+        self.pack_limit = pack_limit
+        self.shared = shared
+
+    @property
+    def roots(self) -> List[bytes]:
+        refs = List.wrap(self.repo.get_refs().values())
+        try:
+            index = List.wrap(sha for path, sha, mode in self.repo.open_index().iterobjects())
+        except (OSError, KeyError):
+            index = List()
+        return refs + index
+
+    def reachable(self, roots: Iterable[bytes], descend=lambda sha: True) -> set:
+        ''' ids of the objects reachable from `roots`, where only objects for which `descend` is true are read.
+        Blobs and submodule entries are never read.
+        '''
+        seen = set()
+        stack = list(roots)
+        while stack:
+            sha = stack.pop()
+            if sha in seen:
+                continue
+            seen.add(sha)
+            if not descend(sha):
+                continue
+            try:
+                obj = self.store[sha]
+            except KeyError:
+                continue
+            if isinstance(obj, Commit):
+                stack.append(obj.tree)
+                stack.extend(obj.parents)
+            elif isinstance(obj, Tree):
+                for entry in obj.iteritems():
+                    if stat.S_ISDIR(entry.mode):
+                        stack.append(entry.sha)
+                    elif not S_ISGITLINK(entry.mode):
+                        seen.add(entry.sha)
+            elif isinstance(obj, Tag):
+                stack.append(obj.object[1])
+        return seen
+
+    def _write_pack(self, shas: List[bytes], target=None):
+        def data(sha: bytes) -> tuple:
+            obj = self.store[sha]
+            return obj.type_num, obj.sha().digest(), None, obj.as_raw_string()
+        return (target or self.store).add_pack_data(len(shas), (data(a) for a in shas))
+
+    def _packed(self, sha: bytes) -> bool:
+        return self.store.contains_packed(sha) or self.shared.exists(lambda a: a.contains_packed(sha))
+
+    def _remove_loose(self, shas: Iterable[bytes]) -> None:
+        for sha in shas:
+            try:
+                os.remove(self.store._get_shafile_path(sha))
+            except FileNotFoundError:
+                pass
+
+    def _consolidate(self) -> int:
+        packs = List.wrap(self.store.packs)
+        packed = set(sha_to_hex(sha) for pack in packs for sha, offset, crc in pack.index.iterentries())
+        keep = List.wrap(sorted(packed & self.reachable(self.roots)))
+        consolidated = self._write_pack(keep)
+        for pack in packs:
+            if consolidated is None or pack.name() != consolidated.name():
+                self.store._remove_pack(pack)
+        self.store._update_pack_cache()
+        return len(packed) - len(keep)
+
+    def run(self) -> GcResult:
+        start = time.perf_counter()
+        now = time.time()
+        loose = dict(loose_objects(self.store))
+        before = sum(map(_disk_usage, loose.values())) + pack_usage(self.store)
+        reachable = self.reachable(self.roots, loose.__contains__)
+        packed = set(a for a in loose if self._packed(a))
+        new = List.wrap(sorted(a for a in loose if a in reachable and a not in packed))
+        expired = set(a for a, st in loose.items() if a not in reachable and st.st_mtime < now - self.grace)
+        deduplicated = List.wrap(packed & reachable)
+        self._write_pack(new, self.shared | None)
+        self._remove_loose(new)
+        self._remove_loose(packed | expired)
+        pruned = len(expired - packed)
+        if len(self.store.packs) > self.pack_limit:
+            pruned += self._consolidate()
+        after = store_usage(self.store).bytes
+        duration = time.perf_counter() - start
+        self.log.debug('gc {}: packed {}, pruned {} in {:.4f}s'.format(self.store.path, len(new), pruned, duration))
+        return GcResult(packed=len(new), pruned=pruned, reclaimed=before - after, duration=duration,
+                        deduplicated=len(deduplicated),
+                        deduplicated_bytes=sum(deduplicated.map(lambda a: loose[a].st_size)))
+
+__all__ = ('Gc', 'GcResult', 'StoreUsage', 'estimate_loose', 'loose_objects', 'store_usage', 'default_grace', 'default_pack_limit')
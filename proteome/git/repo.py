@@ -1,8 +1,11 @@
 import io
+import os
+import stat
+import threading
 from pathlib import Path
-from itertools import takewhile
 from datetime import datetime
 from asyncio import coroutine
+from typing import Iterator, Iterable
 
 import pyrsistent
 
@@ -13,7 +16,7 @@ from dulwich.objects import Commit
 from dulwich.patch import write_object_diff
 from dulwich.index import build_file_from_blob
 
-from amino import may, List, Maybe, Map, Empty, Just, __, Left, Either, _, L
+from amino import may, List, Maybe, Empty, Just, __, Left, Right, Either, _, L, Map
 from amino.logging import Logging
 from amino.transformer import Transformer
 from amino.lazy import lazy
@@ -24,6 +27,10 @@ from ribosome.record import field, bool_field, maybe_field, Record
 from ribosome.process import JobClient
 
 from proteome.project import Project
+from proteome.git.snapshot import Snapshot
+from proteome.git.commit_index import (CommitEntry, CommitIndex, CommitLine, commit_index,
+                                       path_entry)
+from proteome.git.diff_cache import diff_cache
 
 
 _master_ref = 'refs/heads/master'
@@ -48,12 +55,38 @@ def format_since(stamp):
     return '{} ago'.format(t)
 
 
+class TreeReader(object):
+    ''' object store wrapper that keeps the objects read while diffing several files of the same tree pair, so that
+    the subtrees shared by their paths are only read once.
+    '''
+
+    def __init__(self, store) -> None:
+        self.store = store
+        self._objects = dict()  # type: dict
+
+    def __getitem__(self, id: bytes):
+        if id not in self._objects:
+            self._objects[id] = self.store[id]
+        return self._objects[id]
+
+
+def _file_entry(store, tree, path: bytes) -> tuple:
+    entry = (
+        path_entry(store, tree, path)
+        .filter(lambda a: not stat.S_ISDIR(a[0]))
+    )
+    return entry.map(lambda a: (path, a[0], a[1])) | (None, None, None)
+
+
 def file_diff(f, store, old_tree, new_tree, path):
-    changes = store.tree_changes(old_tree, new_tree)
-    for (oldpath, newpath), (oldmode, newmode), (oldsha, newsha) in changes:
-        if newpath.decode() == path:
-            write_object_diff(f, store, (oldpath, oldmode, oldsha),
-                                        (newpath, newmode, newsha))
+    ''' write the patch of the file `path` between two trees, resolving only the tree entries along `path`
+    instead of diffing the full trees.
+    '''
+    path_b = os.fsencode(path)
+    old = _file_entry(store, old_tree, path_b)
+    new = _file_entry(store, new_tree, path_b)
+    if old[1:] != new[1:]:
+        write_object_diff(f, store, old, new)
 
 
 class RepoState(Record):
@@ -71,7 +104,7 @@ class Diff(Logging):
         self.target = target
         self.parent = parent
 
-    @lazy
+    @property
     def show(self):
         return self.patch_lines
 
@@ -79,9 +112,14 @@ class Diff(Logging):
     def patch_lines(self):
         return self._patch_lines(self.patch)
 
-    @lazy
+    def _cached(self, path: Maybe[str], diff):
+        key = self.parent, self.target, path | None
+        return diff_cache.patch(key, lambda: self._patch(diff))
+
+    @property
     def patch(self):
-        return self._patch(
+        return self._cached(
+            Empty(),
             lambda f:
             porcelain.diff_tree(self.repo.repo, self.parent, self.target, f)
         )
@@ -90,12 +128,24 @@ class Diff(Logging):
         return self._patch_lines(self.file_patch(path))
 
     def file_patch(self, path: str):
-        return self._patch(
-            lambda f:
-            file_diff(f, self.repo.repo.object_store, self.parent, self.target,
-                      path)
+        return self._file_patch(self.repo.repo.object_store, str(path))
+
+    def _file_patch(self, store, path: str):
+        return self._cached(
+            Just(path),
+            lambda f: file_diff(f, store, self.parent, self.target, path)
         )
 
+    def file_patches(self, paths: List[str]) -> Map:
+        ''' patches of several files, sharing the trees read for uncached
+        paths.
+        '''
+        store = TreeReader(self.repo.repo.object_store)
+        return Map(dict(paths.map(str).map(lambda a: (a, self._file_patch(store, a)))))
+
+    def show_files(self, paths: List[str]) -> Map:
+        return self.file_patches(paths).valmap(self._patch_lines)
+
     def _patch(self, diff):
         f = io.BytesIO()
         try:
@@ -141,6 +191,13 @@ class CommitInfo(Record):
                           current=repo.current.contains(id),
                           repo=repo, diff=d)
 
+    @staticmethod
+    def from_entry(index, entry: CommitEntry, repo):
+        d = entry.parent_tree / __.encode() / L(Diff)(repo, entry.tree.encode(), _)
+        return CommitInfo(num=index, hex=entry.id, timestamp=entry.timestamp,
+                          current=repo.current.contains(entry.id),
+                          repo=repo, diff=d)
+
     @property
     def since(self):
         return format_since(self.timestamp)
@@ -168,12 +225,53 @@ class CommitInfo(Record):
         return self.diff.exists(_.empty)
 
 
+def _file_token(path: str) -> tuple:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class SerialObjectStore(DiskObjectStore):
+    ''' object store whose reads are serialized, since the pooled handle is used by several threads and pack files are
+    read through shared file objects.
+    '''
+
+    def __init__(self, *a, **kw) -> None:
+        super().__init__(*a, **kw)
+        self._lock = threading.RLock()
+
+    def get_raw(self, name):
+        with self._lock:
+            return super().get_raw(name)
+
+    def contains_packed(self, sha):
+        with self._lock:
+            return super().contains_packed(sha)
+
+    def _update_pack_cache(self):
+        with self._lock:
+            return super()._update_pack_cache()
+
+    def close(self):
+        with self._lock:
+            super().close()
+
+
 class DulwichRepo(repo.Repo, Logging):
 
     def __init__(self, store, worktree=None) -> None:
         super().__init__(str(store))
+        plain = self.object_store
+        self.object_store = SerialObjectStore(plain.path, plain.loose_compression_level,
+                                              plain.pack_compression_level)
         self.store = store
         self.bare = False
+        self._shared = set()  # type: set
+        self._shared_lock = threading.Lock()
+        self._ref_cache = dict()  # type: dict
+        self._packed_token = _file_token(self._packed_refs_path)
         if worktree is not None:
             self._init_history_files(worktree)
         (
@@ -185,6 +283,52 @@ class DulwichRepo(repo.Repo, Logging):
     def _set_worktree(self, path):
         self.path = path
 
+    def get_config(self):
+        ''' the parsed config, which is only read again if the file changed.
+        '''
+        path = os.path.join(self.controldir(), 'config')
+        token = _file_token(path)
+        cached = getattr(self, '_config', None)
+        if cached is None or cached[0] != token:
+            cached = self._config = token, super().get_config()
+        return cached[1]
+
+    @property
+    def _packed_refs_path(self) -> str:
+        return os.path.join(self.controldir(), 'packed-refs')
+
+    def _ref_token(self, names: List[bytes]) -> tuple:
+        paths = names.map(lambda a: os.path.join(self.controldir(), os.fsdecode(a)))
+        return tuple(paths.map(_file_token)) + (self._packed_token,)
+
+    def _refresh_packed_refs(self) -> None:
+        token = _file_token(self._packed_refs_path)
+        if token != self._packed_token:
+            self.refs._packed_refs = None
+            self._packed_token = token
+
+    def ref_id(self, name: bytes) -> bytes:
+        ''' the id that the ref `name` resolves to, following symbolic refs.
+        The result is cached until the file of one of the refs in the chain or the packed refs change, which also
+        catches updates by other processes.
+        The files' token is taken before resolving, for the chain of the previous lookup; if the chain turns out to be
+        different, the result is stored without a token, so that the next lookup resolves again.
+        '''
+        self._refresh_packed_refs()
+        cached = self._ref_cache.get(name)
+        names = List(name)
+        if cached is not None:
+            names, token, sha = cached
+            if token is not None and self._ref_token(names) == token:
+                return sha
+        token = self._ref_token(names)
+        chain, sha = self.refs.follow(name)
+        if sha is None:
+            raise KeyError(name)
+        chain = List.wrap(chain)
+        self._ref_cache[name] = chain, (token if chain == names else None), sha
+        return sha
+
     @property
     def excludesfile_rel(self):
         return str(Path('info') / 'exclude')
@@ -213,6 +357,22 @@ class DulwichRepo(repo.Repo, Logging):
         if f.is_file():
             self._put_named_file(self.excludesfile_rel, f.read_bytes())
 
+    def share(self, objects: Path) -> None:
+        ''' reference the object store at `objects` as an alternate, creating it if necessary.
+        Objects contained in it are read from there and need not be stored in this repo.
+        This is only checked once per handle.
+        '''
+        path = str(objects)
+        with self._shared_lock:
+            if path in self._shared:
+                return
+            if path not in self.object_store._read_alternate_paths():
+                if not (objects / 'pack').is_dir():
+                    objects.parent.mkdir(parents=True, exist_ok=True)
+                    DiskObjectStore.init(path)
+                self.object_store.add_alternate_path(path)
+            self._shared.add(path)
+
     @staticmethod
     def create(worktree: Path, store: Path):
         List.wrap(BASE_DIRECTORIES)\
@@ -238,6 +398,51 @@ class DulwichRepo(repo.Repo, Logging):
         return self[sha], mode
 
 
+class RepoHandles(Logging):
+    ''' open history repos, one per control dir, reused by all accesses in the process, which keeps their parsed
+    config, resolved refs and pack indexes.
+    A handle is reopened if its control dir was replaced. It is closed when its project is removed; after its packs
+    were rewritten, it is only dropped, since it may still be in use.
+    '''
+
+    def __init__(self) -> None:
+        self._handles = dict()  # type: dict
+        self._lock = threading.Lock()
+
+    def open(self, worktree: Path, store: Path) -> DulwichRepo:
+        token = _file_token(str(store))
+        with self._lock:
+            cached = self._handles.get(store)
+            if cached is not None and token is not None and cached[0] == token[0]:
+                return cached[1]
+            handle = DulwichRepo.at(worktree, store)
+            self._handles[store] = _file_token(str(store))[0], handle
+            return handle
+
+    def invalidate(self, store: Path) -> None:
+        with self._lock:
+            self._handles.pop(store, None)
+
+    def close(self, store: Path) -> None:
+        with self._lock:
+            cached = self._handles.pop(store, None)
+        if cached is not None:
+            cached[1].close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            handles = list(self._handles.values())
+            self._handles.clear()
+        for token, handle in handles:
+            handle.close()
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+
+repo_handles = RepoHandles()
+
+
 class Repo(Logging):
 
     def __init__(self, repo, state: RepoState) -> None:
@@ -251,17 +456,23 @@ class Repo(Logging):
     def copy(self, new_state: RepoState):
         return self.__class__(self.repo, new_state)  # type: ignore
 
+    @property
+    def private(self) -> 'Repo':
+        ''' a copy with a dulwich handle of its own instead of the pooled one, for reading on a worker thread without
+        contending for the pooled handle's object store.
+        '''
+        return self.__class__(DulwichRepo(self.repo.store), self.state)  # type: ignore
+
     def __str__(self):
         return '{}({}, {})'.format(
             self.__class__.__name__, self.repo.path, self.state)
 
     def ref(self, name):
-        return Try(lambda: self.repo.refs[name.encode()],
-                               exc=KeyError)
+        return Try(self.repo.ref_id, name.encode())
 
     @property
     def current(self):
-        return self.state.current.or_else(self._head_id)
+        return self.state.current.map(self.commit_index.rewritten).or_else(self._head_id)
 
     @property
     def current_b(self):
@@ -277,7 +488,7 @@ class Repo(Logging):
 
     @property
     def _head_id_b(self) -> Either[str, bytes]:
-        return Try(self.repo.head)
+        return Try(self.repo.ref_id, b'HEAD')
 
     @property
     def _head_id(self) -> Either[str, str]:
@@ -301,19 +512,59 @@ class Repo(Logging):
 
     @coroutine
     def add_commit_all(self, project, executor, msg):
-        if (yield from executor.add_all(project)).success and self.index_dirty:
-            return self.commit_master(msg)
+        if (yield from executor.add_all(project)).success:
+            return self.commit_dirty(msg)
         else:
             return Just(self.state)
 
+    def add_commit_paths(self, paths: List[Path], msg: str):
+        ''' stage only `paths` with the stat cache of the index and commit if the resulting tree differs from HEAD.
+        '''
+        snapshot = Snapshot(self.repo)
+        changed = snapshot.stage(paths // (lambda a: self.relpath(a).to_list) / str)
+        self.log.debug('{}: hashed {}, changed {}'.format(self.base, snapshot.hashed, changed.length))
+        return self.commit_dirty(msg)
+
+    def stage_worktree(self, limit: Maybe[int]=Empty()) -> Either[str, List[str]]:
+        ''' stage the whole worktree in process, returning the changed paths.
+        If `limit` is given, the index must be nonempty and have at most that many entries, since hashing in python
+        is slower than `git add -A` for the initial import or large trees.
+        '''
+        def stage():
+            snapshot = Snapshot(self.repo)
+            size = len(snapshot.index)
+            if limit.exists(lambda a: not 0 < size <= a):
+                return Left('{} index entries exceed the native staging limit'.format(size))
+            changed = snapshot.scan()
+            self.log.debug('{}: hashed {}, changed {}'.format(self.base, snapshot.hashed, changed.length))
+            return Right(changed)
+        return Try(stage).join
+
+    def add_commit_worktree(self, msg: str, limit: Maybe[int]=Empty()) -> Either[str, Maybe[RepoState]]:
+        return self.stage_worktree(limit) / (lambda a: self.commit_dirty(msg))
+
+    def commit_dirty(self, msg: str) -> Maybe[RepoState]:
+        if not self.index_dirty:
+            return Just(self.state)
+        committed = self.commit_master(msg)
+        committed.leffect(lambda e: self.log.error('committing {}: {}'.format(self.base, e)))
+        return committed.to_maybe
+
     @property
     def base(self):
         return Path(self.repo.path)
 
+    @property
+    def index_tree(self) -> Either[str, bytes]:
+        return Try(lambda: self.index.commit(self.repo.object_store))
+
     @property
     def index_dirty(self):
-        f = lambda: Map(self.status.staged).v.exists(bool)
-        return Try(f) | True
+        ''' whether the tree written from the index differs from HEAD's tree.
+        Unlike `status`, this doesn't read the worktree.
+        '''
+        head_tree = self.head_commit.map(_.tree)
+        return self.index_tree.map(lambda a: head_tree.cata(lambda e: True, lambda t: a != t)) | True
 
     # FIXME checking out master seems to change files to wrong states sometimes
     def commit_master(self, msg):
@@ -322,8 +573,17 @@ class Repo(Logging):
             message=msg.encode(),
             ref=self._master_ref_b,
         )
+        committed.foreach(self._record_commit)
         return committed // (lambda a: self.reset_master())
 
+    @property
+    def commit_index(self) -> CommitIndex:
+        return commit_index(Path(self.repo.store))
+
+    def _record_commit(self, id: bytes) -> None:
+        Try(self.commit_index.record, self.repo, id).leffect(
+            lambda e: self.log.error('indexing commit {} in {}: {}'.format(id, self.base, e)))
+
     def to_master(self):
         return self.master_commit.map(self._switch)
 
@@ -348,16 +608,15 @@ class Repo(Logging):
     def history_at(self, sha):
         return self.repo.get_walker(include=[sha.encode()])
 
+    def _file_entries(self, path: Path) -> Iterator[CommitEntry]:
+        ''' the commits that changed `path`, which are none if it is outside of the worktree.
+        '''
+        head = self._master_id.to_maybe
+        chain = lambda a: self.commit_index.file_chain(self.repo, head, str(a))
+        return self.relpath(path).cata(chain, lambda: iter(()))
+
     def file_history(self, path: Path):
-        relpath = str(self.relpath(path) | '///')
-        def filt(entry):
-            paths = (
-                List.wrap(entry.changes()) //
-                (lambda a: Maybe.check(a.new.path)) /
-                __.decode()
-            )
-            return paths.contains(relpath)
-        return self.history_raw.filter(filt) / _.commit
+        return LazyList(self.repo[a.id.encode()] for a in self._file_entries(path))
 
     def relpath(self, path: Path):
         return (Try(path.relative_to, self.base).to_maybe
@@ -392,34 +651,60 @@ class Repo(Logging):
     def file_log_formatted(self, path):
         return self.file_history_info(path) / _.log_format
 
-    def _history_info(self, commits):
-        return commits\
-            .with_index\
-            .map2(self.commit_info)\
-            .filter_not(_.empty)
+    @property
+    def _master_entries(self) -> Iterator[CommitEntry]:
+        return self.commit_index.chain(self.repo, self._master_id.to_maybe)
+
+    @property
+    def history_entries(self):
+        ''' commit index entries of the master chain, newest first.
+        '''
+        return LazyList(self._master_entries)
+
+    def _infos(self, entries: Iterable[CommitEntry]) -> Iterator['CommitInfo']:
+        return (self.entry_info(i, a) for i, a in enumerate(entries) if not a.empty)
+
+    def _history_info(self, entries: Iterable[CommitEntry]):
+        return LazyList(self._infos(entries))
+
+    def iter_history_info(self, path: Maybe[Path]=Empty()) -> Iterator['CommitInfo']:
+        ''' infos of the nonempty commits of the master chain, or of those touching `path`, as a plain iterator that
+        can be consumed on another thread.
+        '''
+        return self._infos(path.cata(self._file_entries, lambda: self._master_entries))
+
+    def entry_info(self, index, entry: CommitEntry):
+        return CommitInfo.from_entry(index, entry, self)
 
     @lazy
     def history_info(self):
-        return self._history_info(self.history)
+        return self._history_info(self._master_entries)
 
     def file_history_info(self, path: Path):
-        return self._history_info(self.file_history(path))
+        return self._history_info(self._file_entries(path))
 
     @lazy
     def current_commit(self):
         return self.current_b / self.repo.get_object
 
+    @property
+    def line(self) -> Maybe[CommitLine]:
+        ''' positions of the master chain's commits, for navigation
+        without walking the history.
+        '''
+        return self._master_id.to_maybe / L(self.commit_index.line)(self.repo, _)
+
+    def position(self, commit: Commit) -> Maybe[int]:
+        return self.line // __.position(commit.id.decode())
+
     @property
     def current_commit_info(self):
         com = self.current_commit.to_maybe
-        index = com // self.history.index_of
+        index = com // self.position
         return index.ap2(com, self.commit_info)
 
-    def future_at(self, id):
-        def search(hist):
-            all = List.wrap(takewhile(_.commit.id != id, hist))
-            return all.reversed
-        return self._master_id / self.history_at / search | iter([])
+    def _commit(self, id: str) -> Maybe[Commit]:
+        return Try(self.repo.get_object, id.encode()).to_maybe
 
     def parents(self, commit):
         return List.wrap(commit.parents) / self.repo.get_object
@@ -427,8 +712,8 @@ class Repo(Logging):
     def parent(self, commit):
         return self.parents(commit).head
 
-    def child(self, id, n=0):
-        return self.future_at(id).lift(n - 1) / _.commit
+    def child(self, commit, n=1):
+        return self.line // __.child(commit.id.decode(), n) // self._commit
 
     def prev(self):
         return self.current_commit // self.parent / self._switch
@@ -437,7 +722,7 @@ class Repo(Logging):
         return self.current_commit // self.child / self._switch
 
     def select(self, num):
-        return self.history.lift(num) / self._switch
+        return self.line // __.at(num) // self._commit / self._switch
 
     def checkout_file(self, commit_sha, path):
         path_s = str(self.abspath(path))
@@ -486,7 +771,7 @@ class RepoAdapter(Logging):
 
     @property
     def _repo(self):
-        return DulwichRepo.at(self.work_tree, self.git_dir)
+        return repo_handles.open(self.work_tree, self.git_dir)
 
     def t(self, state: RepoState):
         return self.repo(state) / RepoT
@@ -498,17 +783,20 @@ class RepoAdapter(Logging):
 
 class ProjectRepoAdapter(RepoAdapter):
 
-    def __init__(self, project: Project, git_dir: Maybe[Path]=Empty()) -> None:
+    def __init__(self, project: Project, git_dir: Maybe[Path]=Empty(), shared: Maybe[Path]=Empty()) -> None:
         self.project = project
+        self.shared = shared
         super().__init__(self.project.root, git_dir)
 
     @may
     def repo(self, state: Maybe[RepoState]=Empty()) -> Maybe[Repo]:
         if self.initialize():
-            return Repo(self._repo, state | self._new_state)
+            repo = self._repo
+            self.shared % repo.share
+            return Repo(repo, state | self._new_state)
 
     @property
     def _new_state(self):
         return ProjectRepoState(project=self.project)
 
-__all__ = ('RepoAdapter', 'RepoT', 'Repo', 'RepoState')
+__all__ = ('RepoAdapter', 'RepoT', 'Repo', 'RepoState', 'RepoHandles', 'repo_handles')
@@ -0,0 +1,111 @@
+from typing import Tuple, Iterable
+
+from dulwich.objects import Commit
+
+from amino import List, Just
+
+from proteome.logging import Logging
+from proteome.git.commit_index import CommitIndex, CommitEntry
+
+_master_ref = b'refs/heads/master'
+
+
+class Retention(object):
+    ''' thinning policy for history snapshots, given as `(age, interval)` rules in seconds.
+    Of the snapshots that are at least `age` old, only the newest one of each `interval`-sized time bucket is kept;
+    the rule with the greatest applicable age wins. Younger snapshots are all kept, as are all of them without rules.
+    '''
+
+    def __init__(self, rules: List[Tuple[int, int]]=List()) -> None:
+        self.rules = List.wrap(sorted(rules))
+
+    def interval(self, age: float) -> int:
+        return self.rules.filter(lambda a: age >= a[0]).last.map(lambda a: a[1]) | 0
+
+    def keep(self, entries: Iterable[CommitEntry], now: float) -> set:
+        ''' ids of the `entries`, given newest first, that are retained.
+        '''
+        kept = set()
+        buckets = set()
+        for entry in entries:
+            interval = self.interval(now - entry.timestamp)
+            bucket = interval, entry.timestamp // max(interval, 1)
+            if interval <= 0 or bucket not in buckets:
+                buckets.add(bucket)
+                kept.add(entry.id)
+        return kept
+
+
+class Thinning(Logging):
+    ''' rewrites the master chain of a history repo so that it only contains the snapshots retained by `retention`,
+    plus the `pinned` ones and HEAD.
+    Commits older than the oldest dropped snapshot are left untouched; the kept commits after it are recreated with
+    the same tree and metadata on top of their new parents. Every old id after that point, including the dropped ones,
+    is mapped to its replacement, or to that of the next newer kept snapshot, in the commit index, where `Repo`
+    resolves its current commit; the index is compacted to the entries of the new chain.
+    The dropped objects are removed by the next pack consolidation.
+    '''
+
+    def __init__(self, repo, index: CommitIndex, retention: Retention, pinned: Iterable[str]=()) -> None:
+        self.repo = repo
+        self.index = index
+        self.retention = retention
+        self.pinned = set(pinned)
+
+    def _copy(self, id: str, parent: List[bytes]) -> Commit:
+        old = self.repo[id.encode()]
+        commit = Commit()
+        commit.tree = old.tree
+        commit.parents = list(parent)
+        commit.author = old.author
+        commit.committer = old.committer
+        commit.author_time = old.author_time
+        commit.commit_time = old.commit_time
+        commit.author_timezone = old.author_timezone
+        commit.commit_timezone = old.commit_timezone
+        commit.encoding = old.encoding
+        commit.message = old.message
+        self.repo.object_store.add_object(commit)
+        return commit
+
+    def _head(self) -> List[str]:
+        head = self.repo.refs.read_ref(b'HEAD')
+        return List() if head is None or head.startswith(b'ref: ') else List(head.decode())
+
+    def run(self, now: float) -> dict:
+        ''' thin the master chain and return the mapping of old ids to new ones, which is empty if no snapshot was
+        dropped.
+        '''
+        try:
+            master = self.repo.refs[_master_ref]
+        except KeyError:
+            return dict()
+        head = self._head()
+        entries = list(self.index.chain(self.repo, Just(master.decode())))
+        kept = self.retention.keep(entries, now) | self.pinned | set(head) | set([master.decode()])
+        line = entries[::-1]
+        dropped = [i for i, a in enumerate(line) if a.id not in kept]
+        if not dropped:
+            return dict()
+        start = dropped[0]
+        parent = List.wrap(line[start - 1:start]).map(lambda a: a.id.encode())
+        mapping = dict()
+        pending = List()
+        for entry in line[start:]:
+            pending = pending.cat(entry.id)
+            if entry.id in kept:
+                commit = self._copy(entry.id, parent)
+                self.index.record(self.repo, commit.id)
+                mapping.update((a, commit.id.decode()) for a in pending)
+                pending = List()
+                parent = List(commit.id)
+        new_master = mapping[master.decode()].encode()
+        if not self.repo.refs.set_if_equals(_master_ref, master, new_master):
+            self.log.debug('master of {} moved during thinning'.format(self.repo.path))
+            return dict()
+        head.foreach(lambda a: self.repo.refs.set_if_equals(b'HEAD', a.encode(), mapping.get(a, a).encode()))
+        self.index.rewrite(mapping, self.index.line(self.repo, new_master.decode()).ids)
+        self.log.debug('thinned {}: dropped {} of {} snapshots'.format(self.repo.path, len(dropped), len(line)))
+        return mapping
+
+__all__ = ('Retention', 'Thinning')
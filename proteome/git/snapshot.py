@@ -0,0 +1,171 @@
+import os
+import stat
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from dulwich.index import blob_from_path_and_stat, index_entry_from_stat, cleanup_mode
+from dulwich.ignore import IgnoreFilterManager
+
+from amino import List, Maybe, Try
+from amino.logging import Logging
+from amino.lazy import lazy
+
+
+def _cache_time(t) -> tuple:
+    if isinstance(t, tuple):
+        return t
+    secs, frac = divmod(t, 1.0)
+    return int(secs), int(frac * 1000000000)
+
+
+def _stat_time(ns: int) -> tuple:
+    return ns // 1000000000, ns % 1000000000
+
+
+class Snapshot(Logging):
+    ''' stages files of a worktree into a history repo's index without running git.
+    Like git's stat cache, a file is only read and hashed if its stat data differs from its index entry, or if it was
+    modified no earlier than the index was last written, which makes an unchanged stat ambiguous.
+    Untracked paths that match the repo's ignore rules, which include `info/exclude`, are skipped.
+    '''
+
+    def __init__(self, repo) -> None:
+        self.repo = repo
+        self.root = Path(repo.path)
+        self._root_b = os.fsencode(repo.path)
+        self.index = repo.open_index()
+        self.hashed = 0
+        self.touched = False
+
+    @lazy
+    def _index_time(self) -> tuple:
+        return Try(os.stat, self.index.path).map(lambda a: _stat_time(a.st_mtime_ns)) | (0, 0)
+
+    @lazy
+    def _ignore(self) -> Maybe[IgnoreFilterManager]:
+        return Try(IgnoreFilterManager.from_repo, self.repo).to_maybe
+
+    def _ignored(self, path: str) -> bool:
+        return self._ignore.exists(lambda a: bool(a.is_ignored(path)))
+
+    def _unchanged(self, entry, st: os.stat_result) -> bool:
+        mtime = _stat_time(st.st_mtime_ns)
+        return (
+            _cache_time(entry.mtime) == mtime and
+            _cache_time(entry.ctime) == _stat_time(st.st_ctime_ns) and
+            entry.size == st.st_size and
+            entry.ino == st.st_ino and
+            entry.mode == cleanup_mode(st.st_mode) and
+            mtime < self._index_time
+        )
+
+    def _entry(self, st: os.stat_result, sha: bytes):
+        entry = index_entry_from_stat(st, sha, 0)
+        return entry._replace(ctime=_stat_time(st.st_ctime_ns), mtime=_stat_time(st.st_mtime_ns))
+
+    def _lookup(self, path: bytes):
+        ''' `Index` has no `__contains__`, so `in` would iterate over all entries.
+        '''
+        try:
+            return self.index[path]
+        except KeyError:
+            return None
+
+    def _add(self, blob) -> None:
+        ''' write `blob` unless it is contained in a pack or an alternate store, like a shared history store.
+        Loose objects of this repo are skipped by `add_object` itself.
+        '''
+        store = self.repo.object_store
+        shared = lambda a: a.contains_packed(blob.id) or a.contains_loose(blob.id)
+        if not (store.contains_packed(blob.id) or any(shared(a) for a in store.alternates)):
+            store.add_object(blob)
+
+    def _remove(self, path: bytes) -> bool:
+        if self._lookup(path) is not None:
+            del self.index[path]
+            self.touched = True
+            return True
+        return False
+
+    def _stage(self, path: bytes) -> bool:
+        fs_path = os.path.join(self._root_b, path)
+        try:
+            st = os.lstat(fs_path)
+        except FileNotFoundError:
+            return self._remove(path)
+        if not (stat.S_ISREG(st.st_mode) or stat.S_ISLNK(st.st_mode)):
+            return self._remove(path)
+        entry = self._lookup(path)
+        if entry is None and self._ignored(os.fsdecode(path)):
+            return False
+        if entry is not None and self._unchanged(entry, st):
+            return False
+        blob = blob_from_path_and_stat(fs_path, st)
+        self.hashed += 1
+        changed = entry is None or entry.sha != blob.id
+        if changed:
+            self._add(blob)
+        self.index[path] = self._entry(st, blob.id)
+        self.touched = True
+        return changed
+
+    def stage(self, paths: Iterable[str]) -> List[str]:
+        ''' update the index entries of the worktree-relative `paths`, returning those whose content changed.
+        '''
+        changed = List.wrap(paths).distinct.filter(lambda a: self._stage(a.encode()))
+        if self.touched:
+            self.index.write()
+        return changed
+
+    def refresh(self) -> List[str]:
+        ''' stage all files tracked in the index.
+        '''
+        return self.stage(List.wrap(self.index).map(lambda a: a.decode()))
+
+    def _subdir(self, path: bytes, fs_path: bytes) -> bool:
+        return (
+            not self._ignored(os.fsdecode(path) + '/') and
+            not os.path.lexists(os.path.join(fs_path, b'.git'))
+        )
+
+    def _walk(self) -> Iterator[bytes]:
+        dirs = [b'']
+        while dirs:
+            rel = dirs.pop()
+            try:
+                it = os.scandir(os.path.join(self._root_b, rel))
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    if entry.name == b'.git':
+                        continue
+                    path = rel + entry.name
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if not is_dir:
+                        yield path
+                    elif self._subdir(path, entry.path):
+                        dirs.append(path + b'/')
+
+    def scan(self) -> List[str]:
+        ''' stage the whole worktree like `git add -A`, returning the paths whose content changed.
+        Ignored and nested repository directories aren't descended into, but files in them that are already tracked
+        are still updated or removed.
+        '''
+        seen = set()
+        changed = []
+        for path in self._walk():
+            seen.add(path)
+            if self._stage(path):
+                changed.append(os.fsdecode(path))
+        for path in [a for a in self.index if a not in seen]:
+            if self._stage(path):
+                changed.append(os.fsdecode(path))
+        if self.touched:
+            self.index.write()
+        return List.wrap(changed)
+
+__all__ = ('Snapshot',)
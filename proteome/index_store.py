@@ -0,0 +1,142 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Tuple
+
+from amino import List, Map, Maybe, Empty
+
+from proteome.logging import Logging
+from proteome.addable import addable_cache
+from proteome.project_config import config_cache
+
+store_version = 1
+
+_schema = List(
+    'create table meta (key text primary key, value text)',
+    'create table dirs (path text primary key, mtime integer, names text)',
+    'create table configs (path text primary key, mtime integer, size integer, records text)',
+)
+
+
+class IndexStore(Logging):
+    ''' sqlite database persisting project base dir listings and parsed project configs across sessions.
+    Entries are keyed by path and stored with the signature of the file or directory they were read from, so callers
+    can validate them with a single stat before using them.
+    The database is opened on first access; if its schema version differs from `store_version`, it is recreated.
+    All dir listings are read with a single query when the first one is requested.
+    '''
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._db = None  # type: sqlite3.Connection
+        self._dirs = None  # type: dict
+        self._lock = threading.Lock()
+
+    def _create(self, db: sqlite3.Connection) -> None:
+        for table in ('meta', 'dirs', 'configs'):
+            db.execute('drop table if exists {}'.format(table))
+        _schema.foreach(db.execute)
+        db.execute('insert into meta values (?, ?)', ('version', str(store_version)))
+        db.commit()
+
+    def _version(self, db: sqlite3.Connection) -> Maybe[int]:
+        try:
+            row = db.execute('select value from meta where key = ?', ('version',)).fetchone()
+        except sqlite3.DatabaseError:
+            return Empty()
+        return Maybe(row).map(lambda a: int(a[0]))
+
+    def _open(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.path), check_same_thread=False)
+        db.execute('pragma synchronous = off')
+        if not self._version(db).contains(store_version):
+            self.log.debug('creating project index store {}'.format(self.path))
+            self._create(db)
+        return db
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = self._open()
+        return self._db
+
+    def _query(self, sql: str, *args) -> Maybe[tuple]:
+        with self._lock:
+            try:
+                return Maybe(self.db.execute(sql, args).fetchone())
+            except sqlite3.Error as e:
+                self.log.error('reading project index store {}: {}'.format(self.path, e))
+                return Empty()
+
+    def _all_dirs(self) -> dict:
+        with self._lock:
+            if self._dirs is None:
+                try:
+                    rows = self.db.execute('select path, mtime, names from dirs').fetchall()
+                except sqlite3.Error as e:
+                    self.log.error('reading project index store {}: {}'.format(self.path, e))
+                    rows = []
+                self._dirs = dict((path, (mtime, names)) for path, mtime, names in rows)
+            return self._dirs
+
+    def _execute(self, sql: str, args: tuple) -> None:
+        try:
+            self.db.execute(sql, args)
+            self.db.commit()
+        except sqlite3.Error as e:
+            self.log.error('writing project index store {}: {}'.format(self.path, e))
+
+    def _write(self, sql: str, *args) -> None:
+        with self._lock:
+            self._execute(sql, args)
+
+    def dir(self, path: Path) -> Maybe[Tuple[int, List[str]]]:
+        return Maybe(self._all_dirs().get(str(path))).map(lambda a: (a[0], List.wrap(json.loads(a[1]))))
+
+    def store_dir(self, path: Path, mtime: int, names: List[str]) -> None:
+        data = json.dumps(list(names))
+        dirs = self._all_dirs()
+        with self._lock:
+            dirs[str(path)] = mtime, data
+            self._execute('insert or replace into dirs values (?, ?, ?)', (str(path), mtime, data))
+
+    def drop_dirs(self, path: Maybe[Path]=Empty()) -> None:
+        ''' remove the listing of `path` and all directories below it, or all listings if no path is given.
+        Descendants are matched by prefix, since a `like` pattern would interpret `_` and `%` in the path.
+        '''
+        def below(a: Path) -> tuple:
+            prefix = '{}/'.format(a)
+            return 'delete from dirs where path = ? or substr(path, 1, ?) = ?', (str(a), len(prefix), prefix)
+        sql, args = path.cata(below, lambda: ('delete from dirs', ()))
+        with self._lock:
+            self._dirs = None
+            self._execute(sql, args)
+
+    def config(self, path: Path, sig: Tuple[int, int]) -> Maybe[List[Map]]:
+        return (
+            self._query('select mtime, size, records from configs where path = ?', str(path))
+            .filter(lambda a: (a[0], a[1]) == sig)
+            .map(lambda a: List.wrap(map(Map, json.loads(a[2]))))
+        )
+
+    def store_config(self, path: Path, sig: Tuple[int, int], records: List[Map]) -> None:
+        data = json.dumps([dict(a) for a in records])
+        self._write('insert or replace into configs values (?, ?, ?, ?)', str(path), sig[0], sig[1], data)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+                self._dirs = None
+
+
+def attach_index_store(store: Maybe[IndexStore]) -> None:
+    ''' make the process-wide addable and config caches consult and update `store`.
+    '''
+    addable_cache.store = store
+    config_cache.store = store
+
+__all__ = ('IndexStore', 'attach_index_store', 'store_version')
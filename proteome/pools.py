@@ -0,0 +1,18 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+default_workers = 4
+_pools = dict()  # type: dict
+_pools_lock = threading.Lock()
+
+
+def pool(name: str, workers: int) -> ThreadPoolExecutor:
+    ''' the process-wide executor for `name` with `workers` threads, created on first use.
+    '''
+    key = name, workers
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='proteome_{}'.format(name))
+        return _pools[key]
+
+__all__ = ('pool', 'default_workers')
@@ -0,0 +1,123 @@
+import os
+import sys
+import time
+import threading
+from importlib.abc import MetaPathFinder
+from typing import List, Tuple, Any
+
+profile_env = 'PROTEOME_PROFILE_STARTUP'
+
+
+class _TimingLoader(object):
+
+    def __init__(self, loader: Any, profile: 'StartupProfile') -> None:
+        self._loader = loader
+        self._profile = profile
+
+    def create_module(self, spec: Any) -> Any:
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module: Any) -> None:
+        self._profile._enter()
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profile._exit(module.__name__, time.perf_counter() - start)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._loader, name)
+
+
+class _TimingFinder(MetaPathFinder):
+
+    def __init__(self, profile: 'StartupProfile') -> None:
+        self._profile = profile
+
+    def find_spec(self, fullname: str, path: Any, target: Any=None) -> Any:
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimingLoader(spec.loader, self._profile)
+                return spec
+        return None
+
+
+class StartupProfile(object):
+    ''' per-module import times and per-component handler times of the startup stages.
+    Import times are measured by a finder at the head of `sys.meta_path` that wraps the loaders of all modules
+    executed while it is installed; the self time of a module excludes the imports it triggered.
+    It is started when this module is imported if `PROTEOME_PROFILE_STARTUP` is set in the plugin host's environment.
+    Since that happens first thing in `proteome/__init__.py`, this module must only depend on the standard library.
+    '''
+
+    def __init__(self) -> None:
+        self.imports = dict()  # type: dict
+        self.stages = dict()  # type: dict
+        self._finder = None  # type: _TimingFinder
+        self._local = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        return self._finder is not None
+
+    def start(self) -> None:
+        if not self.enabled:
+            self._finder = _TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def stop(self) -> None:
+        if self.enabled:
+            sys.meta_path.remove(self._finder)
+            self._finder = None
+
+    @property
+    def _stack(self) -> list:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _enter(self) -> None:
+        self._stack.append(0.0)
+
+    def _exit(self, name: str, total: float) -> None:
+        children = self._stack.pop()
+        if self._stack:
+            self._stack[-1] += total
+        self.imports[name] = total, total - children
+
+    def stage(self, stage: str, component: str, duration: float) -> None:
+        key = stage, component
+        self.stages[key] = self.stages.get(key, 0.0) + duration
+
+    def _top_imports(self, limit: int) -> List[Tuple[str, Tuple[float, float]]]:
+        return sorted(self.imports.items(), key=lambda a: a[1][1], reverse=True)[:limit]
+
+    def report(self, limit: int=20) -> List[str]:
+        if not self.enabled and not self.imports:
+            return ['startup profiling is disabled, set ${} for the plugin host'.format(profile_env)]
+        imports = [
+            '  {:<60} {:8.4f}s self {:8.4f}s total'.format(name, own, total)
+            for name, (total, own) in self._top_imports(limit)
+        ]
+        stages = [
+            '  {:<10} {:<20} {:8.4f}s'.format(stage, component, duration)
+            for (stage, component), duration in sorted(self.stages.items())
+        ]
+        return (
+            ['imports by self time ({} modules):'.format(len(self.imports))] +
+            imports +
+            ['startup stages by component:'] +
+            stages
+        )
+
+
+startup_profile = StartupProfile()
+
+if os.environ.get(profile_env):
+    startup_profile.start()
+
+__all__ = ('StartupProfile', 'startup_profile', 'profile_env')
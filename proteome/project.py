@@ -1,8 +1,9 @@
 from pathlib import Path
-from typing import Tuple
-import json
+from typing import Tuple, Iterator
 
-from amino import Maybe, Empty, Just, List, Map, may, Boolean, flat_may, __, L, _, Either, Try
+from pyrsistent import pmap, PMap
+
+from amino import Maybe, Empty, Just, List, Map, may, flat_may, __, _, Either, Try
 from amino.lazy import lazy
 
 from ribosome.nvim import NvimFacade, HasNvim
@@ -10,10 +11,10 @@ from ribosome.record import field, list_field, Record, optional_field, str_field
 from ribosome.process import JobClient
 
 from proteome.logging import Logging
-
-
-def mkpath(path: str):
-    return Path(path).expanduser()  # type: ignore
+from proteome.addable import AddableCache, addable_cache
+from proteome.scan import Scanner, default_scanner, scan
+from proteome.project_config import ConfigCache, config_cache, mkpath
+from proteome.complete import Completer
 
 
 def format_path(path: Path):
@@ -106,19 +107,93 @@ class Project(Record):
         return ident in (self.ident, self.name)
 
 
+def _root_key(root: Path) -> Path:
+    return Try(lambda: mkpath(str(root)).resolve()) | root
+
+
+def _index_keys(pro: Project) -> List:
+    return List(
+        ('ident', pro.ident),
+        ('name', pro.name),
+        ('root', _root_key(pro.root)),
+    ) + pro.tpe.map(lambda t: List(('type_name', (t, pro.name)))).get_or_else(List())
+
+
+class ProjectIndex(object):
+    ''' persistent hash index over a list of projects.
+    Each key points to the first project in list order that matches it, mirroring the semantics of a linear `find`.
+    Positions are tracked per project for constant time index lookups.
+    The keys of each project are stored as well, since computing them resolves the project's root.
+    '''
+
+    def __init__(self, keys: PMap=pmap(), positions: PMap=pmap(), project_keys: PMap=pmap()) -> None:
+        self.keys = keys
+        self.positions = positions
+        self.project_keys = project_keys
+
+    @staticmethod
+    def from_projects(projects: List[Project]) -> 'ProjectIndex':
+        return ProjectIndex().extend(projects, 0)
+
+    def _keys(self, pro: Project) -> List:
+        cached = self.project_keys.get(pro)
+        return _index_keys(pro) if cached is None else cached
+
+    def add(self, pro: Project, position: int) -> 'ProjectIndex':
+        pro_keys = self._keys(pro)
+        keys = self.keys.evolver()
+        for key in pro_keys:
+            if key not in self.keys:
+                keys[key] = pro
+        if pro in self.positions:
+            return ProjectIndex(keys.persistent(), self.positions, self.project_keys)
+        return ProjectIndex(keys.persistent(), self.positions.set(pro, position),
+                            self.project_keys.set(pro, pro_keys))
+
+    def extend(self, pros: List[Project], offset: int) -> 'ProjectIndex':
+        return pros.with_index.fold_left(self)(lambda z, a: z.add(a[1], offset + a[0]))
+
+    def remove(self, pro: Project, remaining: List[Project]) -> 'ProjectIndex':
+        ''' drop all keys pointing to `pro` and repoint them to the next matching project, if any.
+        Only positions behind the removed project are shifted.
+        '''
+        removed = self.positions.get(pro)
+        if removed is None:
+            return self
+        keys = self.keys.evolver()
+        for key in self._keys(pro):
+            if self.keys.get(key) == pro:
+                del keys[key]
+                replacement = remaining.find(lambda a: key in self._keys(a))
+                replacement.foreach(lambda a: keys.set(key, a))
+        positions = self.positions.evolver()
+        del positions[pro]
+        for other in remaining.drop(removed):
+            positions[other] = positions[other] - 1
+        return ProjectIndex(keys.persistent(), positions.persistent(), self.project_keys.remove(pro))
+
+    def lookup(self, kind: str, key) -> Maybe[Project]:
+        return Maybe(self.keys.get((kind, key)))
+
+    def position(self, pro: Project) -> Maybe[int]:
+        return Maybe(self.positions.get(pro))
+
+
 class Projects(object):
 
-    def __init__(self, projects: List[Project]=List()) -> None:
+    def __init__(self, projects: List[Project]=List(), index: ProjectIndex=None) -> None:
         self.projects = projects
+        self.index = ProjectIndex.from_projects(projects) if index is None else index
 
     def __add__(self, pro: Project) -> 'Projects':
-        return Projects(self.projects + [pro])
+        return Projects(self.projects + [pro], self.index.add(pro, len(self.projects)))
 
     def __sub__(self, pro: Project) -> 'Projects':
-        return Projects(self.projects.without(pro))
+        remaining = self.projects.without(pro)
+        return Projects(remaining, self.index.remove(pro, remaining))
 
     def __pow__(self, pros: List[Project]) -> 'Projects':
-        return Projects(self.projects + pros)
+        return Projects(self.projects + pros, self.index.extend(pros, len(self.projects)))
 
     def show(self, names: List[str]=List()):
         if names.is_empty:
@@ -132,11 +207,13 @@ class Projects(object):
         def try_split():
             if '/' in ident:
                 tpe, name = ident.split('/', 1)
-                return self.projects.find(
-                    lambda a: a.name == name and a.tpe == Just(tpe))
-        return self.projects.find(_.name == ident)\
+                return self.index.lookup('type_name', (tpe, name))
+        return self.index.lookup('name', ident)\
             .or_else(try_split)
 
+    def by_root(self, root: Path) -> Maybe[Project]:
+        return self.index.lookup('root', _root_key(root))
+
     def ctags(self, names: List[str]):
         matching = names.flat_map(self.project)
         return matching
@@ -155,7 +232,7 @@ class Projects(object):
 
     def __contains__(self, item):
         return (
-            (isinstance(item, Project) and item in self.projects) or
+            (isinstance(item, Project) and item in self.index.positions) or
             (isinstance(item, str) and self.project(item).present)
         )
 
@@ -164,16 +241,23 @@ class Projects(object):
         return self.projects.map(_.json)
 
     def index_of(self, project):
-        return self.projects.index_of(project)
+        return self.index.position(project)
 
     def index_of_ident(self, ident):
-        return self.projects.index_where(_.ident == ident)\
-            .or_else(self.projects.index_where(_.name == ident))
+        return (
+            self.index.lookup('ident', ident)
+            .or_else(lambda: self.index.lookup('name', ident)) //
+            self.index.position
+        )
 
     @property
     def idents(self):
         return self.projects.map(_.ident)
 
+    @lazy
+    def completer(self) -> Completer:
+        return Completer(self.idents)
+
 
 def sub_path(base: Path, path: Path):
     check = lambda: path.relative_to(str(base))
@@ -189,24 +273,23 @@ def sub_paths(dirs: List[Path], path: Path):
 
 class Resolver(Logging):
 
-    def __init__(self, bases: List[Path], types: Map[Path, List[str]]) -> None:
+    def __init__(self, bases: List[Path], types: Map[Path, List[str]], scanner: Scanner=default_scanner) -> None:
         self.bases = bases
         self.types = types
+        self.scanner = scanner
 
     def type_name(self, tpe: str, name: str) -> Maybe[Path]:
         return (
-            self.bases
-            .map(_ / tpe / name)
-            .find(lambda a: a.is_dir())
+            self.scanner.find(self.bases.map(_ / tpe / name), __.is_dir())
             .or_else(lambda: self.specific(tpe, name))
         )
 
     def specific(self, tpe: str, name: str) -> Maybe[Path]:
-        return self.types\
+        candidates = self.types\
             .valfilter(__.contains(tpe))\
             .k\
-            .map(_ / name)\
-            .find(lambda a: a.is_dir())
+            .map(_ / name)
+        return self.scanner.find(candidates, __.is_dir())
 
     def dir(self, path: Path) -> Maybe[Tuple[str, str]]:
         return self.dir_in_bases(path)\
@@ -225,12 +308,11 @@ class Resolver(Logging):
 
 
 def content(path: Path):
-    return List.wrap(path.iterdir()) if path.is_dir() else List()
+    return scan(path).map(lambda a: Path(a.path))
 
 
-def subdirs(path: Path, n: int):
-    sub = content(path).filter(__.is_dir())
-    return sub if n <= 1 else sub // L(subdirs)(_, n - 1)
+def subdirs(path: Path, n: int, scanner: Scanner=default_scanner):
+    return scanner.subdir_paths(path, n)
 
 
 def extract_ident(path: Path):
@@ -243,26 +325,16 @@ def extract_ident(path: Path):
 
 class ProjectLoader(Logging):
 
-    def __init__(self, config_path: Path, resolver: Resolver) -> None:
+    def __init__(self, config_path: Path, resolver: Resolver, cache: AddableCache=addable_cache,
+                 configs: ConfigCache=config_cache) -> None:
         self.resolver = resolver
         self.config_path = config_path
-        self.config = self._load_config()
-
-    def _load_config(self) -> List[Map]:
-        def parse(path: Path):
-            with path.open() as f:
-                try:
-                    return List.wrap(map(Map, json.loads(f.read())))
-                except Exception as e:
-                    self.log.error('parse error in {}: {}'.format(path, e))
-                    return List()
-        if (self.config_path.is_dir()):
-            return List.wrap(self.config_path.glob('*.json')) \
-                .flat_map(parse)
-        elif self.config_path.is_file():
-            return parse(self.config_path)
-        else:
-            return List()
+        self.cache = cache
+        self.records = configs.records(config_path)
+
+    @property
+    def config(self) -> List[Map]:
+        return self.records.records
 
     def resolve(self, tpe: str, name: str):
         return self.resolver.type_name(tpe, name)\
@@ -276,15 +348,10 @@ class ProjectLoader(Logging):
             return main.flat_map(lambda a: self.resolve(a, ident))
 
     def json_by_name(self, name: str):
-        return self.config\
-            .find(lambda a: a.get('name').contains(name))
+        return self.records.by_name(name)
 
     def json_by_type_name(self, tpe, name):
-        def matcher(record: Map) -> Boolean:
-            return (record.get('name').contains(name) and
-                    record.get('type').contains(tpe))
-        return self.config\
-            .find(matcher)
+        return self.records.by_type_name(tpe, name)
 
     def json_by_ident(self, ident: str):
         @flat_may
@@ -295,8 +362,7 @@ class ProjectLoader(Logging):
             .or_else(try_split)
 
     def json_by_root(self, root: Path):
-        return self.config\
-            .find(lambda a: a.get('root').map(mkpath).contains(root))
+        return self.records.by_root(root)
 
     def by_ident(self, name: str):
         return self.json_by_ident(name)\
@@ -336,14 +402,26 @@ class ProjectLoader(Logging):
         kw = params.at('types', 'langs', 'history')
         return self.create(name, root, tpe=tpe, **kw)
 
+    @property
+    def _scan_long_ident(self):
+        return self.cache.idents(self.resolver.bases, self.resolver.types, self.resolver.scanner)
+
     @property
     def _all_long_ident(self):
-        def typed_ident(base, types):
-            names = subdirs(base, 1) / _.name
-            return (types // (lambda t: names / L('{}/{}'.format)(t, _)))
-        bases = self.resolver.bases // L(subdirs)(_, 2) // extract_ident
-        typed = self.resolver.types.to_list.flat_map2(typed_ident)
-        return bases + typed
+        ''' while the ident cache is being preloaded, the previous result is used to avoid blocking the caller.
+        If there is none yet, the dirs are scanned in the caller's thread.
+        '''
+        return (
+            self.cache.current_idents(self.resolver.bases, self.resolver.types) | (lambda: self._scan_long_ident)
+            if self.cache.preloading else
+            self._scan_long_ident
+        )
+
+    def preload(self, main: Maybe[str]) -> None:
+        def build() -> Completer:
+            idents = self._scan_long_ident
+            return self.cache.completer(idents, main, lambda: self._all_ident(idents, main))
+        self.cache.preload(build)
 
     def _short_ident(self, idents):
         return idents / __.split('/') / __[-1]
@@ -352,15 +430,42 @@ class ProjectLoader(Logging):
         return main / (
             lambda a: idents.filter(__.startswith(a + '/'))) | List()
 
-    def all_ident(self, main: Maybe[str]):
-        all = self._all_long_ident
+    def _all_ident(self, all: List[str], main: Maybe[str]):
         m_ids = self._main_ids(all, main)
         return all + self._short_ident(m_ids)
 
+    def all_ident(self, main: Maybe[str]):
+        return self._all_ident(self._all_long_ident, main)
+
+    def completer(self, main: Maybe[str]) -> Completer:
+        ''' completers built while a preload is running aren't cached, since their idents weren't validated.
+        '''
+        preloading = self.cache.preloading
+        idents = self._all_long_ident
+        build = lambda: self._all_ident(idents, main)
+        return Completer(build()) if preloading else self.cache.completer(idents, main, build)
+
     def main_ident(self, main: Maybe[str]):
         m_ids = self._main_ids(self._all_long_ident, main)
         return self._short_ident(m_ids)
 
+    def _iter_main_ident(self, idents: List[str], main: Maybe[str]) -> Iterator[str]:
+        for tpe in main:
+            prefix = tpe + '/'
+            for ident in idents:
+                if ident.startswith(prefix):
+                    yield ident[len(prefix):]
+
+    def iter_all_ident(self, main: Maybe[str]) -> Iterator[str]:
+        ''' lazy variant of `all_ident`, for consumers that process the idents in chunks.
+        '''
+        all = self._all_long_ident
+        yield from all
+        yield from self._iter_main_ident(all, main)
+
+    def iter_main_ident(self, main: Maybe[str]) -> Iterator[str]:
+        return self._iter_main_ident(self._all_long_ident, main)
+
 
 class ProjectAnalyzer(HasNvim, Logging):
 
@@ -421,4 +526,4 @@ class ProjectAnalyzer(HasNvim, Logging):
             .or_else(self._auto_main)\
             .get_or_else(self._fallback_main)
 
-__all__ = ('Projects', 'Project', 'ProjectLoader', 'Resolver')
+__all__ = ('Projects', 'Project', 'ProjectIndex', 'ProjectLoader', 'Resolver')
@@ -0,0 +1,112 @@
+import json
+import threading
+from pathlib import Path
+from typing import Tuple
+
+from amino import List, Map, Maybe, Try, Empty
+
+from proteome.logging import Logging
+
+
+def mkpath(path: str):
+    return Path(path).expanduser()  # type: ignore
+
+
+def _first_by(records: List[Map], key) -> dict:
+    index = dict()  # type: dict
+    for record in records:
+        key(record).foreach(lambda k: index.setdefault(k, record))
+    return index
+
+
+class ConfigRecords(object):
+    ''' parsed project json configs, indexed by name, `(type, name)` and expanded root.
+    Each key maps to the first record in file order, like a linear search would.
+    '''
+
+    def __init__(self, records: List[Map]) -> None:
+        self.records = records
+        self.names = _first_by(records, lambda a: a.get('name'))
+        self.type_names = _first_by(records, lambda a: a.get_all('type', 'name').map(tuple))
+        self.roots = _first_by(records, lambda a: a.get('root').map(mkpath))
+
+    def by_name(self, name: str) -> Maybe[Map]:
+        return Maybe(self.names.get(name))
+
+    def by_type_name(self, tpe: str, name: str) -> Maybe[Map]:
+        return Maybe(self.type_names.get((tpe, name)))
+
+    def by_root(self, root: Path) -> Maybe[Map]:
+        return Maybe(self.roots.get(root))
+
+
+def _signature(path: Path) -> Maybe[Tuple[int, int]]:
+    return Try(path.stat).to_maybe.map(lambda a: (a.st_mtime_ns, a.st_size))
+
+
+class ConfigCache(Logging):
+    ''' process-wide store of parsed project configs.
+    Files are only parsed again if their mtime or size changed; the directory is globbed on each access to pick up
+    added or removed files.
+    If an `IndexStore` is attached, files missing from memory are loaded from it if their signature matches.
+    '''
+
+    def __init__(self) -> None:
+        self.parses = 0
+        self._files = dict()  # type: dict
+        self._records = dict()  # type: dict
+        self._lock = threading.Lock()
+        self.store = Empty()  # type: Maybe
+
+    def _parse(self, path: Path) -> List[Map]:
+        self.parses += 1
+        with path.open() as f:
+            try:
+                return List.wrap(map(Map, json.loads(f.read())))
+            except Exception as e:
+                self.log.error('parse error in {}: {}'.format(path, e))
+                return List()
+
+    def _file(self, path: Path, sig: Tuple[int, int]) -> List[Map]:
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+        else:
+            records = self.store.flat_map(lambda a: a.config(path, sig)) | (lambda: self._store(path, sig))
+            self._files[path] = sig, records
+            return records
+
+    def _store(self, path: Path, sig: Tuple[int, int]) -> List[Map]:
+        records = self._parse(path)
+        self.store.foreach(lambda a: a.store_config(path, sig, records))
+        return records
+
+    def _files_in(self, config_path: Path) -> List[Path]:
+        return (
+            List.wrap(config_path.glob('*.json'))
+            if config_path.is_dir() else
+            List(config_path)
+            if config_path.is_file() else
+            List()
+        )
+
+    def records(self, config_path: Path) -> ConfigRecords:
+        with self._lock:
+            files = self._files_in(config_path).flat_map(lambda a: _signature(a).map(lambda s: (a, s)))
+            sigs = files.map(lambda a: (str(a[0]), a[1]))
+            cached = self._records.get(config_path)
+            if cached is not None and cached[0] == sigs:
+                return cached[1]
+            records = ConfigRecords(files.flat_map2(self._file))
+            self._records[config_path] = sigs, records
+            return records
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._files.clear()
+            self._records.clear()
+
+
+config_cache = ConfigCache()
+
+__all__ = ('ConfigRecords', 'ConfigCache', 'config_cache')
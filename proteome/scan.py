@@ -0,0 +1,79 @@
+import os
+from pathlib import Path
+from typing import Callable, TypeVar, Iterable
+
+from amino import List, Maybe
+
+from proteome.logging import Logging
+from proteome.pools import pool, default_workers
+
+A = TypeVar('A')
+B = TypeVar('B')
+
+
+def _is_dir(entry: os.DirEntry) -> bool:
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def scan(path: Path) -> List[os.DirEntry]:
+    ''' entries of `path`, empty if it is not a readable directory.
+    The returned `DirEntry`s carry the file type from the directory listing, so checking it costs no stat calls on
+    most file systems.
+    '''
+    try:
+        with os.scandir(str(path)) as it:
+            return List.wrap(it)
+    except OSError:
+        return List()
+
+
+def scan_subdirs(path: Path) -> List[os.DirEntry]:
+    return scan(path).filter(_is_dir)
+
+
+def subdir_names(path: Path) -> List[str]:
+    return scan_subdirs(path).map(lambda a: a.name)
+
+
+class Scanner(Logging):
+    ''' runs directory enumeration for independent paths concurrently on a shared thread pool.
+    '''
+
+    def __init__(self, workers: int=default_workers) -> None:
+        self.workers = workers
+
+    @property
+    def parallel(self) -> bool:
+        return self.workers > 1
+
+    def map(self, f: Callable[[A], B], items: Iterable[A]) -> List[B]:
+        data = List.wrap(items)
+        return (
+            List.wrap(pool('scan', self.workers).map(f, data))
+            if self.parallel and data.length > 1 else
+            data.map(f)
+        )
+
+    def find(self, items: Iterable[A], pred: Callable[[A], bool]) -> Maybe[A]:
+        ''' first item in order satisfying `pred`, with `pred` evaluated concurrently.
+        '''
+        data = List.wrap(items)
+        return data.zip(self.map(pred, data)).find(lambda a: a[1]).map(lambda a: a[0])
+
+    def subdirs(self, paths: Iterable[Path]) -> List[List[str]]:
+        return self.map(subdir_names, paths)
+
+    def subdir_paths(self, path: Path, n: int) -> List[Path]:
+        ''' paths of directories `n` levels below `path`, listing each level concurrently.
+        '''
+        def step(z: List[Path], i: int) -> List[Path]:
+            return z.zip(self.subdirs(z)).flat_map(lambda a: a[1].map(lambda name: a[0] / name))
+        return List.range(max(n, 1)).fold_left(List(path))(step)
+
+
+default_scanner = Scanner()
+
+__all__ = ('scan', 'scan_subdirs', 'subdir_names', 'Scanner', 'default_scanner')
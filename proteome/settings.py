@@ -1,9 +1,15 @@
+from typing import Tuple
+
 from amino import List, Map, __, _, Path, Nil, Either, Lists, L, Try, Right, do
-from amino.boolean import true
+from amino.boolean import true, false
 
 from ribosome.settings import (PluginSettings, path_setting, path_list_setting, setting_ctor, path_list, str_setting,
                                bool_setting)
 
+from proteome.pools import default_workers
+
+default_history_scan_interval = 600
+
 
 config_path_help = '''Each json file in this directory is read to populate the list of project configurations.
 Here you can either define independent projects that can be added with `ProAdd!`:
@@ -35,6 +41,55 @@ tags_args_help = '''Set this to a space-separated list of arguments for the cust
 You can supply a python format string containing the variables `langs`, `tag_file` and `root`.
 '''
 
+scan_workers_help = '''The number of threads used to list project base dirs concurrently when looking up addable
+projects. A value of `1` disables parallel scanning.
+'''
+
+persist_index_help = '''If true, base dir listings and parsed project configs are stored in `index.sqlite` in the
+state dir, so that a new session only has to rescan directories that changed since the last one.
+'''
+
+stats_help = '''If true, the time spent handling each message is recorded per component, including the startup
+stages. `ProStats` prints the results and stores them in `g:proteome_stats_data`.
+This is read once at startup.
+'''
+
+history_scan_interval_help = '''The history only stages files that were written in nvim since the last commit, or that
+were changed on disk when their buffer is entered. To catch other external edits, the whole worktree of a project is
+staged on the first commit of a session and whenever this many seconds have passed since the previous full scan.
+A value of `0` stages the whole worktree on every commit.
+'''
+
+history_commit_workers_help = '''The number of history projects that are committed concurrently on `ProSave`.
+'''
+
+history_native_staging_limit_help = '''When the whole worktree of a history project is staged, this is done in process if
+its index has at most this many entries, avoiding a `git` subprocess. Larger projects and the initial import are
+staged with `git add -A`, which is faster for many files.
+'''
+
+history_gc_interval_help = '''After a commit, a history repo's loose objects are packed and its unreachable objects
+pruned on a background thread if at least this many seconds have passed since its last check and it contains at
+least `g:proteome_history_gc_loose_limit` loose objects. A value of `0` disables maintenance.
+'''
+
+history_gc_loose_limit_help = '''The estimated number of loose objects at which a history repo is packed.
+'''
+
+history_retention_help = '''A list of `[age, interval]` pairs in seconds that thin out old history snapshots during
+maintenance: of the snapshots that are at least `age` old, only the newest one per `interval` is kept, with the rule of
+the greatest applicable age taking precedence. The default, an empty list, keeps all snapshots. Thinning rewrites the
+history's commits, so it is opt-in; e.g. `[[86400, 3600], [604800, 86400]]` keeps every snapshot for a day, hourly ones
+for a week and daily ones after that.
+'''
+
+history_shared_objects_help = '''If true, all history repos reference a common object store in
+`g:proteome_history_base/.shared` as a git alternate. Files that are identical across projects are stored only once,
+since maintenance packs new objects into the shared store, omitting those it already contains, and staging skips
+writing files that are found there. Shared objects are never pruned.
+This is read once per session.
+'''
+
 load_buffers_help = '''On invocation of `ProLoad`, proteome persists the current buffer list to disk. If this flag is
 true, they will be restored upon startup.
 '''
@@ -51,6 +106,17 @@ def cons_type_base_dirs(data: dict) -> Either[str, Map[Path, List[str]]]:
 type_base_dirs_setting = setting_ctor(dict, cons_type_base_dirs)
 
 
+def cons_retention(data: list) -> Either[str, List[Tuple[int, int]]]:
+    def rule(a: list) -> Tuple[int, int]:
+        age, interval = a
+        return int(age), int(interval)
+    return Lists.wrap(data).traverse(L(Try)(rule, _), Either)
+
+
+retention_setting = setting_ctor(list, cons_retention)
+int_setting = setting_ctor(int, lambda a: Right(a))
+
+
 class ProteomeSettings(PluginSettings):
 
     def __init__(self) -> None:
@@ -62,6 +128,28 @@ class ProteomeSettings(PluginSettings):
                                                      True, Right(Nil))
         self.tags_command = str_setting('tags_command', 'custom command for ctags generation', tags_command_help, True)
         self.tags_args = str_setting('tags_args', 'args for custom ctags command', tags_args_help, True)
+        self.scan_workers = int_setting('scan_workers', 'directory scan threads', scan_workers_help, True,
+                                        Right(default_workers))
+        self.persist_index = bool_setting('persist_index', 'persist the project index across sessions',
+                                          persist_index_help, True, Right(true))
+        self.stats = bool_setting('stats', 'record message handling times', stats_help, True, Right(false))
+        self.history_scan_interval = int_setting('history_scan_interval', 'history full scan interval',
+                                                 history_scan_interval_help, True,
+                                                 Right(default_history_scan_interval))
+        self.history_commit_workers = int_setting('history_commit_workers', 'concurrent history commits',
+                                                  history_commit_workers_help, True,
+                                                  Right(default_workers))
+        self.history_native_staging_limit = int_setting('history_native_staging_limit', 'native history staging limit',
+                                                        history_native_staging_limit_help, True, Right(500))
+        self.history_gc_interval = int_setting('history_gc_interval', 'history maintenance interval',
+                                               history_gc_interval_help, True, Right(3600))
+        self.history_gc_loose_limit = int_setting('history_gc_loose_limit', 'history loose object limit',
+                                                  history_gc_loose_limit_help, True, Right(1000))
+        self.history_shared_objects = bool_setting('history_shared_objects', 'shared history object store',
+                                                   history_shared_objects_help, True, Right(false))
+        self.history_retention = retention_setting('history_retention', 'history snapshot retention',
+                                                   history_retention_help, True,
+                                                   Right(List()))
         self.load_buffers = bool_setting('load_buffers', 'load persisted buffers on startup', load_buffers_help, True,
                                          Right(true))
 
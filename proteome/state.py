@@ -1,17 +1,29 @@
-from ribosome.machine.state import RootMachine
+import time
+from typing import Type, Any
+
+from amino import List, Either, Left, Right, Maybe, Empty, Just
+
+from ribosome.machine.state import RootMachine, AutoRootMachine, ComponentMachine
 from ribosome.nvim import HasNvim
 from ribosome.machine.modular import ModularMachine
 from ribosome.machine.transitions import Transitions
+from ribosome.machine.transition import TransitionResult, CoroTransitionResult
 from ribosome.machine.base import MachineBase
+from ribosome.machine.message_base import Message, default_prio
+from ribosome.machine.messages import Stage1, Stage2, Stage3, Stage4, Coroutine
 from ribosome.nvim import NvimFacade
 
 from proteome.logging import Logging
+from proteome.profile import startup_profile
+from proteome.stats import Stats, total_key
+
+startup_stages = (Stage1, Stage2, Stage3, Stage4)
 
 
 class ProteomeComponent(ModularMachine, HasNvim, Logging):
 
     def __init__(self, vim: NvimFacade, parent=None, title=None) -> None:
-        MachineBase.__init__(self, parent, title=title)
+        MachineBase.__init__(self, parent, name=title)
         HasNvim.__init__(self, vim)
 
 
@@ -22,10 +34,164 @@ class ProteomeState(RootMachine, Logging):
         return 'proteome'
 
 
-class ProteomeTransitions(Transitions, HasNvim):
+class ProteomeTransitions(Transitions):
+    ''' `vim` is provided by `Transitions`, read from the machine.
+    '''
+
+
+
+class LazyComponent(ComponentMachine):
+    ''' placeholder for a component whose module is imported when the first message relevant to it arrives.
+    Relevant messages are those defined in one of the modules `messages` and instances of `triggers`; all others are
+    left unhandled until the component is loaded.
+    The messages in `init` are processed by the component right after it was loaded, before the one that caused it,
+    in place of the startup stages that it missed.
+    Subclasses are created with `lazy_component`.
+    '''
+    target = ''
+    messages = ()  # type: tuple
+    triggers = ()  # type: tuple
+    init = ()  # type: tuple
+
+    def __init__(self, vim: NvimFacade, name: str, parent: Any=None) -> None:
+        super().__init__(vim, Transitions, name, parent)
+        self.machine = Empty()  # type: Maybe[Either[str, MachineBase]]
+
+    @property
+    def loaded(self) -> bool:
+        return self.machine.present
+
+    def relevant(self, msg: Message) -> bool:
+        return type(msg).__module__ in self.messages or isinstance(msg, self.triggers)
+
+    def _instantiate(self, plug: type) -> Either[str, MachineBase]:
+        parent = self.parent | None
+        return (
+            Right(ComponentMachine(self.vim, plug, self.name, parent))
+            if isinstance(plug, type) and issubclass(plug, Transitions) else
+            Right(plug(self.vim, self.name, parent))
+            if isinstance(plug, type) and issubclass(plug, ComponentMachine) else
+            Left('invalid type for lazy component: {}'.format(plug))
+        )
+
+    def load(self) -> Maybe[MachineBase]:
+        ''' import and instantiate the component, once; a failure is logged and not retried.
+        '''
+        if not self.loaded:
+            start = time.perf_counter()
+            machine = Either.import_path(self.target).lmap(str).flat_map(self._instantiate)
+            machine.leffect(lambda e: self.log.error('loading component {}: {}'.format(self.name, e)))
+            machine.foreach(lambda a: self.log.debug('loaded component {} in {:.4f}s'.format(
+                self.name, time.perf_counter() - start)))
+            self.machine = Just(machine)
+        return self.machine // (lambda a: a.to_maybe)
+
+    def _initialized(self, machine: MachineBase, data: Any, f: Any) -> TransitionResult:
+        ''' run `f` on the data resulting from the `init` messages.
+        The messages published by those are dropped if `f` returns a coroutine, since results can't be merged into it.
+        '''
+        def init(z: TransitionResult, msg: Message) -> TransitionResult:
+            return z.accum(machine.loop_process(z.data, msg))
+        initial = List.wrap(self.init).fold_left(TransitionResult.unhandled(data))(init)
+        result = f(machine, initial.data)
+        return result if isinstance(result, CoroTransitionResult) else initial.accum(result)
+
+    def _delegate(self, data: Any, msg: Message, f: Any) -> TransitionResult:
+        if not (self.loaded or self.relevant(msg)):
+            return TransitionResult.unhandled(data)
+        run = (lambda a: f(a, data)) if self.loaded else (lambda a: self._initialized(a, data, f))
+        return self.load().map(run) | TransitionResult.unhandled(data)
+
+    def process(self, data: Any, msg: Message, prio: float=None) -> TransitionResult:
+        return self._delegate(data, msg, lambda a, d: a.process(d, msg, prio))
+
+    def loop_process(self, data: Any, msg: Message, prio: float=None) -> TransitionResult:
+        return self._delegate(data, msg, lambda a, d: a.loop_process(d, msg, prio))
+
+    @property
+    def prios(self) -> List[float]:
+        return (self.machine // (lambda a: a.to_maybe)).map(lambda a: a.prios) | List(default_prio)
+
+    def command(self, name: str, args: list) -> Maybe[Message]:
+        return self.load() // (lambda a: a.command(name, args))
+
+
+def lazy_component(target: str, messages: List[str]=List(), triggers: List[type]=List(),
+                   init: List[Message]=List()) -> Type[LazyComponent]:
+    ''' component class for the config's `components` map that defers importing the component class at the dotted
+    path `target` until a relevant message arrives, as described in `LazyComponent`.
+    '''
+    name = 'Lazy{}'.format(target.rsplit('.', 1)[-1])
+    attrs = dict(target=target, messages=tuple(messages), triggers=tuple(triggers), init=tuple(init))
+    return type(name, (LazyComponent,), attrs)
+
+
+class ProteomeRootMachine(AutoRootMachine):
+    ''' records the time each component takes to handle messages if `g:proteome_stats` is set, and the startup stage
+    times if startup profiling is enabled.
+    Async handlers are timed until the coroutine they return has been awaited.
+    When both are disabled, messages are dispatched without taking any times.
+    '''
+
+    def __init__(self, vim: NvimFacade, config: Any, name: str) -> None:
+        super().__init__(vim, config, name)
+        self.stats = Stats(bool(config.settings.stats.value_or_default.attempt(vim) | False))
+
+    def _profiled(self, msg: Message) -> bool:
+        return startup_profile.enabled and isinstance(msg, startup_stages)
+
+    def _record(self, msg: Message, component: str, duration: float) -> None:
+        name = type(msg).__name__
+        if self.stats.enabled:
+            self.stats.record(name, component, duration)
+        if self._profiled(msg):
+            startup_profile.stage(name, component, duration)
+
+    def _timed_coro(self, msg: Message, component: str, coro: Coroutine, elapsed: float) -> Coroutine:
+        ''' wrap a coroutine that `component` returned for `msg`, which the root awaits after the message was
+        dispatched, so that its time is recorded for the component, along with the `elapsed` time of the dispatch, and
+        added to the message's total.
+        '''
+        async def timed() -> Any:
+            start = time.perf_counter()
+            try:
+                return await coro.coro
+            finally:
+                duration = time.perf_counter() - start
+                self._record(msg, component, elapsed + duration)
+                if self.stats.enabled:
+                    self.stats.record(type(msg).__name__, total_key, duration, count=0)
+        return Coroutine(timed())
+
+    def _timed(self, msg: Message, component: str, result: TransitionResult, elapsed: float) -> TransitionResult:
+        ''' record the time `component` took for `msg`, deferred until its coroutines have been awaited if it
+        returned any, either as the result or published.
+        '''
+        if isinstance(result, CoroTransitionResult):
+            return result.set(coro=self._timed_coro(msg, component, result.coro, elapsed))
+        coros = List.wrap(result.pub).filter(lambda a: isinstance(a, Coroutine))
+        if coros:
+            timed = lambda a: self._timed_coro(msg, component, a, elapsed) if isinstance(a, Coroutine) else a
+            return result.set(pub=List.wrap(result.pub).map(timed))
+        self._record(msg, component, elapsed)
+        return result
+
+    def _send(self, data, msg):
+        if not self.stats.enabled:
+            return super()._send(data, msg)
+        start = time.perf_counter()
+        result = super()._send(data, msg)
+        self.stats.record(type(msg).__name__, total_key, time.perf_counter() - start)
+        return result
 
-    def __init__(self, machine, *a, **kw):
-        Transitions.__init__(self, machine, *a, **kw)
-        HasNvim.__init__(self, machine.vim)
+    def _fold_sub(self, data, msg, prio=None):
+        if not (self.stats.enabled or self._profiled(msg)):
+            return super()._fold_sub(data, msg, prio)
+        def send(z: TransitionResult, sub: MachineBase) -> TransitionResult:
+            start = time.perf_counter()
+            result = sub.loop_process(z.data, msg, prio)
+            return z.accum(self._timed(msg, sub.name, result, time.perf_counter() - start))
+        return self.sub.fold_left(TransitionResult.unhandled(data))(send)
 
-__all__ = ('ProteomeComponent', 'ProteomeState', 'ProteomeTransitions')
+__all__ = ('ProteomeComponent', 'ProteomeState', 'ProteomeTransitions', 'LazyComponent', 'lazy_component',
+           'ProteomeRootMachine')
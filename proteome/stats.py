@@ -0,0 +1,94 @@
+import threading
+
+from amino import List, Map
+
+from proteome.logging import Logging
+
+total_key = 'total'
+stage_names = List('Stage1', 'Stage2', 'Stage3', 'Stage4')
+
+
+class Timing(object):
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration: float, count: int=1) -> None:
+        self.count += count
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    @property
+    def data(self) -> Map:
+        return Map(count=self.count, total=self.total, max=self.max)
+
+
+class Stats(Logging):
+    ''' wall time spent handling messages, per message type and component.
+    The time a message took in the root machine, including all components and resent messages, is recorded for the
+    component `total`. The time that the coroutines returned by async handlers take when they are awaited is added to
+    both.
+    If disabled, nothing is measured; callers check `enabled` before taking times.
+    '''
+
+    def __init__(self, enabled: bool=False) -> None:
+        self.enabled = enabled
+        self._timings = dict()  # type: dict
+        self._lock = threading.Lock()
+
+    def record(self, message: str, component: str, duration: float, count: int=1) -> None:
+        ''' add `duration` to the timing of `message` in `component`, counting `count` calls; additional time spent
+        on an already counted call is recorded with `count=0`.
+        '''
+        key = message, component
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                timing = self._timings[key] = Timing()
+            timing.add(duration, count)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._timings.clear()
+
+    @property
+    def timings(self) -> List:
+        with self._lock:
+            return List.wrap(sorted(self._timings.items(), key=lambda a: a[0]))
+
+    @property
+    def stages(self) -> List:
+        return self.timings.filter(lambda a: a[0][0] in stage_names)
+
+    @property
+    def messages(self) -> List:
+        return self.timings.filter_not(lambda a: a[0][0] in stage_names)
+
+    @property
+    def data(self) -> Map:
+        ''' timings as a nested dict `message -> component -> {count, total, max}`, for export to vim.
+        '''
+        def add(z: Map, item: tuple) -> Map:
+            (message, component), timing = item
+            return z + (message, (z.get(message) | Map()) + (component, timing.data))
+        return self.timings.fold_left(Map())(add)
+
+    def _format(self, item: tuple) -> str:
+        (message, component), timing = item
+        return '  {:<24} {:<12} {:6} {:10.4f}s {:10.4f}s'.format(message, component, timing.count, timing.total,
+                                                                timing.max)
+
+    def report(self) -> List[str]:
+        if not self.enabled:
+            return List('stats are disabled, set `g:proteome_stats` before startup')
+        header = '  {:<24} {:<12} {:>6} {:>11} {:>11}'.format('message', 'component', 'count', 'total', 'max')
+        return (
+            List('startup stages:', header) +
+            self.stages.map(self._format) +
+            List('messages:', header) +
+            self.messages.map(self._format)
+        )
+
+__all__ = ('Stats', 'Timing', 'total_key')
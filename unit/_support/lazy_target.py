@@ -0,0 +1,15 @@
+from ribosome.machine.transition import may_handle
+from ribosome.machine.state import Component
+from ribosome.machine.messages import Stage4, Info
+
+stages = []
+
+
+class Target(Component):
+
+    @may_handle(Stage4)
+    def stage_4(self):
+        stages.append(self.msg)
+        return Info('loaded')
+
+__all__ = ('Target',)
@@ -0,0 +1,20 @@
+import asyncio
+
+from amino import Just
+
+from ribosome.machine.message_base import message
+from ribosome.machine.transition import may_handle
+from ribosome.machine.state import Component
+
+Slow = message('Slow')
+delay = 0.2
+
+
+class SlowComponent(Component):
+
+    @may_handle(Slow)
+    async def slow(self):
+        await asyncio.sleep(delay)
+        return Just(self.data)
+
+__all__ = ('Slow', 'SlowComponent', 'delay')
@@ -0,0 +1,69 @@
+import threading
+
+from amino import List, Just, Empty
+
+from proteome.addable import AddableCache
+from proteome.scan import Scanner
+from proteome.project import ProjectLoader
+
+from unit._support.loader import LoaderSpec
+
+
+class AddableCacheSpec(LoaderSpec):
+
+    def setup(self) -> None:
+        super().setup()
+        self.cache = AddableCache(granularity=0, ttl=0)
+
+    def _idents(self) -> List[str]:
+        return self.cache.idents(self.resolver.bases, self.resolver.types)
+
+    def warm(self) -> None:
+        idents = self._idents()
+        scans = self.cache.scans
+        self._idents().should.equal(idents)
+        self.cache.scans.should.equal(scans)
+
+    def refresh(self) -> None:
+        self._idents()
+        self.mk_project_root(self.pypro1_type, 'pypro3')
+        self._idents().should.contain('python/pypro3')
+
+    def sequential(self) -> None:
+        idents = self._idents()
+        self.cache.invalidate()
+        self.cache.idents(self.resolver.bases, self.resolver.types, Scanner(1)).should.equal(idents)
+
+    def invalidate(self) -> None:
+        self._idents()
+        scans = self.cache.scans
+        self.cache.invalidate(Just(self.project_base2))
+        self._idents()
+        self.cache.scans.should.equal(scans + 3)
+
+    def preload(self) -> None:
+        release = threading.Event()
+        self.cache.preload(release.wait)
+        self.cache.preloading.should.be.ok
+        self.cache.current_idents(self.resolver.bases, self.resolver.types).should.be.empty
+        release.set()
+        self.cache._preload.join()
+        self.cache.preloading.should_not.be.ok
+        self.cache.preload(self._idents)
+        self.cache._preload.join()
+        self.cache.current_idents(self.resolver.bases, self.resolver.types).should.contain(self._idents())
+
+    def cold_preload(self) -> None:
+        ''' completion during the first preload scans instead of returning nothing, and its completer isn't kept.
+        '''
+        loader = ProjectLoader(self.config, self.resolver, self.cache)
+        release = threading.Event()
+        self.cache.preload(release.wait)
+        loader.all_ident(Empty()).should.contain('python/pypro1')
+        partial = loader.completer(Empty())
+        partial.complete('pypro1').should_not.be.empty
+        release.set()
+        self.cache._preload.join()
+        loader.completer(Empty()).should_not.be(partial)
+
+__all__ = ('AddableCacheSpec',)
@@ -0,0 +1,117 @@
+from amino import List
+
+from ribosome.nvim import ScratchBuffer
+
+from proteome.git import Repo, RepoState, CommitInfo
+from proteome.components.history.main import Browse, BrowseState, BrowseTransitions, Init
+from proteome.components.history.messages import BrowsePage, HistoryBrowseInput
+
+from unit._support.spec import UnitSpec
+
+
+class _Any(object):
+
+    def __getattr__(self, name):
+        return self
+
+    def __call__(self, *a, **kw):
+        return self
+
+
+class _Buffer(object):
+
+    def __init__(self) -> None:
+        self.lines = ['']
+        self.modifiable = False
+
+    def set_modifiable(self, value: bool) -> None:
+        self.modifiable = value
+
+    def set_content(self, text, rng=slice(None)) -> None:
+        self.modifiable.should.be.ok
+        self.lines[rng] = list(text)
+
+    def nmap(self, keyseq, cmd) -> None:
+        pass
+
+
+class _ScratchBuffer(ScratchBuffer):
+
+    def __init__(self) -> None:
+        self.raw = _Buffer()
+
+    @property
+    def buffer(self):
+        return self.raw
+
+    @property
+    def proxy(self):
+        return self
+
+    @property
+    def options(self):
+        return _Any()
+
+    @property
+    def window(self):
+        return _Any()
+
+    @property
+    def syntax(self):
+        return _Any()
+
+
+class BrowseSpec(UnitSpec):
+
+    def setup(self) -> None:
+        super().setup()
+        self.cursor = []
+        self.vim_mock.should_receive('cursor').replace_with(lambda line, col: self.cursor.append(line))
+        self.vim_mock.should_receive('feedkeys')
+        self.vim_mock.should_receive('doautocmd')
+        self.repo = Repo(None, RepoState())
+        self.scratch = _ScratchBuffer()
+        state = BrowseState(repo=self.repo, current=0, buffer=self.scratch)
+        self.browse = Browse(state, self.vim, None)
+
+    def _commits(self, nums) -> List[CommitInfo]:
+        return List.wrap(nums).map(lambda a: CommitInfo(num=a, hex='{:08x}'.format(a) * 5, timestamp=0, repo=self.repo))
+
+    @property
+    def _ids(self) -> List[str]:
+        return List.wrap(self.scratch.raw.lines).map(lambda a: a.split()[0])
+
+    def navigate(self) -> None:
+        self.browse.send(Init())
+        self.scratch.raw.lines.should.equal([BrowseTransitions.placeholder])
+        self.browse.send(BrowsePage(self.scratch, self._commits(range(3)), True))
+        self._ids.should.equal(List.wrap(range(3)).map('{:08x}'.format))
+        self.browse.send(HistoryBrowseInput('j'))
+        self.browse.send(HistoryBrowseInput('j'))
+        self.browse.send(HistoryBrowseInput('j'))
+        self.browse.state.selected.should.equal(2)
+        self.browse.send(HistoryBrowseInput('k'))
+        self.browse.state.selected.should.equal(1)
+        self.cursor.should.equal([1, 1, 2, 3, 2])
+        self.scratch.raw.modifiable.should_not.be.ok
+
+    def stream(self) -> None:
+        ''' the placeholder is replaced by the first page, the last one ends loading '''
+        self.browse.send(Init())
+        self.browse.send(BrowsePage(self.scratch, self._commits(range(2)), False))
+        self._ids.should.equal(List('00000000', '00000001'))
+        self.browse.state.loading.should.be.ok
+        self.browse.send(BrowsePage(self.scratch, self._commits(range(2, 3)), True))
+        self._ids.should.equal(List('00000000', '00000001', '00000002'))
+        self.browse.state.loading.should_not.be.ok
+        self.browse.send(HistoryBrowseInput('j'))
+        self.browse.state.selected.should.equal(1)
+
+    def empty(self) -> None:
+        ''' a history without commits clears the placeholder '''
+        self.browse.send(Init())
+        self.scratch.raw.lines.should.equal([BrowseTransitions.placeholder])
+        self.browse.send(BrowsePage(self.scratch, List(), True))
+        self.scratch.raw.lines.should.equal([''])
+
+__all__ = ('BrowseSpec',)
@@ -0,0 +1,82 @@
+import time
+from pathlib import Path
+
+from amino import List, Just, Map
+
+from proteome.project import Project
+from proteome.components.history.commit import CommitPool
+from proteome.components.history.data import HistoryState
+from proteome.git import RepoState
+from proteome.git.repo import ProjectRepoState
+
+from unit._support.spec import UnitSpec
+from unit._support.async import test_loop
+
+
+class _Repo(object):
+
+    def __init__(self, base: Path) -> None:
+        self.base = base
+
+
+class CommitPoolSpec(UnitSpec):
+
+    def _candidates(self, count: int, shared: bool=False) -> List:
+        def candidate(i: int) -> tuple:
+            base = Path('/dev/null') if shared else Path('/repo{}'.format(i))
+            return Project.of('pro{}'.format(i), Path('/dev/null')), _Repo(base)
+        return List.range(count).map(candidate)
+
+    def _run(self, pool: CommitPool, candidates: List) -> tuple:
+        active = dict(count=0, max=0, repos=set(), overlap=False)
+        async def commit(project: Project, repo: _Repo):
+            active['count'] += 1
+            active['max'] = max(active['max'], active['count'])
+            active['overlap'] = active['overlap'] or repo.base in active['repos']
+            active['repos'].add(repo.base)
+            await pool.run(time.sleep, 0.02)
+            active['repos'].discard(repo.base)
+            active['count'] -= 1
+            return Just(RepoState(current=Just(project.name)))
+        with test_loop() as loop:
+            results = loop.run_until_complete(pool.commit(candidates, commit))
+        return results, active
+
+    def bounded(self) -> None:
+        results, active = self._run(CommitPool(2), self._candidates(6))
+        active['max'].should.equal(2)
+        results.map(lambda a: a.project.name).should.equal(List.range(6).map('pro{}'.format))
+        results.forall(lambda a: a.duration > 0).should.be.ok
+
+    def repo_lock(self) -> None:
+        results, active = self._run(CommitPool(4), self._candidates(3, shared=True))
+        active['overlap'].should_not.be.ok
+        results.should.have.length_of(3)
+
+    def error(self) -> None:
+        async def commit(project: Project, repo: _Repo):
+            raise Exception('broken')
+        pool = CommitPool(2)
+        with test_loop() as loop:
+            results = loop.run_until_complete(pool.commit(self._candidates(2), commit))
+        results.map(lambda a: a.state.present).should.equal(List(False, False))
+
+    def failed_stays_dirty(self) -> None:
+        candidates = self._candidates(2)
+        broken, ok = candidates.map(lambda a: a[0])
+        async def commit(project: Project, repo: _Repo):
+            if project == broken:
+                raise Exception('broken')
+            return Just(ProjectRepoState(project=project))
+        with test_loop() as loop:
+            results = loop.run_until_complete(CommitPool(2).commit(candidates, commit))
+        paths = List(Path('/dev/null/file'))
+        state = HistoryState(written=Map({broken: paths, ok: paths}))
+        committed = state.committed(results, List(broken, ok), 10.0)
+        committed.written.should.equal(Map({broken: paths}))
+        committed.checked.should.equal(Map({ok: 10.0}))
+        committed.scanned.should.equal(Map({ok: 10.0}))
+        list(committed.repos.keys()).should.equal([ok])
+        committed.timings.should.have.length_of(2)
+
+__all__ = ('CommitPoolSpec',)
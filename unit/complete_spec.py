@@ -0,0 +1,24 @@
+from amino import List
+
+from proteome.complete import Completer
+
+from unit._support.spec import UnitSpec
+
+
+class CompleterSpec(UnitSpec):
+
+    def setup(self) -> None:
+        super().setup()
+        self.completer = Completer(List('python/proteome', 'python/ribosome', 'scala/proteome', 'vim/tek', 'proteome'))
+
+    def prefix_match(self) -> None:
+        self.completer.complete('python/').should.equal(List('python/proteome', 'python/ribosome'))
+        self.completer.complete('pro').should.equal(List('proteome'))
+        self.completer.complete('').should.have.length_of(5)
+
+    def fuzzy_match(self) -> None:
+        self.completer.complete('prtm').should.equal(List('proteome', 'scala/proteome', 'python/proteome'))
+        self.completer.complete('rbs').should.equal(List('python/ribosome'))
+        self.completer.complete('xyz').should.be.empty
+
+__all__ = ('CompleterSpec',)
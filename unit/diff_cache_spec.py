@@ -0,0 +1,36 @@
+from amino import Right, Left
+
+from proteome.git.diff_cache import DiffCache
+
+from unit._support.spec import UnitSpec
+
+
+class DiffCacheSpec(UnitSpec):
+
+    def _patch(self, text: str) -> Right:
+        self.computed.append(text)
+        return Right(text)
+
+    def lru(self) -> None:
+        self.computed = []
+        cache = DiffCache(max_bytes=2 * (64 + 100))
+        key = lambda a: (b'parent', b'target', a)
+        cache.patch(key('a'), lambda: self._patch('a' * 100))
+        cache.patch(key('b'), lambda: self._patch('b' * 100))
+        cache.patch(key('a'), lambda: self._patch('a' * 100))
+        cache.patch(key('c'), lambda: self._patch('c' * 100))
+        cache.patch(key('a'), lambda: self._patch('a' * 100))
+        cache.patch(key('b'), lambda: self._patch('b' * 100))
+        len(self.computed).should.equal(4)
+        cache.count.should.equal(2)
+        cache.size.should.equal(2 * (64 + 100))
+        (cache.hits, cache.misses).should.equal((2, 4))
+
+    def oversized(self) -> None:
+        cache = DiffCache(max_bytes=100)
+        cache.patch((b'a', b'b', None), lambda: Right('x' * 1000)).should.equal(Right('x' * 1000))
+        cache.count.should.equal(0)
+        cache.patch((b'a', b'c', None), lambda: Left('empty diff'))
+        cache.count.should.equal(1)
+
+__all__ = ('DiffCacheSpec',)
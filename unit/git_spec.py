@@ -1,12 +1,29 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from functools import wraps
 
-from proteome.components.history import History, HistoryGit
+from flexmock import flexmock
+
+from dulwich.objects import Blob
+from dulwich.object_store import DiskObjectStore
+
+from proteome.components.history.data import History
+from proteome.components.history.process import HistoryGit
+from proteome.git.snapshot import Snapshot
+from proteome.git.commit_index import index_name, CommitIndex
+from proteome.git.repo import Diff, DulwichRepo, repo_handles
+from proteome.git.maintenance import Gc, loose_objects
+from proteome.git.retention import Retention, Thinning
 
 from unit.project_spec import LoaderSpec
 from unit._support.async import test_loop
 
-from amino import __, curried, _
+from amino import __, curried, _, List, Right, Just
+from amino.lazy_list import LazyList
 from amino.lazy import lazy
+from amino.test import temp_dir
 
 from ribosome.nvim import ScratchBuffer
 
@@ -157,4 +174,357 @@ class GitSpec(LoaderSpec):
             (lambda a: a.current_commit_info.map(_.num).should.contain(0))
         )
 
+    @with_repo
+    def commit_paths(self, repo, commit):
+        file1 = self.pro1.root / 'test_file'
+        file2 = self.pro1.root / 'test_file_2'
+        file1.write_text('first')
+        file2.write_text('first')
+        def check(repo):
+            repo.head_commit.map(_.message).should.equal(Right(b'first'))
+            repo.index_dirty.should_not.be.ok
+            list(repo.index).should.equal([b'test_file'])
+        return repo / __.add_commit_paths(List(file1), 'first') % check
+
+    @with_repo
+    def snapshot_stat_cache(self, repo, commit):
+        file1 = self.pro1.root / 'test_file'
+        file1.write_text('first')
+        os.utime(str(file1), (0, 0))
+        def check(repo):
+            snapshot = Snapshot(repo.repo)
+            snapshot.stage(List('test_file')).should.be.empty
+            snapshot.hashed.should.equal(0)
+            file1.write_text('second')
+            Snapshot(repo.repo).stage(List('test_file')).should.equal(List('test_file'))
+            repo.index_dirty.should.be.ok
+        return repo / __.add_commit_paths(List(file1), 'first') % check
+
+    @with_repo
+    def scan_worktree(self, repo, commit):
+        root = self.pro1.root
+        excludes = self.pro1.root.parent / 'excludes'
+        excludes.write_text('*.log\n')
+        repo.repo.init(Just(excludes))
+        (root / 'sub' / 'ignored').mkdir(parents=True)
+        (root / '.gitignore').write_text('ignored/\n')
+        (root / 'sub' / 'file').write_text('first')
+        (root / 'sub' / 'ignored' / 'file').write_text('first')
+        (root / 'test.log').write_text('first')
+        (root / 'test_file').write_text('first')
+        def check(repo):
+            sorted(repo.index).should.equal([b'.gitignore', b'sub/file', b'test_file'])
+            (root / 'test_file').unlink()
+            repo.stage_worktree().should.equal(Right(List('test_file')))
+            sorted(repo.index).should.equal([b'.gitignore', b'sub/file'])
+        repo.repo.stage_worktree().should.be.right
+        return repo % check
+
+    @with_repo
+    def commit_index(self, repo, commit):
+        file1 = self.pro1.root / 'test_file'
+        file2 = self.pro1.root / 'test_file_2'
+        def empty_commit(repo):
+            repo.repo.do_commit(message=b'empty', ref=b'refs/heads/master')
+        def check(repo):
+            lines = (self.rep / index_name).read_text().splitlines()
+            lines.should.have.length_of(2)
+            fresh = self.hist.repo(self.pro1).x
+            entries = LazyList(fresh.commit_index.chain(fresh.repo, fresh._head_id.to_maybe))
+            entries.drain.map(_.empty).should.equal(List(True, False, False))
+            entries.drain.map(_.paths).should.equal(List(List(), List('test_file_2'), List('test_file')))
+            fresh._history_info(entries.drain).drain.map(_.num).should.equal(List(1, 2))
+            (self.rep / index_name).read_text().splitlines().should.have.length_of(3)
+        file1.write_text('first')
+        return (
+            repo /
+            __.add_commit_paths(List(file1), 'first') @
+            (lambda: file2.write_text('second')) /
+            __.add_commit_paths(List(file2), 'second') %
+            empty_commit %
+            check
+        )
+
+    @with_repo
+    def file_chain(self, repo, commit):
+        sub = self.pro1.root / 'sub'
+        sub.mkdir()
+        file1 = sub / 'test_file'
+        file2 = self.pro1.root / 'test_file_2'
+        def raw_commit(path, content):
+            def run(repo):
+                path.write_text(content)
+                Snapshot(repo.repo).scan()
+                repo.repo.do_commit(message=content.encode(), ref=b'refs/heads/master')
+            return run
+        def chain(repo, path):
+            index = repo.commit_index
+            return List.wrap(index.file_chain(repo.repo, repo._head_id.to_maybe, path)).map(lambda a: a.id)
+        def check(repo):
+            ids = List.wrap(repo.repo.get_walker()).map(lambda a: a.commit.id.decode())
+            chain(repo, 'sub/test_file').should.equal(List(ids[1], ids[3]))
+            chain(repo, 'test_file_2').should.equal(List(ids[0], ids[2]))
+            (self.rep / index_name).exists().should_not.be.ok
+            ids.foreach(lambda a: repo.commit_index.record(repo.repo, a.encode()))
+            chain(repo, 'sub/test_file').should.equal(List(ids[1], ids[3]))
+            chain(repo, 'sub').should.be.empty
+            flexmock(repo.commit_index).should_receive('file_chain').never()
+            List.wrap(repo._file_entries(Path('/dev/null/test_file'))).should.be.empty
+        return (
+            repo %
+            raw_commit(file1, 'first') %
+            raw_commit(file2, 'second') %
+            raw_commit(file1, 'third') %
+            raw_commit(file2, 'fourth') %
+            check
+        )
+
+    @with_repo
+    def file_patches(self, repo, commit):
+        sub = self.pro1.root / 'sub'
+        sub.mkdir()
+        file1 = sub / 'test_file'
+        file2 = self.pro1.root / 'test_file_2'
+        file3 = self.pro1.root / 'test_file_3'
+        def raw_commit(content):
+            def run(repo):
+                file1.write_text(content)
+                file2.write_text(content)
+                Snapshot(repo.repo).scan()
+                repo.repo.do_commit(message=content.encode(), ref=b'refs/heads/master')
+            return run
+        def check(repo):
+            head = repo.repo[repo._head_id.get_or_else('').encode()]
+            diff = Diff(repo, head.tree, repo.repo[head.parents[0]].tree)
+            paths = List('sub/test_file', 'test_file_2', 'test_file_3', 'sub')
+            patches = diff.file_patches(paths)
+            patches.k.should.contain('sub')
+            for path in paths[:2]:
+                patch = patches[path].get_or_else('')
+                patch.should.contain('b/{}'.format(path))
+                patch.should.contain('+second')
+                diff.file_patch(path).should.equal(patches[path])
+                diff.patch.get_or_else('').should.contain(patch)
+            patches['test_file_3'].should.equal(diff.file_patch('test_file_3'))
+            patches['test_file_3'].value.should.contain('+third')
+            patches['sub'].is_left.should.be.ok
+        return (
+            repo %
+            raw_commit('first') @
+            (lambda: file3.write_text('third')) %
+            raw_commit('second') %
+            check
+        )
+
+    @with_repo
+    def commit_line(self, repo, commit):
+        file1 = self.pro1.root / 'test_file_2'
+        def raw_commit(content):
+            def run(repo):
+                file1.write_text(content)
+                Snapshot(repo.repo).scan()
+                repo.repo.do_commit(message=content.encode(), ref=b'refs/heads/master')
+            return run
+        def ids(repo):
+            return List.wrap(repo.repo.get_walker()).map(lambda a: a.commit.id.decode())
+        def check(repo):
+            index = repo.commit_index
+            hist = ids(repo)
+            line = index.line(repo.repo, hist[0])
+            line.ids.should.equal(list(hist.reversed))
+            line.position(hist[2]).should.contain(2)
+            line.at(1).should.contain(hist[1])
+            line.at(3).should.be.empty
+            line.child(hist[2]).should.contain(hist[1])
+            line.child(hist[2], 2).should.contain(hist[0])
+            line.child(hist[0]).should.be.empty
+            index.line(repo.repo, hist[1]).head.should.contain(hist[1])
+            index.line(repo.repo, hist[1]).ids.should.equal(list(hist[1:].reversed))
+        def advance(repo):
+            index = repo.commit_index
+            line = index.line(repo.repo, ids(repo)[0])
+            raw_commit('fourth')(repo)
+            hist = ids(repo)
+            index.line(repo.repo, hist[0]).should.be(line)
+            line.position(hist[3]).should.contain(3)
+        return (
+            repo %
+            raw_commit('first') %
+            raw_commit('second') %
+            raw_commit('third') %
+            check %
+            advance
+        )
+
+    @with_repo
+    def gc(self, repo, commit):
+        file1 = self.pro1.root / 'test_file_2'
+        orphan = Blob.from_string(b'orphan')
+        recent = Blob.from_string(b'recent')
+        def raw_commit(content):
+            def run(repo):
+                file1.write_text(content)
+                Snapshot(repo.repo).scan()
+                repo.repo.do_commit(message=content.encode(), ref=b'refs/heads/master')
+            return run
+        def loose(repo):
+            return set(a for a, st in loose_objects(repo.repo.object_store))
+        def orphans(repo):
+            store = repo.repo.object_store
+            store.add_object(orphan)
+            store.add_object(recent)
+            old = time.time() - 120
+            os.utime(store._get_shafile_path(orphan.id), (old, old))
+        def collect(repo):
+            store = repo.repo.object_store
+            before = loose(repo)
+            result = Gc(repo.repo, grace=60).run()
+            result.packed.should.equal(len(before) - 2)
+            result.pruned.should.equal(1)
+            result.reclaimed.should.be.greater_than(0)
+            loose(repo).should.equal(set([recent.id]))
+            len(store.packs).should.equal(1)
+            List.wrap(repo.repo.get_walker()).should.have.length_of(2)
+        def consolidate(repo):
+            store = repo.repo.object_store
+            repo.repo.refs[b'refs/heads/master'] = repo.repo[repo.repo.head()].parents[0]
+            repo.repo.refs[b'HEAD'] = repo.repo.refs[b'refs/heads/master']
+            len(store.packs).should.equal(2)
+            result = Gc(repo.repo, grace=60, pack_limit=1).run()
+            result.packed.should.equal(0)
+            result.pruned.should.equal(2)
+            len(store.packs).should.equal(1)
+            loose(repo).should.equal(set([recent.id]))
+            List.wrap(repo.repo.get_walker()).should.have.length_of(2)
+        return (
+            repo %
+            raw_commit('first') %
+            raw_commit('second') %
+            orphans %
+            collect %
+            raw_commit('third') %
+            (lambda r: Gc(r.repo, grace=60).run()) %
+            consolidate
+        )
+
+    @with_repo
+    def thinning(self, repo, commit):
+        file1 = self.pro1.root / 'test_file_2'
+        now = time.time()
+        day = (int(now) // 86400 - 20) * 86400
+        hour = (int(now) // 3600 - 72) * 3600
+        stamps = List(day, day + 3600, day + 86400, hour + 10, hour + 20, now - 100, now - 50)
+        def raw_commit(stamp):
+            def run(repo):
+                file1.write_text(str(stamp))
+                Snapshot(repo.repo).scan()
+                repo.repo.do_commit(message=str(stamp).encode(), ref=b'refs/heads/master',
+                                    commit_timestamp=stamp, author_timestamp=stamp)
+            return run
+        def ids(repo):
+            return List.wrap(repo.repo.get_walker()).map(lambda a: a.commit.id.decode()).reversed
+        def messages(repo):
+            return ids(repo).map(lambda a: repo.repo[a.encode()].message.decode())
+        def check(repo):
+            index = repo.commit_index
+            old = ids(repo)
+            rules = List((86400, 3600), (604800, 86400))
+            thin = lambda pinned: Thinning(repo.repo, index, Retention(rules), pinned).run(now)
+            Thinning(repo.repo, index, Retention(), List()).run(now).should.be.empty
+            first = thin(List(old[3]))
+            len(first).should.equal(7)
+            messages(repo).should.equal(stamps.map(str).without(str(stamps[0])))
+            mid = ids(repo)
+            second = thin(List())
+            len(second).should.equal(4)
+            messages(repo).should.equal(List(1, 2, 4, 5, 6).map(lambda a: str(stamps[a])))
+            new = ids(repo)
+            index.rewritten(old[0]).should.equal(new[0])
+            index.rewritten(old[3]).should.equal(new[2])
+            index.rewritten(old[6]).should.equal(new[4])
+            repo.copy(repo.state.set(current=Just(old[3]))).current.should.contain(new[2])
+            len(index.path.read_text().splitlines()).should.equal(len(new) + 1)
+            fresh = CommitIndex(index.path)
+            fresh.rewritten(mid[2]).should.equal(new[2])
+            fresh.rewritten(mid[5]).should.equal(new[4])
+            List.wrap(fresh.chain(repo.repo, Just(new[4]))).map(lambda a: a.id).should.equal(new.reversed)
+            thin(List()).should.be.empty
+        return (
+            stamps.map(raw_commit).fold_left(repo)(lambda z, a: z % a) %
+            check
+        )
+
+    @with_repo
+    def shared_objects(self, repo, commit):
+        shared = Path(temp_dir('history', 'shared', 'objects'))
+        worktree = Path(temp_dir('history', 'shared', 'pro2'))
+        other = DulwichRepo.create(worktree, Path(temp_dir('history', 'shared', 'pro2_store')))
+        blob = Blob.from_string(b'vendored')
+        def gc(repo):
+            return Gc(repo, shared=Just(DiskObjectStore(str(shared)))).run()
+        def raw_commit(repo, root, msg):
+            (root / 'vendored').write_text('vendored')
+            Snapshot(repo).scan()
+            repo.do_commit(message=msg, ref=b'refs/heads/master')
+        def check(repo):
+            repo.repo.share(shared)
+            repo.repo.share(shared)
+            list(repo.repo.object_store._read_alternate_paths()).should.equal([str(shared)])
+            flexmock(repo.repo.object_store).should_call('_read_alternate_paths').never()
+            repo.repo.share(shared)
+            raw_commit(repo.repo, self.pro1.root, b'first')
+            gc(repo.repo).packed.should.equal(3)
+            len(DiskObjectStore(str(shared)).packs).should.equal(1)
+            len(repo.repo.object_store.packs).should.equal(0)
+            set(loose_objects(repo.repo.object_store)).should.be.empty
+            List.wrap(repo.repo.get_walker()).should.have.length_of(1)
+            other.share(shared)
+            raw_commit(other, worktree, b'second')
+            other.object_store.contains_loose(blob.id).should.be.false
+            result = gc(other)
+            (result.packed, result.deduplicated).should.equal((1, 1))
+            other[other.head()].tree.should.equal(repo.repo[repo.repo.head()].tree)
+            loose = Blob.from_string(b'loose')
+            DiskObjectStore(str(shared)).add_object(loose)
+            (worktree / 'loose').write_text('loose')
+            Snapshot(other).scan()
+            other.object_store.contains_loose(loose.id).should.be.false
+        return repo % check
+
+    @with_repo
+    def repo_handles(self, repo, commit):
+        adapter = self.hist.adapter(self.pro1)
+        file1 = self.pro1.root / 'test_file'
+        def check(repo):
+            handle = adapter._repo
+            handle.should.be(repo.repo)
+            repo.ref('HEAD').should.equal(repo.ref('refs/heads/master'))
+            file1.write_text('external')
+            other = DulwichRepo(self.rep)
+            Snapshot(other).scan()
+            second = other.do_commit(message=b'external', ref=b'refs/heads/master')
+            other.close()
+            handle.ref_id(b'refs/heads/master').should.equal(second)
+            flexmock(handle.refs).should_call('follow').once()
+            repo.ref('HEAD').should.equal(Right(second))
+            flexmock(handle.refs).should_call('follow').never()
+            repo.ref('HEAD').should.equal(Right(second))
+            repo_handles.close(self.rep)
+            adapter._repo.should_not.be(handle)
+        return repo / commit('first') % check
+
+    @with_repo
+    def concurrent_reads(self, repo, commit):
+        def check(repo):
+            Gc(DulwichRepo(self.rep), grace=0).run()
+            handle = repo.repo
+            ids = List.wrap(handle.object_store)
+            expected = ids.map(lambda a: handle[a].as_raw_string())
+            handle.object_store.close()
+            read = lambda n: ids.map(lambda a: handle[a].as_raw_string())
+            with ThreadPoolExecutor(4) as ex:
+                results = List.wrap(ex.map(read, range(8)))
+            results.should.equal(List.wrap([expected] * 8))
+        return repo / commit('first') / commit('second') % check
+
 __all__ = ('GitSpec',)
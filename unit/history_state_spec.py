@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from amino import List, Map
+
+from proteome.project import Project
+from proteome.components.history.data import HistoryState
+from proteome.settings import default_history_scan_interval
+
+from unit._support.spec import UnitSpec
+
+interval = default_history_scan_interval
+
+
+class HistoryStateSpec(UnitSpec):
+
+    def setup(self) -> None:
+        super().setup()
+        self.pro1 = Project.of('pro1', Path('/dev/null/pro1'))
+        self.pro2 = Project.of('pro2', Path('/dev/null/pro2'))
+        self.projects = List(self.pro1, self.pro2)
+        self.file1 = self.pro1.root / 'file'
+
+    def _scan(self, state: HistoryState, now: float) -> List[Project]:
+        return self.projects.filter(lambda a: state.scan_due(a, now, interval))
+
+    def skip_clean(self) -> None:
+        state = HistoryState(scanned=Map({self.pro1: 100.0, self.pro2: 100.0}))
+        scan = self._scan(state, 110.0)
+        scan.should.be.empty
+        state.dirty(self.projects, scan).should.be.empty
+        written = state.record_written(self.file1, List(self.pro1))
+        written.dirty(self.projects, scan).should.equal(List(self.pro1))
+
+    def scan_interval(self) -> None:
+        state = HistoryState(scanned=Map({self.pro1: 100.0}))
+        self._scan(state, 100.0 + interval - 1).should.equal(List(self.pro2))
+        scan = self._scan(state, 100.0 + interval)
+        scan.should.equal(self.projects)
+        state.dirty(self.projects, scan).should.equal(self.projects)
+
+    def record_written(self) -> None:
+        state = HistoryState().record_written(self.file1, List(self.pro1))
+        again = state.record_written(self.file1, List(self.pro1, self.pro2))
+        again.written.get(self.pro1).should.contain(List(self.file1))
+        again.written.get(self.pro2).should.contain(List(self.file1))
+
+    def modified_on_disk(self) -> None:
+        state = HistoryState(checked=Map({self.pro1: 100.0}))
+        state.modified(self.pro1, 99.0).should_not.be.ok
+        state.modified(self.pro1, 101.0).should.be.ok
+        state.modified(self.pro2, 0.0).should.be.ok
+
+__all__ = ('HistoryStateSpec',)
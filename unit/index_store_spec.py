@@ -0,0 +1,67 @@
+import sqlite3
+from pathlib import Path
+
+from amino import List, Just, Empty
+from amino.test import temp_dir
+
+from proteome.addable import AddableCache
+from proteome.project_config import ConfigCache
+from proteome.index_store import IndexStore
+
+from unit._support.loader import LoaderSpec
+
+
+class IndexStoreSpec(LoaderSpec):
+
+    def setup(self) -> None:
+        super().setup()
+        self.store_path = temp_dir('index_store') / 'index.sqlite'
+        if self.store_path.exists():
+            self.store_path.unlink()
+
+    def _cache(self) -> AddableCache:
+        cache = AddableCache(granularity=0, ttl=0)
+        cache.store = Just(IndexStore(self.store_path))
+        return cache
+
+    def _idents(self, cache: AddableCache) -> List[str]:
+        return cache.idents(self.resolver.bases, self.resolver.types)
+
+    def dirs(self) -> None:
+        idents = self._idents(self._cache())
+        cache = self._cache()
+        self._idents(cache).should.equal(idents)
+        cache.scans.should.equal(0)
+        self.mk_project_root(self.pypro1_type, 'pypro3')
+        self._idents(cache).should.contain('python/pypro3')
+        cache.scans.should.equal(1)
+
+    def version(self) -> None:
+        self._idents(self._cache())
+        db = sqlite3.connect(str(self.store_path))
+        db.execute('update meta set value = ? where key = ?', ('0', 'version'))
+        db.commit()
+        db.close()
+        cache = self._cache()
+        self._idents(cache)
+        cache.scans.should.be.greater_than(0)
+
+    def configs(self) -> None:
+        cache = ConfigCache()
+        cache.store = Just(IndexStore(self.store_path))
+        records = cache.records(self.config).records
+        cache2 = ConfigCache()
+        cache2.store = Just(IndexStore(self.store_path))
+        cache2.records(self.config).records.should.equal(records)
+        cache2.parses.should.equal(0)
+
+    def drop_dirs(self) -> None:
+        store = IndexStore(self.store_path)
+        paths = List(Path('/base/a_b'), Path('/base/a_b/c'), Path('/base/axb/c'), Path('/base/a_bc'))
+        paths.foreach(lambda a: store.store_dir(a, 1, List('x')))
+        store.drop_dirs(Just(Path('/base/a_b')))
+        paths.map(lambda a: store.dir(a).is_just).should.equal(List(False, False, True, True))
+        store.drop_dirs(Empty())
+        store.dir(Path('/base/axb/c')).should.be.empty
+
+__all__ = ('IndexStoreSpec',)
@@ -0,0 +1,48 @@
+import threading
+
+from amino import List, Just
+
+from proteome.components.history.loader import BrowseLoader
+
+from unit._support.spec import UnitSpec
+
+
+class _Commit(object):
+
+    def __init__(self, num: int) -> None:
+        self.num = num
+        self.diffed = List()
+
+    def show_diff(self, path):
+        self.diffed = self.diffed.cat(path)
+
+
+class BrowseLoaderSpec(UnitSpec):
+
+    def pages(self) -> None:
+        commits = List.wrap(range(5)).map(_Commit)
+        pages = []
+        loader = BrowseLoader(lambda: commits, lambda a, done: pages.append((a.map(lambda c: c.num), done)),
+                              Just('file'), page_size=2, flush_interval=3600)
+        loader.start().result(5).should.equal(5)
+        pages.should.equal([(List(0, 1), False), (List(2, 3), False), (List(4), True)])
+        commits.map(lambda a: a.diffed).should.equal(List.wrap([List(Just('file'))] * 5))
+
+    def cancel(self) -> None:
+        started = threading.Event()
+        resume = threading.Event()
+        pages = []
+        def commits():
+            yield _Commit(0)
+            started.set()
+            resume.wait(5)
+            yield _Commit(1)
+        loader = BrowseLoader(commits, lambda a, done: pages.append(a), page_size=1)
+        future = loader.start()
+        started.wait(5)
+        loader.cancel()
+        resume.set()
+        future.result(5).should.equal(1)
+        len(pages).should.equal(1)
+
+__all__ = ('BrowseLoaderSpec',)
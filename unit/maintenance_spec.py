@@ -0,0 +1,46 @@
+import shutil
+from pathlib import Path
+
+from amino import Empty
+from amino.test import temp_dir
+
+from proteome.git import DulwichRepo
+from proteome.components.history.maintenance import Maintenance
+
+from unit._support.spec import UnitSpec
+
+
+class _Repo(object):
+
+    def __init__(self, base: Path, repo: DulwichRepo) -> None:
+        self.base = base
+        self.repo = repo
+        self.current = Empty()
+
+
+class MaintenanceSpec(UnitSpec):
+
+    def _repo(self) -> _Repo:
+        store = Path(temp_dir('maintenance', 'store'))
+        shutil.rmtree(str(store))
+        worktree = Path(temp_dir('maintenance', 'worktree'))
+        return _Repo(worktree, DulwichRepo.create(worktree, store))
+
+    def interval(self) -> None:
+        maintenance = Maintenance()
+        repo = self._repo()
+        maintenance.schedule(repo, 0, 0).should.be.empty
+        first = maintenance.schedule(repo, 3600, 0)
+        first.get_or_else(None).result(5).map(lambda a: a.packed).should.contain(0)
+        maintenance.schedule(repo, 3600, 0).should.be.empty
+        maintenance.stats.runs.should.equal(1)
+        maintenance.results.keys().should.contain(repo.base)
+        maintenance.stats.report()[0].should.contain('1 runs')
+
+    def loose_limit(self) -> None:
+        maintenance = Maintenance()
+        future = maintenance.schedule(self._repo(), 3600, 1000)
+        future.get_or_else(None).result(5).should.be.empty
+        maintenance.stats.runs.should.equal(0)
+
+__all__ = ('MaintenanceSpec',)
@@ -0,0 +1,32 @@
+import sys
+import importlib
+
+from proteome.profile import StartupProfile
+
+from unit._support.spec import UnitSpec
+
+target = 'unit._support.lazy_target'
+
+
+class StartupProfileSpec(UnitSpec):
+
+    def imports(self) -> None:
+        sys.modules.pop(target, None)
+        profile = StartupProfile()
+        profile.start()
+        try:
+            importlib.import_module(target)
+        finally:
+            profile.stop()
+        profile.imports.should.contain(target)
+        total, own = profile.imports[target]
+        own.should.be.lower_than(total + 1e-9)
+        profile.report()[1].should.contain(target)
+
+    def stages(self) -> None:
+        profile = StartupProfile()
+        profile.stage('Stage1', 'core', 0.5)
+        profile.stage('Stage1', 'core', 0.25)
+        profile.stages[('Stage1', 'core')].should.equal(0.75)
+
+__all__ = ('StartupProfileSpec',)
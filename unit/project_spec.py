@@ -1,9 +1,13 @@
+from flexmock import flexmock
+
 from amino.test import temp_dir
 
 from amino import Just, List, Empty, Map, Path, _, __
 
+import proteome.project
 from proteome.project import Project, Projects, ProjectAnalyzer
 from proteome.logging import Logging
+from proteome.project_config import ConfigCache
 
 from unit._support.loader import LoaderSpec
 
@@ -30,6 +34,25 @@ class ProjectsSpec(LoaderSpec):
         pro.map(_.root).should.equal(Just(Path(d)))
         (p2 - pro._get).projects.should.be.empty
 
+    def index(self):
+        t = 'sometype'
+        p1 = Project.of('pro1', Path('/dir/to/pro1'), Just(t))
+        p2 = Project.of('pro2', Path('/dir/to/pro2'))
+        p3 = Project.of('pro1', Path('/dir/to/pro3'), Just('other'))
+        pros = (Projects() + p1 + p2) ** List(p3)
+        pros.project('pro1').should.contain(p1)
+        pros.project('other/pro1').should.contain(p3)
+        pros.by_root(Path('/dir/to/pro2')).should.contain(p2)
+        pros.index_of_ident('other/pro1').should.contain(2)
+        ('sometype/pro1' in pros).should.be.ok
+        flexmock(proteome.project).should_receive('_index_keys').never()
+        removed = pros - p1
+        removed.project('pro1').should.contain(p3)
+        removed.index_of_ident('pro2').should.contain(0)
+        removed.index_of(p3).should.contain(1)
+        ('sometype/pro1' in removed).should_not.be.ok
+        removed.by_root(Path('/dir/to/pro1')).should.be.empty
+
 
 class ProjectLoaderSpec(LoaderSpec):
 
@@ -117,6 +140,21 @@ class ProjectLoaderSpec(LoaderSpec):
         set(self.loader.main_ident(Just(self.pypro1_type))).should.equal(pros)
 
 
+class ConfigCacheSpec(LoaderSpec):
+
+    def reparse(self):
+        conf = temp_dir('config_cache') / 'projects.json'
+        conf.write_text('[{"name": "pro1", "type": "tpe", "root": "~/pro1"}]')
+        cache = ConfigCache()
+        cache.records(conf.parent).by_type_name('tpe', 'pro1').should.be.a(Just)
+        cache.records(conf.parent).by_root(Path.home() / 'pro1').should.be.a(Just)
+        cache.parses.should.equal(1)
+        conf.write_text('[{"name": "pro2", "type": "tpe"}]')
+        cache.records(conf.parent).by_name('pro2').should.be.a(Just)
+        cache.records(conf.parent).by_name('pro1').should.be.empty
+        cache.parses.should.equal(2)
+
+
 class ProjectResolverSpec(LoaderSpec, Logging):
 
     def setup(self, *a, **kw):
@@ -140,4 +178,4 @@ class ProjectAnalyzerSpec(LoaderSpec, Logging):
         anal._detect_data(root).map(__['types']).should.contain(types)
 
 
-__all__ = ('ProjectsSpec', 'ProjectLoaderSpec', 'ProjectResolverSpec', 'ProjectResolverSpec')
+__all__ = ('ProjectsSpec', 'ProjectLoaderSpec', 'ConfigCacheSpec', 'ProjectResolverSpec', 'ProjectResolverSpec')
@@ -87,6 +87,7 @@ class ProteomeSpec(LoaderSpec):
         def setup(self):
             self.vim.vars.set_p('all_projects_history', 1)
             self.vim.vars.set('proteome_history_base', str(self.history_base))
+            self.vim.vars.set_p('history_scan_interval', 0)
             self.plug_name = 'proteome.components.history'
             self.main_project = self.mk_project('pro1', 'c')
             self.test_file_1 = self.main_project.root / 'test_file_1'
@@ -117,7 +118,7 @@ class ProteomeSpec(LoaderSpec):
             p2 = self.mk_project('pro2', 'go')
             pros = List(p1, p2)
             with self._prot(List(self.plug_name), pros=pros) as prot:
-                prot.plug_command('history', 'Stage4', List())
+                prot.plug_command('history', 'HistoryInit', List())
                 later(lambda: check_head(p1))
                 check_head(p2)
 
@@ -128,7 +129,7 @@ class ProteomeSpec(LoaderSpec):
             hist = History(self.history_base)
             with self._prot(List(self.plug_name), pros=pros) as prot:
                 with test_loop() as loop:
-                    prot.plug_command('history', 'Stage4', List())
+                    prot.plug_command('history', 'HistoryInit', List())
                     plug = prot.plugin('history').x
                     self.test_file_1.write_text('test')
                     prot.plug_command('history', 'Commit', List())
@@ -141,7 +142,7 @@ class ProteomeSpec(LoaderSpec):
             pros = List(p1, p2)
             with self._prot(List(self.plug_name), pros=pros) as prot:
                 with test_loop() as loop:
-                    prot.plug_command('history', 'Stage4', List())
+                    prot.plug_command('history', 'HistoryInit', List())
                     self._three_commits(prot, loop)
                     prot.plug_command('history', 'HistoryLog', List())
                     prot.plug_command('history', 'HistoryPrev', List())
@@ -0,0 +1,24 @@
+from amino import List
+
+from proteome.components.history.render import scroll, line_changes
+
+from unit._support.spec import UnitSpec
+
+
+class RenderSpec(UnitSpec):
+
+    def scroll(self) -> None:
+        scroll(0, 10, 40, 5).should.equal(0)
+        scroll(0, 35, 40, 5).should.equal(1)
+        scroll(100, 102, 40, 5).should.equal(97)
+        scroll(0, 3, 40, 5).should.equal(0)
+        scroll(4000, 4020, 40, 5).should.equal(4000)
+
+    def line_changes(self) -> None:
+        old = List('a', 'b', 'diff1', 'diff2', 'c', 'd')
+        new = List('a', 'b', 'c', 'diff3', 'd')
+        line_changes(old, new).should.equal((2, 5, List('c', 'diff3')))
+        line_changes(old, old).should.equal((6, 6, List()))
+        line_changes(List(''), List('a')).should.equal((0, 1, List('a')))
+
+__all__ = ('RenderSpec',)
@@ -0,0 +1,53 @@
+import sys
+
+from amino import List
+
+from ribosome.machine.messages import Stage1, Stage4
+
+from proteome.state import lazy_component
+from proteome import History
+from proteome.components.core import Save, BufWritten, BufEnter, Removed, Next
+
+from unit._support.spec import UnitSpec
+
+target = 'unit._support.lazy_target'
+
+
+class LazyComponentSpec(UnitSpec):
+
+    def setup(self) -> None:
+        super().setup()
+        sys.modules.pop(target, None)
+
+    def load(self) -> None:
+        component = lazy_component('{}.Target'.format(target), triggers=List(Stage4))(self.vim, 'target')
+        component.process(None, Stage1()).handled.should_not.be.ok
+        sys.modules.should_not.contain(target)
+        component.loaded.should_not.be.ok
+        component.process(None, Stage4()).handled.should.be.ok
+        component.loaded.should.be.ok
+        sys.modules.should.contain(target)
+
+    def invalid(self) -> None:
+        component = lazy_component('{}.Missing'.format(target), triggers=List(Stage4))(self.vim, 'target')
+        component.process(None, Stage4()).handled.should_not.be.ok
+        component.loaded.should.be.ok
+        component.prios.should.equal(List(0.5))
+
+    def init(self) -> None:
+        ''' the init messages are processed once, when the component is loaded '''
+        component = lazy_component('{}.Target'.format(target), triggers=List(Stage1),
+                                   init=List(Stage4()))(self.vim, 'target')
+        component.process(None, Stage1()).handled.should.be.ok
+        component.process(None, Stage1()).handled.should_not.be.ok
+        sys.modules[target].stages.should.have.length_of(1)
+
+    def history_triggers(self) -> None:
+        ''' every message handled by the history component loads it, but the startup stages don't '''
+        component = History(self.vim, 'history')
+        triggers = List(Save(), BufWritten('/dev/null'), BufEnter(None), Removed(None))
+        triggers.filter(lambda a: not component.relevant(a)).should.be.empty
+        component.relevant(Next()).should_not.be.ok
+        component.relevant(Stage4()).should_not.be.ok
+
+__all__ = ('LazyComponentSpec',)
@@ -0,0 +1,75 @@
+import time
+from pathlib import Path
+
+from amino import Just, List, Map
+
+from ribosome.nvim import NvimFacade
+from ribosome.settings import Config
+
+from proteome import mk_config
+from proteome.env import Env
+from proteome.project import Project, Projects
+from proteome.state import ProteomeRootMachine
+from proteome.stats import Stats
+from proteome.components.core import Next
+
+from unit._support.spec import UnitSpec
+from unit._support.slow import Slow, SlowComponent, delay
+
+null = Path('/dev/null')
+
+
+class StatsSpec(UnitSpec):
+
+    def setup(self) -> None:
+        super().setup()
+        self.vim.vars.set_p('stats', 0)
+
+    def record(self) -> None:
+        stats = Stats(True)
+        stats.record('Stage1', 'core', 0.5)
+        stats.record('Stage1', 'core', 0.25)
+        stats.record('Add', 'core', 0.1)
+        stats.data['Stage1']['core'].should.equal(dict(count=2, total=0.75, max=0.5))
+        stats.stages.should.have.length_of(1)
+        stats.messages.should.have.length_of(1)
+        stats.report().should.have.length_of(6)
+
+    def _root(self, pros: Projects=Projects(), **kw) -> ProteomeRootMachine:
+        def ctor(config: Config, vim: NvimFacade) -> Env:
+            return Env(projects=pros, config=config, vim_facade=Just(vim))
+        return ProteomeRootMachine(self.vim, mk_config(state_ctor=ctor, **kw), 'proteome')
+
+    def root(self) -> None:
+        self.vim.vars.set_p('stats', 1)
+        self.vim_mock.should_receive('switch_root').and_return(None)
+        pros = Projects(projects=List(Project.of('pro1', null), Project.of('pro2', null)))
+        root = self._root(pros)
+        root.start()
+        root.send_sync(Next()).current.should.equal(pros.projects.lift(1))
+        timings = root.stats.data['Next']
+        timings.should.contain('core')
+        timings['total']['count'].should.equal(1)
+
+    def coroutine(self) -> None:
+        ''' the time of an async handler includes awaiting its coroutine '''
+        self.vim.vars.set_p('stats', 1)
+        root = self._root(components=Map(slow=SlowComponent), core_components=List(),
+                          default_components=List('slow'))
+        root.start()
+        root.wait_for_running()
+        root.send(Slow())
+        deadline = time.time() + 5
+        while not root.stats.data.get('Slow').exists(lambda a: 'slow' in a) and time.time() < deadline:
+            time.sleep(0.01)
+        root.stop()
+        timings = root.stats.data['Slow']
+        timings['slow']['count'].should.equal(1)
+        timings['slow']['total'].should.be.greater_than(delay)
+        timings['total']['count'].should.equal(1)
+        timings['total']['total'].should.be.greater_than(delay)
+
+    def disabled(self) -> None:
+        self._root().stats.enabled.should_not.be.ok
+
+__all__ = ('StatsSpec',)
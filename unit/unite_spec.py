@@ -0,0 +1,43 @@
+from amino import List, Just, Nothing
+
+from proteome.components.unite.stream import CandidateCursors, AsyncUniteSource
+
+from unit._support.loader import LoaderSpec
+from unit._support.spec import UnitSpec
+
+
+class CandidateCursorsSpec(UnitSpec):
+
+    def setup(self) -> None:
+        super().setup()
+        self.cursors = CandidateCursors(limit=2)
+
+    def page(self) -> None:
+        cursor = self.cursors.open(map(str, range(5)))
+        self.cursors.page(cursor, 3).should.equal((List('0', '1', '2'), False))
+        self.cursors.page(cursor, 3).should.equal((List('3', '4'), True))
+        self.cursors.count.should.equal(0)
+        self.cursors.page(cursor, 3).should.equal((List(), True))
+
+    def limit(self) -> None:
+        first = self.cursors.open(List('a'))
+        self.cursors.open(List('b'))
+        self.cursors.open(List('c'))
+        self.cursors.count.should.equal(2)
+        self.cursors.page(first, 1).should.equal((List(), True))
+
+    def source(self) -> None:
+        source = AsyncUniteSource('src', '_open', '_page', 'kind', Nothing, page_size=10)
+        source.data.should.contain("'async_gather_candidates': function('_open_async')")
+        source.function_defs.should.have.length_of(2)
+        source.function_defs[1].should.contain('_page(a:context.source__cursor, 10)')
+
+
+class AddableStreamSpec(LoaderSpec):
+
+    def stream(self) -> None:
+        main = Just(self.pypro1_type)
+        List.wrap(self.loader.iter_all_ident(main)).should.equal(self.loader.all_ident(main))
+        List.wrap(self.loader.iter_main_ident(main)).should.equal(self.loader.main_ident(main))
+
+__all__ = ('CandidateCursorsSpec', 'AddableStreamSpec')